@@ -0,0 +1,80 @@
+"""add books full-text search
+
+Revision ID: 3f1c9a7d2b4e
+Revises: ec265baf44d5
+Create Date: 2026-01-12 10:30:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7d2b4e'
+down_revision = 'ec265baf44d5'
+branch_labels = None
+depends_on = None
+
+# Literal copies of the DDL as of this revision; later edits to
+# app.search.fulltext must not change what this migration does.
+FULLTEXT_INDEX_NAME = 'ix_books_fulltext'
+
+# External-content FTS5 table shadowing books(title, author, description),
+# kept in sync by triggers on every INSERT/UPDATE/DELETE on books
+SQLITE_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+        title, author, description,
+        content='books', content_rowid='id', tokenize='unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts(rowid, title, author, description)
+        VALUES (new.id, new.title, new.author, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, description)
+        VALUES ('delete', old.id, old.title, old.author, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF title, author, description ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, description)
+        VALUES ('delete', old.id, old.title, old.author, old.description);
+        INSERT INTO books_fts(rowid, title, author, description)
+        VALUES (new.id, new.title, new.author, new.description);
+    END
+    """,
+]
+
+SQLITE_FTS_REBUILD = "INSERT INTO books_fts(books_fts) VALUES ('rebuild')"
+
+SQLITE_FTS_DROP = [
+    "DROP TRIGGER IF EXISTS books_fts_au",
+    "DROP TRIGGER IF EXISTS books_fts_ad",
+    "DROP TRIGGER IF EXISTS books_fts_ai",
+    "DROP TABLE IF EXISTS books_fts",
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.create_index(
+            FULLTEXT_INDEX_NAME, 'books', ['title', 'author', 'description'],
+            mysql_prefix='FULLTEXT'
+        )
+    elif dialect == 'sqlite':
+        for statement in SQLITE_FTS_DDL:
+            op.execute(statement)
+        op.execute(SQLITE_FTS_REBUILD)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.drop_index(FULLTEXT_INDEX_NAME, table_name='books')
+    elif dialect == 'sqlite':
+        for statement in SQLITE_FTS_DROP:
+            op.execute(statement)
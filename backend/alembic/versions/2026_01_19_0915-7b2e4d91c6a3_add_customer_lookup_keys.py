@@ -0,0 +1,95 @@
+"""add customer lookup keys
+
+Revision ID: 7b2e4d91c6a3
+Revises: 3f1c9a7d2b4e
+Create Date: 2026-01-19 09:15:00.000000
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2e4d91c6a3'
+down_revision = '3f1c9a7d2b4e'
+branch_labels = None
+depends_on = None
+
+# Normalization rules as of this revision (copied, not imported, so later
+# changes to app.core.normalize do not alter this backfill)
+_NON_DIGIT_RE = re.compile(r"\D+")
+_NAME_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_APOSTROPHE_RE = re.compile(r"['\u2019]")
+
+
+def normalize_phone(phone):
+    if not phone:
+        return None
+    return _NON_DIGIT_RE.sub("", phone) or None
+
+
+def normalize_email(email):
+    if not email:
+        return None
+    return email.strip().lower() or None
+
+
+def name_tokens(name):
+    if not name:
+        return []
+    folded = _APOSTROPHE_RE.sub("", name.lower())
+    return list(dict.fromkeys(t[:100] for t in _NAME_TOKEN_RE.findall(folded)))
+
+
+def upgrade() -> None:
+    op.add_column('customers', sa.Column('phone_normalized', sa.String(length=50), nullable=True))
+    op.add_column('customers', sa.Column('email_normalized', sa.String(length=255), nullable=True))
+    op.create_index(op.f('ix_customers_phone_normalized'), 'customers', ['phone_normalized'], unique=False)
+    op.create_index(op.f('ix_customers_email_normalized'), 'customers', ['email_normalized'], unique=False)
+    op.create_table('customer_name_tokens',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.Column('token', sa.String(length=100), nullable=False),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_customer_name_tokens_id'), 'customer_name_tokens', ['id'], unique=False)
+    op.create_index('ix_customer_name_tokens_token_customer', 'customer_name_tokens', ['token', 'customer_id'], unique=False)
+
+    # Backfill lookup keys for existing customers
+    conn = op.get_bind()
+    customers = sa.table(
+        'customers',
+        sa.column('id', sa.Integer), sa.column('name', sa.String),
+        sa.column('email', sa.String), sa.column('phone', sa.String),
+        sa.column('phone_normalized', sa.String), sa.column('email_normalized', sa.String),
+    )
+    tokens_table = sa.table(
+        'customer_name_tokens',
+        sa.column('customer_id', sa.Integer), sa.column('token', sa.String),
+    )
+    rows = conn.execute(sa.select(customers.c.id, customers.c.name, customers.c.email, customers.c.phone)).fetchall()
+    for row in rows:
+        conn.execute(
+            customers.update()
+            .where(customers.c.id == row.id)
+            .values(phone_normalized=normalize_phone(row.phone), email_normalized=normalize_email(row.email))
+        )
+    token_rows = [
+        {'customer_id': row.id, 'token': token}
+        for row in rows
+        for token in name_tokens(row.name)
+    ]
+    if token_rows:
+        op.bulk_insert(tokens_table, token_rows)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_customer_name_tokens_token_customer', table_name='customer_name_tokens')
+    op.drop_index(op.f('ix_customer_name_tokens_id'), table_name='customer_name_tokens')
+    op.drop_table('customer_name_tokens')
+    op.drop_index(op.f('ix_customers_email_normalized'), table_name='customers')
+    op.drop_index(op.f('ix_customers_phone_normalized'), table_name='customers')
+    op.drop_column('customers', 'email_normalized')
+    op.drop_column('customers', 'phone_normalized')
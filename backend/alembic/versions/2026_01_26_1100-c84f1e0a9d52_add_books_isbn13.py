@@ -0,0 +1,74 @@
+"""add books isbn13
+
+Revision ID: c84f1e0a9d52
+Revises: 7b2e4d91c6a3
+Create Date: 2026-01-26 11:00:00.000000
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c84f1e0a9d52'
+down_revision = '7b2e4d91c6a3'
+branch_labels = None
+depends_on = None
+
+# ISBN canonicalization as of this revision (copied from app.core.isbn so
+# later changes there do not alter this backfill)
+_ISBN_PREFIX_RE = re.compile(r"^ISBN(?:-1[03])?:?")
+_ISBN_SEPARATORS_RE = re.compile(r"[-\s]")
+_ISBN_DIGITS_RE = re.compile(r"^(?:[0-9]{9}[0-9X]|[0-9]{13})$")
+
+
+def _isbn13_check_digit(first12):
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+
+def to_isbn13(code):
+    if not code:
+        return None
+    digits = _ISBN_SEPARATORS_RE.sub("", _ISBN_PREFIX_RE.sub("", code.strip().upper()))
+    if not _ISBN_DIGITS_RE.match(digits):
+        return None
+    if len(digits) == 10:
+        total = sum((10 - i) * (10 if c == "X" else int(c)) for i, c in enumerate(digits))
+        if total % 11:
+            return None
+        first12 = "978" + digits[:9]
+        return first12 + _isbn13_check_digit(first12)
+    if _isbn13_check_digit(digits[:12]) != digits[12]:
+        return None
+    return digits
+
+
+def upgrade() -> None:
+    op.add_column('books', sa.Column('isbn13', sa.String(length=13), nullable=True))
+
+    # Backfill canonical ISBNs. When two rows spell the same ISBN differently
+    # only the lowest ID keeps it so the unique index can be created.
+    conn = op.get_bind()
+    books = sa.table(
+        'books',
+        sa.column('id', sa.Integer), sa.column('isbn', sa.String), sa.column('isbn13', sa.String),
+    )
+    rows = conn.execute(
+        sa.select(books.c.id, books.c.isbn).where(books.c.isbn.isnot(None)).order_by(books.c.id)
+    ).fetchall()
+    seen = set()
+    for row in rows:
+        isbn13 = to_isbn13(row.isbn)
+        if isbn13 is None or isbn13 in seen:
+            continue
+        seen.add(isbn13)
+        conn.execute(books.update().where(books.c.id == row.id).values(isbn13=isbn13))
+
+    op.create_index(op.f('ix_books_isbn13'), 'books', ['isbn13'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_books_isbn13'), table_name='books')
+    op.drop_column('books', 'isbn13')
@@ -0,0 +1,25 @@
+"""add book and sale row versions
+
+Revision ID: a1e93b7c5f04
+Revises: 5d7a2c8e1f30
+Create Date: 2026-02-09 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1e93b7c5f04'
+down_revision = '5d7a2c8e1f30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('books', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('sales', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('sales', 'version')
+    op.drop_column('books', 'version')
@@ -0,0 +1,65 @@
+"""add inventory ledger and stock snapshots
+
+Revision ID: 4b8f6e2d9a71
+Revises: e6b05d3a8c17
+Create Date: 2026-02-23 10:15:00.000000
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b8f6e2d9a71'
+down_revision = 'e6b05d3a8c17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('inventory_movements',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('reference_type', sa.String(length=30), nullable=True),
+    sa.Column('reference_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['book_id'], ['books.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_inventory_movements_book_id_id', 'inventory_movements', ['book_id', 'id'], unique=False)
+    op.create_index('ix_inventory_movements_created_at', 'inventory_movements', ['created_at'], unique=False)
+    op.create_table('stock_snapshots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('stock', sa.Integer(), nullable=False),
+    sa.Column('last_movement_id', sa.Integer(), nullable=False),
+    sa.Column('taken_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['book_id'], ['books.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_stock_snapshots_book_id_taken_at', 'stock_snapshots', ['book_id', 'taken_at'], unique=False)
+
+    # The ledger starts now: seed one baseline snapshot per book from current stock
+    books = sa.table('books', sa.column('id', sa.Integer), sa.column('stock', sa.Integer))
+    snapshots = sa.table(
+        'stock_snapshots',
+        sa.column('book_id', sa.Integer), sa.column('stock', sa.Integer),
+        sa.column('last_movement_id', sa.Integer), sa.column('taken_at', sa.DateTime),
+    )
+    op.execute(
+        snapshots.insert().from_select(
+            ['book_id', 'stock', 'last_movement_id', 'taken_at'],
+            sa.select(books.c.id, books.c.stock, sa.literal(0), sa.literal(datetime.utcnow(), sa.DateTime)),
+        )
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_stock_snapshots_book_id_taken_at', table_name='stock_snapshots')
+    op.drop_table('stock_snapshots')
+    op.drop_index('ix_inventory_movements_created_at', table_name='inventory_movements')
+    op.drop_index('ix_inventory_movements_book_id_id', table_name='inventory_movements')
+    op.drop_table('inventory_movements')
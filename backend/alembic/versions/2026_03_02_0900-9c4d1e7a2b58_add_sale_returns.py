@@ -0,0 +1,75 @@
+"""add sale returns and pre-aggregated return totals
+
+Revision ID: 9c4d1e7a2b58
+Revises: 4b8f6e2d9a71
+Create Date: 2026-03-02 09:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4d1e7a2b58'
+down_revision = '4b8f6e2d9a71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('sales', sa.Column('returned_quantity', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('sales', sa.Column('refunded_amount', sa.Numeric(precision=10, scale=2), server_default='0', nullable=False))
+    op.add_column('sale_items', sa.Column('returned_quantity', sa.Integer(), server_default='0', nullable=False))
+    op.create_table('sale_returns',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sale_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('refund_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('reason', sa.String(length=255), nullable=True),
+    sa.Column('created_by_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['sale_id'], ['sales.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['created_by_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sale_returns_id'), 'sale_returns', ['id'], unique=False)
+    op.create_index(op.f('ix_sale_returns_sale_id'), 'sale_returns', ['sale_id'], unique=False)
+    op.create_table('sale_return_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('return_id', sa.Integer(), nullable=False),
+    sa.Column('sale_item_id', sa.Integer(), nullable=False),
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('refund_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['return_id'], ['sale_returns.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['sale_item_id'], ['sale_items.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['book_id'], ['books.id'], ondelete='RESTRICT'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sale_return_items_id'), 'sale_return_items', ['id'], unique=False)
+    op.create_index(op.f('ix_sale_return_items_return_id'), 'sale_return_items', ['return_id'], unique=False)
+
+    # Returns are taken against line items; sales recorded before line items
+    # existed get the single line they stand for
+    op.execute(
+        """
+        INSERT INTO sale_items (sale_id, book_id, quantity, unit_price, subtotal, returned_quantity)
+        SELECT s.id, s.book_id, s.quantity,
+               CASE WHEN s.quantity > 0 THEN ROUND(s.total_amount * 1.0 / s.quantity, 2) ELSE s.total_amount END,
+               s.total_amount, 0
+        FROM sales s
+        WHERE NOT EXISTS (SELECT 1 FROM sale_items i WHERE i.sale_id = s.id)
+        """
+    )
+
+
+def downgrade() -> None:
+    # The backfilled line items are kept: they match their sales
+    op.drop_index(op.f('ix_sale_return_items_return_id'), table_name='sale_return_items')
+    op.drop_index(op.f('ix_sale_return_items_id'), table_name='sale_return_items')
+    op.drop_table('sale_return_items')
+    op.drop_index(op.f('ix_sale_returns_sale_id'), table_name='sale_returns')
+    op.drop_index(op.f('ix_sale_returns_id'), table_name='sale_returns')
+    op.drop_table('sale_returns')
+    op.drop_column('sale_items', 'returned_quantity')
+    op.drop_column('sales', 'refunded_amount')
+    op.drop_column('sales', 'returned_quantity')
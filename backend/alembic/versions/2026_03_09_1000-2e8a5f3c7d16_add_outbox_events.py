@@ -0,0 +1,35 @@
+"""add outbox events for the change feed
+
+Revision ID: 2e8a5f3c7d16
+Revises: 9c4d1e7a2b58
+Create Date: 2026-03-09 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2e8a5f3c7d16'
+down_revision = '9c4d1e7a2b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('outbox_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('topic', sa.String(length=20), nullable=False),
+    sa.Column('event_type', sa.String(length=40), nullable=False),
+    sa.Column('aggregate_id', sa.Integer(), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_outbox_events_topic_id', 'outbox_events', ['topic', 'id'], unique=False)
+    op.create_index('ix_outbox_events_created_at', 'outbox_events', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_events_created_at', table_name='outbox_events')
+    op.drop_index('ix_outbox_events_topic_id', table_name='outbox_events')
+    op.drop_table('outbox_events')
@@ -0,0 +1,169 @@
+"""add sales daily rollup
+
+The table is backfilled from existing sales here, so reports read correct
+totals as soon as the upgrade finishes; `python rebuild_sales_rollup.py`
+regenerates it later if it drifts.
+
+Revision ID: 6f2b9d4e8a13
+Revises: 2e8a5f3c7d16
+Create Date: 2026-03-16 09:00:00.000000
+"""
+from collections import defaultdict
+from decimal import ROUND_DOWN, Decimal
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f2b9d4e8a13'
+down_revision = '2e8a5f3c7d16'
+branch_labels = None
+depends_on = None
+
+
+CENT = Decimal("0.01")
+UNCATEGORIZED = 0
+CHUNK_SIZE = 2000
+
+books = sa.table('books', sa.column('id', sa.Integer), sa.column('category_id', sa.Integer))
+sales = sa.table(
+    'sales',
+    sa.column('id', sa.Integer), sa.column('book_id', sa.Integer), sa.column('quantity', sa.Integer),
+    sa.column('total_amount', sa.Numeric(10, 2)), sa.column('created_at', sa.DateTime),
+)
+sale_items = sa.table(
+    'sale_items',
+    sa.column('id', sa.Integer), sa.column('sale_id', sa.Integer), sa.column('book_id', sa.Integer),
+    sa.column('quantity', sa.Integer), sa.column('subtotal', sa.Float),
+)
+sale_returns = sa.table(
+    'sale_returns',
+    sa.column('id', sa.Integer), sa.column('sale_id', sa.Integer), sa.column('refund_amount', sa.Numeric(10, 2)),
+)
+sale_return_items = sa.table(
+    'sale_return_items',
+    sa.column('id', sa.Integer), sa.column('return_id', sa.Integer), sa.column('book_id', sa.Integer),
+    sa.column('quantity', sa.Integer), sa.column('refund_amount', sa.Numeric(10, 2)),
+)
+
+
+# Split of a total across lines as of this revision (copied from
+# app.crud.crud_sales_rollup so the backfill matches what the app maintains)
+def allocate(amount, weights):
+    total = sum(weights, Decimal("0"))
+    if total <= 0:
+        shares = [Decimal("0")] * len(weights)
+    else:
+        shares = [(amount * w / total).quantize(CENT, rounding=ROUND_DOWN) for w in weights]
+    shares[0] += amount - sum(shares, Decimal("0"))
+    return shares
+
+
+def _backfill(conn) -> None:
+    # (day, book_id) -> [sales_count, quantity, revenue, returned_quantity, refunded_amount]
+    deltas = defaultdict(lambda: [0, 0, Decimal("0"), 0, Decimal("0")])
+    last_id = 0
+    while True:
+        chunk = conn.execute(
+            sa.select(sales.c.id, sales.c.book_id, sales.c.quantity, sales.c.total_amount, sales.c.created_at)
+            .where(sales.c.id > last_id)
+            .order_by(sales.c.id)
+            .limit(CHUNK_SIZE)
+        ).fetchall()
+        if not chunk:
+            break
+        ids = [sale.id for sale in chunk]
+        items = defaultdict(list)
+        for item in conn.execute(
+            sa.select(sale_items).where(sale_items.c.sale_id.in_(ids)).order_by(sale_items.c.id)
+        ):
+            items[item.sale_id].append((item.book_id, item.quantity, Decimal(str(item.subtotal))))
+        returns = defaultdict(list)
+        for sale_return in conn.execute(
+            sa.select(sale_returns).where(sale_returns.c.sale_id.in_(ids)).order_by(sale_returns.c.id)
+        ):
+            returns[sale_return.sale_id].append((sale_return.id, Decimal(str(sale_return.refund_amount))))
+        return_ids = [return_id for entries in returns.values() for return_id, _ in entries]
+        return_items = defaultdict(list)
+        if return_ids:
+            for item in conn.execute(
+                sa.select(sale_return_items)
+                .where(sale_return_items.c.return_id.in_(return_ids))
+                .order_by(sale_return_items.c.id)
+            ):
+                return_items[item.return_id].append((item.book_id, item.quantity, Decimal(str(item.refund_amount))))
+
+        for sale in chunk:
+            if sale.created_at is None:
+                # Undated sales fall in no report's date range
+                continue
+            day = sale.created_at.date()
+            # Sales recorded before line items existed count as one line
+            lines = items[sale.id] or [(sale.book_id, sale.quantity, Decimal(str(sale.total_amount)))]
+            shares = allocate(Decimal(str(sale.total_amount)), [value for _, _, value in lines])
+            for index, ((book_id, quantity, _), share) in enumerate(zip(lines, shares)):
+                entry = deltas[(day, book_id)]
+                if index == 0:
+                    entry[0] += 1
+                entry[1] += quantity
+                entry[2] += share
+            # Returns count against the day of the sale they refund
+            for return_id, refund_amount in returns[sale.id]:
+                lines = return_items[return_id]
+                if not lines:
+                    continue
+                shares = allocate(refund_amount, [value for _, _, value in lines])
+                for (book_id, quantity, _), share in zip(lines, shares):
+                    entry = deltas[(day, book_id)]
+                    entry[3] += quantity
+                    entry[4] += share
+        last_id = ids[-1]
+
+    rows = {key: values for key, values in deltas.items() if any(values)}
+    if not rows:
+        return
+    categories = dict(conn.execute(sa.select(books.c.id, books.c.category_id)).fetchall())
+    rollup = sa.table(
+        'sales_daily_rollup',
+        sa.column('sale_date', sa.Date), sa.column('book_id', sa.Integer), sa.column('category_id', sa.Integer),
+        sa.column('sales_count', sa.Integer), sa.column('quantity', sa.Integer),
+        sa.column('revenue', sa.Numeric(12, 2)), sa.column('returned_quantity', sa.Integer),
+        sa.column('refunded_amount', sa.Numeric(12, 2)),
+    )
+    records = [
+        {
+            "sale_date": day,
+            "book_id": book_id,
+            "category_id": categories.get(book_id) or UNCATEGORIZED,
+            "sales_count": values[0],
+            "quantity": values[1],
+            "revenue": values[2],
+            "returned_quantity": values[3],
+            "refunded_amount": values[4],
+        }
+        for (day, book_id), values in sorted(rows.items())
+    ]
+    for start in range(0, len(records), CHUNK_SIZE):
+        conn.execute(rollup.insert(), records[start:start + CHUNK_SIZE])
+
+
+def upgrade() -> None:
+    op.create_table('sales_daily_rollup',
+    sa.Column('sale_date', sa.Date(), nullable=False),
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('sales_count', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('returned_quantity', sa.Integer(), nullable=False),
+    sa.Column('refunded_amount', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('sale_date', 'book_id', 'category_id')
+    )
+    op.create_index('ix_sales_daily_rollup_book_id', 'sales_daily_rollup', ['book_id'], unique=False)
+    _backfill(op.get_bind())
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sales_daily_rollup_book_id', table_name='sales_daily_rollup')
+    op.drop_table('sales_daily_rollup')
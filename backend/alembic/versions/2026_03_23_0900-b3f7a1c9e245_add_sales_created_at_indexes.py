@@ -0,0 +1,27 @@
+"""add sales created_at indexes
+
+Revision ID: b3f7a1c9e245
+Revises: 6f2b9d4e8a13
+Create Date: 2026-03-23 09:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f7a1c9e245'
+down_revision = '6f2b9d4e8a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_sales_created_at', 'sales', ['created_at'], unique=False)
+    op.create_index('ix_sales_book_id_created_at', 'sales', ['book_id', 'created_at'], unique=False)
+    op.create_index('ix_sales_customer_id_created_at', 'sales', ['customer_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sales_customer_id_created_at', table_name='sales')
+    op.drop_index('ix_sales_book_id_created_at', table_name='sales')
+    op.drop_index('ix_sales_created_at', table_name='sales')
@@ -0,0 +1,45 @@
+"""add customer phone_reversed
+
+Revision ID: d5a8c3e1f704
+Revises: b3f7a1c9e245
+Create Date: 2026-03-30 09:00:00.000000
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a8c3e1f704'
+down_revision = 'b3f7a1c9e245'
+branch_labels = None
+depends_on = None
+
+_NON_DIGIT_RE = re.compile(r"\D+")
+
+
+def upgrade() -> None:
+    op.add_column('customers', sa.Column('phone_reversed', sa.String(length=50), nullable=True))
+    op.create_index(op.f('ix_customers_phone_reversed'), 'customers', ['phone_reversed'], unique=False)
+
+    # Backfill from the raw phone column (digits only, reversed)
+    conn = op.get_bind()
+    customers = sa.table(
+        'customers',
+        sa.column('id', sa.Integer), sa.column('phone', sa.String), sa.column('phone_reversed', sa.String),
+    )
+    rows = conn.execute(
+        sa.select(customers.c.id, customers.c.phone).where(customers.c.phone.isnot(None))
+    ).fetchall()
+    for row in rows:
+        digits = _NON_DIGIT_RE.sub("", row.phone)
+        if digits:
+            conn.execute(
+                customers.update().where(customers.c.id == row.id).values(phone_reversed=digits[::-1])
+            )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_customers_phone_reversed'), table_name='customers')
+    op.drop_column('customers', 'phone_reversed')
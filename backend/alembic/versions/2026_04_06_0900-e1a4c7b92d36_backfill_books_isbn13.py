@@ -0,0 +1,77 @@
+"""backfill books isbn13
+
+Revision ID: e1a4c7b92d36
+Revises: d5a8c3e1f704
+Create Date: 2026-04-06 09:00:00.000000
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1a4c7b92d36'
+down_revision = 'd5a8c3e1f704'
+branch_labels = None
+depends_on = None
+
+# ISBN canonicalization as of this revision (copied from app.core.isbn so
+# later changes there do not alter this backfill)
+_ISBN_PREFIX_RE = re.compile(r"^ISBN(?:-1[03])?:?")
+_ISBN_SEPARATORS_RE = re.compile(r"[-\s]")
+_ISBN_DIGITS_RE = re.compile(r"^(?:[0-9]{9}[0-9X]|[0-9]{13})$")
+
+
+def _isbn13_check_digit(first12):
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+
+def to_isbn13(code):
+    if not code:
+        return None
+    digits = _ISBN_SEPARATORS_RE.sub("", _ISBN_PREFIX_RE.sub("", code.strip().upper()))
+    if not _ISBN_DIGITS_RE.match(digits):
+        return None
+    if len(digits) == 10:
+        total = sum((10 - i) * (10 if c == "X" else int(c)) for i, c in enumerate(digits))
+        if total % 11:
+            return None
+        first12 = "978" + digits[:9]
+        return first12 + _isbn13_check_digit(first12)
+    if _isbn13_check_digit(digits[:12]) != digits[12]:
+        return None
+    return digits
+
+
+def upgrade() -> None:
+    # Books inserted outside CRUDBook (sample data, scripts) since the column
+    # was added kept isbn13 NULL. Fill them in, leaving a row NULL when its
+    # canonical ISBN is already taken by another book.
+    conn = op.get_bind()
+    books = sa.table(
+        'books',
+        sa.column('id', sa.Integer), sa.column('isbn', sa.String), sa.column('isbn13', sa.String),
+    )
+    taken = {
+        row.isbn13 for row in conn.execute(
+            sa.select(books.c.isbn13).where(books.c.isbn13.isnot(None))
+        )
+    }
+    rows = conn.execute(
+        sa.select(books.c.id, books.c.isbn)
+        .where(books.c.isbn.isnot(None), books.c.isbn13.is_(None))
+        .order_by(books.c.id)
+    ).fetchall()
+    for row in rows:
+        isbn13 = to_isbn13(row.isbn)
+        if isbn13 is None or isbn13 in taken:
+            continue
+        taken.add(isbn13)
+        conn.execute(books.update().where(books.c.id == row.id).values(isbn13=isbn13))
+
+
+def downgrade() -> None:
+    # Data-only migration: the filled values are valid under the old code too
+    pass
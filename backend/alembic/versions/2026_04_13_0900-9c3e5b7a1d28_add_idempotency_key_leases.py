@@ -0,0 +1,24 @@
+"""add idempotency key leases
+
+Revision ID: 9c3e5b7a1d28
+Revises: e1a4c7b92d36
+Create Date: 2026-04-13 09:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3e5b7a1d28'
+down_revision = 'e1a4c7b92d36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing in-progress rows get no lease, so a retry may take them over
+    op.add_column('idempotency_keys', sa.Column('lease_expires_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('idempotency_keys', 'lease_expires_at')
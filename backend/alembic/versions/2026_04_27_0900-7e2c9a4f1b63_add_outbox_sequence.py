@@ -0,0 +1,39 @@
+"""add outbox sequence
+
+Revision ID: 7e2c9a4f1b63
+Revises: 4b8d2f6a9e51
+Create Date: 2026-04-27 09:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e2c9a4f1b63'
+down_revision = '4b8d2f6a9e51'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('outbox_events', sa.Column('sequence', sa.BigInteger(), nullable=True))
+    # Existing events keep their position: cursors handed out so far were IDs
+    op.execute("UPDATE outbox_events SET sequence = id")
+    op.create_index('ix_outbox_events_sequence', 'outbox_events', ['sequence'], unique=True)
+    op.create_index('ix_outbox_events_topic_sequence', 'outbox_events', ['topic', 'sequence'], unique=False)
+    op.drop_index('ix_outbox_events_topic_id', table_name='outbox_events')
+
+    op.create_table('outbox_sequence',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO outbox_sequence (id, value) SELECT 1, COALESCE(MAX(id), 0) FROM outbox_events")
+
+
+def downgrade() -> None:
+    op.drop_table('outbox_sequence')
+    op.create_index('ix_outbox_events_topic_id', 'outbox_events', ['topic', 'id'], unique=False)
+    op.drop_index('ix_outbox_events_topic_sequence', table_name='outbox_events')
+    op.drop_index('ix_outbox_events_sequence', table_name='outbox_events')
+    op.drop_column('outbox_events', 'sequence')
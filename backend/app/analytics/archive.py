@@ -0,0 +1,198 @@
+"""
+Append-only columnar archive of sales, partitioned by month
+"""
+import calendar
+import json
+import logging
+import os
+import re
+import shutil
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.analytics.columns import COLUMNS, Columns, fetch_sale_lines
+from app.core.config import settings
+from app.crud.crud_outbox import outbox
+from app.models.sale import Sale
+
+logger = logging.getLogger(__name__)
+
+# One row per sale. `created_at` is whole seconds since the Unix epoch (UTC)
+# and `book_id` the sale's first book, as on the sales table.
+SALE_COLUMNS = {
+    "sale_id": np.int32,
+    "created_at": np.int64,
+    "customer_id": np.int32,
+    "book_id": np.int32,
+    "quantity": np.int32,
+    "total_cents": np.int64,
+    "returned_quantity": np.int32,
+    "refunded_cents": np.int64,
+}
+
+# Table -> column dtypes; sale_lines matches the analytics cube's columns
+TABLES = {"sales": SALE_COLUMNS, "sale_lines": COLUMNS}
+
+MANIFEST = "_manifest.json"
+
+_PARTITION = re.compile(r"^\d{4}-\d{2}$")
+
+
+def next_month(month: date) -> date:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _cents(amount: Any) -> int:
+    return int(Decimal(str(amount or 0)) * 100)
+
+
+def _fetch_sales(db: Session, *criteria, chunk_size: int = 10000) -> Columns:
+    rows = (
+        db.query(
+            Sale.id, Sale.created_at, Sale.customer_id, Sale.book_id, Sale.quantity,
+            Sale.total_amount, Sale.returned_quantity, Sale.refunded_amount,
+        )
+        .filter(*criteria)
+        .order_by(Sale.id)
+        .yield_per(chunk_size)
+    )
+    values: Dict[str, List[int]] = {name: [] for name in SALE_COLUMNS}
+    for sale_id, created_at, customer_id, book_id, quantity, total, returned, refunded in rows:
+        values["sale_id"].append(sale_id)
+        values["created_at"].append(calendar.timegm(created_at.utctimetuple()))
+        values["customer_id"].append(customer_id or 0)
+        values["book_id"].append(book_id)
+        values["quantity"].append(quantity)
+        values["total_cents"].append(_cents(total))
+        values["returned_quantity"].append(returned or 0)
+        values["refunded_cents"].append(_cents(refunded))
+    return {name: np.array(values[name], dtype=dtype) for name, dtype in SALE_COLUMNS.items()}
+
+
+class SalesArchive:
+    """
+    Sales history under `root` as one directory per calendar month (UTC):
+
+        2026-09/_manifest.json
+        2026-09/sales/<column>.npy
+        2026-09/sale_lines/<column>.npy
+
+    Every column is a plain `.npy` file, so it can be read with `np.load`
+    or memory-mapped for scans that never copy it into the heap. A month is
+    exported once it has been over for SALES_ARCHIVE_GRACE_DAYS and is not
+    rewritten afterwards unless rebuilt explicitly. Partitions are written
+    to a temporary directory and renamed into place, so a reader sees a
+    month completely or not at all.
+
+    The manifest keeps the change feed cursor read before the export; a
+    consumer that replays the feed from there catches returns, edits and
+    deletes made to archived sales since (within OUTBOX_RETENTION_SECONDS).
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+
+    def months(self) -> List[date]:
+        """Archived months, oldest first"""
+        if not self.root.is_dir():
+            return []
+        return sorted(
+            datetime.strptime(path.name, "%Y-%m").date()
+            for path in self.root.iterdir()
+            if _PARTITION.match(path.name) and (path / MANIFEST).is_file()
+        )
+
+    def _path(self, month: date) -> Path:
+        return self.root / f"{month:%Y-%m}"
+
+    def manifest(self, month: date) -> Dict[str, Any]:
+        with open(self._path(month) / MANIFEST) as f:
+            return json.load(f)
+
+    def end(self) -> Optional[date]:
+        """First day not covered by the archive, or None when it is empty"""
+        months = self.months()
+        return next_month(months[-1]) if months else None
+
+    def load(self, month: date, table: str = "sale_lines", *, mmap: bool = True) -> Columns:
+        """Columns of one partition, memory-mapped read-only unless `mmap` is False"""
+        if table not in TABLES:
+            raise ValueError(f"Unknown archive table: {table}")
+        path = self._path(month) / table
+        rows = self.manifest(month)["rows"][table]
+        return {
+            name: np.load(path / f"{name}.npy", mmap_mode="r" if mmap and rows else None)
+            for name in TABLES[table]
+        }
+
+    def export_month(self, db: Session, month: date) -> int:
+        """Write (or rewrite) the partition for `month`; returns its number of sales"""
+        month = month.replace(day=1)
+        cursor = outbox.latest_cursor(db)
+        start = datetime.combine(month, time.min)
+        end = datetime.combine(next_month(month), time.min)
+        criteria = (Sale.created_at >= start, Sale.created_at < end)
+        tables = {"sales": _fetch_sales(db, *criteria), "sale_lines": fetch_sale_lines(db, *criteria)}
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        final = self._path(month)
+        staging = self.root / f".{final.name}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        for table, columns in tables.items():
+            (staging / table).mkdir(parents=True)
+            for name, values in columns.items():
+                np.save(staging / table / f"{name}.npy", values)
+        manifest = {
+            "month": final.name,
+            "rows": {table: len(columns["sale_id"]) for table, columns in tables.items()},
+            "dtypes": {table: {name: np.dtype(dtype).str for name, dtype in TABLES[table].items()} for table in TABLES},
+            "cursor": cursor,
+            "exported_at": datetime.utcnow().isoformat(),
+        }
+        with open(staging / MANIFEST, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        if final.exists():
+            retired = self.root / f".{final.name}.old"
+            shutil.rmtree(retired, ignore_errors=True)
+            os.replace(final, retired)
+            os.replace(staging, final)
+            shutil.rmtree(retired)
+        else:
+            os.replace(staging, final)
+        return manifest["rows"]["sales"]
+
+    def rebuild(self, db: Session, month: date) -> int:
+        """Rewrite an archived month, e.g. for corrections the change feed no longer holds"""
+        if month.replace(day=1) not in self.months():
+            raise ValueError(f"{month:%Y-%m} is not archived yet")
+        return self.export_month(db, month)
+
+    def export(self, db: Session, *, today: Optional[date] = None) -> List[date]:
+        """
+        Append every closed month after the last archived one (months
+        without sales get empty partitions, so coverage stays contiguous).
+        Returns the months written.
+        """
+        today = today or datetime.utcnow().date()
+        cutoff = (today - timedelta(days=settings.SALES_ARCHIVE_GRACE_DAYS)).replace(day=1)
+        month = self.end()
+        if month is None:
+            first = db.query(func.min(Sale.created_at)).scalar()
+            if first is None:
+                return []
+            month = first.date().replace(day=1)
+
+        written = []
+        while month < cutoff:
+            count = self.export_month(db, month)
+            logger.info(f"Archived {count} sales for {month:%Y-%m}")
+            written.append(month)
+            month = next_month(month)
+        return written
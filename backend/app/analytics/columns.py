@@ -0,0 +1,106 @@
+"""
+Sales as NumPy column arrays, one row per sale line
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import groupby
+from typing import Dict, List
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.crud.crud_sales_rollup import allocate
+from app.models.sale import Sale
+from app.models.sale_item import SaleItem
+from app.models.sale_return import SaleReturn, SaleReturnItem
+
+EPOCH = date(1970, 1, 1)
+
+# Column name -> dtype. Days are counted from EPOCH, a missing customer is
+# 0, and money is in integer cents (a sale's total and each return's refund
+# are split across lines the same way the sales rollup splits them).
+COLUMNS = {
+    "sale_id": np.int32,
+    "day": np.int32,
+    "book_id": np.int32,
+    "customer_id": np.int32,
+    "quantity": np.int32,
+    "returned_quantity": np.int32,
+    "revenue_cents": np.int64,
+    "refunded_cents": np.int64,
+}
+
+Columns = Dict[str, np.ndarray]
+
+
+def day_number(day: date) -> int:
+    return (day - EPOCH).days
+
+
+def day_from_number(number: int) -> date:
+    return EPOCH + timedelta(days=int(number))
+
+
+def _cents(amount: Decimal) -> int:
+    return int(amount * 100)
+
+
+def empty_columns(size: int = 0) -> Columns:
+    return {name: np.zeros(size, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+
+def _line_refunds(db: Session, criteria) -> Dict[int, int]:
+    """Refunded cents per sale line for the sales matching `criteria`"""
+    rows = (
+        db.query(SaleReturn.id, SaleReturn.refund_amount, SaleReturnItem.sale_item_id, SaleReturnItem.refund_amount)
+        .join(SaleReturnItem, SaleReturnItem.return_id == SaleReturn.id)
+        .join(Sale, Sale.id == SaleReturn.sale_id)
+        .filter(*criteria)
+        .order_by(SaleReturn.id, SaleReturnItem.id)
+    )
+    refunds: Dict[int, int] = {}
+    for _, lines in groupby(rows, key=lambda row: row[0]):
+        lines = list(lines)
+        shares = allocate(Decimal(str(lines[0][1])), [Decimal(str(line[3])) for line in lines])
+        for line, share in zip(lines, shares):
+            refunds[line[2]] = refunds.get(line[2], 0) + _cents(share)
+    return refunds
+
+
+def fetch_sale_lines(db: Session, *criteria, chunk_size: int = 10000) -> Columns:
+    """
+    Columns for every line of the sales matching `criteria` (filters on
+    `Sale`), ordered by sale and line. Sales recorded before line items
+    existed become a single line.
+    """
+    refunds = _line_refunds(db, criteria)
+    rows = (
+        db.query(
+            Sale.id, Sale.created_at, Sale.customer_id, Sale.total_amount, Sale.book_id, Sale.quantity,
+            SaleItem.id, SaleItem.book_id, SaleItem.quantity, SaleItem.subtotal, SaleItem.returned_quantity,
+        )
+        .outerjoin(SaleItem, SaleItem.sale_id == Sale.id)
+        .filter(*criteria)
+        .order_by(Sale.id, SaleItem.id)
+        .yield_per(chunk_size)
+    )
+
+    values: Dict[str, List[int]] = {name: [] for name in COLUMNS}
+    for sale_id, lines in groupby(rows, key=lambda row: row[0]):
+        lines = list(lines)
+        _, created_at, customer_id, total_amount, book_id, quantity = lines[0][:6]
+        day = day_number(created_at.date())
+        if lines[0][6] is None:
+            lines = [(None,) * 6 + (None, book_id, quantity, total_amount, 0)]
+        shares = allocate(Decimal(str(total_amount)), [Decimal(str(line[9])) for line in lines])
+        for line, share in zip(lines, shares):
+            values["sale_id"].append(sale_id)
+            values["day"].append(day)
+            values["book_id"].append(line[7])
+            values["customer_id"].append(customer_id or 0)
+            values["quantity"].append(line[8])
+            values["returned_quantity"].append(line[10] or 0)
+            values["revenue_cents"].append(_cents(share))
+            values["refunded_cents"].append(refunds.get(line[6], 0))
+
+    return {name: np.array(values[name], dtype=dtype) for name, dtype in COLUMNS.items()}
@@ -0,0 +1,436 @@
+"""
+In-memory columnar sales cube behind the ad-hoc analytics queries
+"""
+import logging
+import threading
+from datetime import date, datetime, time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.analytics.archive import SalesArchive, next_month
+from app.analytics.columns import Columns, day_from_number, day_number, empty_columns, fetch_sale_lines
+from app.core.config import settings
+from app.crud.crud_outbox import outbox
+from app.models.book import Book
+from app.models.outbox import BOOK_TOPIC, SALE_TOPIC, OutboxEvent
+from app.models.sale import Sale
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ("date", "month", "year", "category", "customer", "book")
+MEASURES = ("sales", "lines", "quantity", "revenue", "returned_quantity", "refunded", "net_quantity", "net_revenue")
+# Measures kept in cents and reported in currency units
+MONEY_MEASURES = ("revenue", "refunded", "net_revenue")
+
+# Measure -> summed column, or (minuend, subtrahend) for net measures
+_SUMMED = {
+    "quantity": "quantity",
+    "returned_quantity": "returned_quantity",
+    "revenue": "revenue_cents",
+    "refunded": "refunded_cents",
+}
+_NET = {"net_quantity": ("quantity", "returned_quantity"), "net_revenue": ("revenue", "refunded")}
+
+# Sales re-read per SELECT when applying changes
+_RELOAD_CHUNK = 1000
+
+
+# (columns, live row mask)
+Segment = Tuple[Columns, np.ndarray]
+
+
+class _View:
+    """Consistent, never-mutated snapshot that queries run against"""
+
+    __slots__ = ("segments", "book_category", "refreshed_at")
+
+    def __init__(self, segments: Tuple[Segment, ...], book_category: np.ndarray, refreshed_at: Optional[datetime]):
+        self.segments = segments
+        self.book_category = book_category
+        self.refreshed_at = refreshed_at
+
+
+def _factorize(keys: List[np.ndarray], size: int) -> Tuple[np.ndarray, int, List[np.ndarray]]:
+    """
+    Group rows by the combination of `keys`: returns each row's group
+    index, the number of groups, and every key's value per group. Groups
+    come out in ascending key order (first key most significant).
+
+    Keys spanning a small range (days, months, most IDs) are coded as
+    offsets from their minimum and grouped with a counting pass; only wide
+    keys and huge combined key spaces fall back to sorting.
+    """
+    if not keys:
+        return np.zeros(size, dtype=np.int64), 1, []
+    dense_limit = max(4 * size, 1 << 16)
+    codes, decoders, sizes = [], [], []
+    for key in keys:
+        low, high = (int(key.min()), int(key.max())) if size else (0, 0)
+        if high - low < dense_limit:
+            codes.append(key - low)
+            decoders.append(lambda digits, low=low: digits + low)
+            sizes.append(high - low + 1)
+        else:
+            uniques, inverse = np.unique(key, return_inverse=True)
+            codes.append(inverse.reshape(-1))
+            decoders.append(lambda digits, uniques=uniques: uniques[digits])
+            sizes.append(len(uniques))
+
+    combinations = int(np.prod(sizes, dtype=object))
+    if combinations >= 2 ** 62:
+        _, first, group = np.unique(np.stack(codes, axis=1), axis=0, return_index=True, return_inverse=True)
+        return group.reshape(-1), len(first), [key[first] for key in keys]
+
+    combined = np.zeros(size, dtype=np.int64)
+    for code, count in zip(codes, sizes):
+        combined = combined * count + code
+    if combinations <= dense_limit:
+        present = np.flatnonzero(np.bincount(combined, minlength=combinations))
+        lookup = np.zeros(combinations, dtype=np.int64)
+        lookup[present] = np.arange(len(present))
+        group = lookup[combined]
+    else:
+        present, group = np.unique(combined, return_inverse=True)
+        group = group.reshape(-1)
+
+    values = []
+    remaining = present
+    for decode, count in zip(reversed(decoders), reversed(sizes)):
+        remaining, digits = np.divmod(remaining, count)
+        values.append(decode(digits))
+    return group, len(present), values[::-1]
+
+
+def _label(dimension: str, value: int) -> Any:
+    if dimension == "date":
+        return day_from_number(value).isoformat()
+    if dimension == "month":
+        return f"{1970 + value // 12:04d}-{value % 12 + 1:02d}"
+    if dimension == "year":
+        return 1970 + value
+    # Category, customer and book IDs; 0 stands for none
+    return value or None
+
+
+class SalesCube:
+    """
+    Sale lines held as typed NumPy columns (see `app.analytics.columns`)
+    plus a book -> category lookup applied at query time, so recategorising
+    a book never touches the rows. A query narrows rows with boolean masks,
+    groups by factorising each dimension into one combined integer key and
+    sums measures with `np.bincount`; pivots reuse the same grouping for
+    rows and columns.
+
+    The cube follows the change feed from the cursor read just before it
+    was loaded: any sale created, updated, returned or deleted since is
+    masked out and re-read by ID, and book events reload the category
+    lookup. New rows go into spare capacity and existing rows are never
+    written in place, so queries use an immutable view without locking.
+
+    With SALES_ARCHIVE_DIR set, archived months are memory-mapped as
+    read-only segments and only later sales are read from the database;
+    the feed is then replayed from the oldest partition's export cursor so
+    later changes to archived sales are picked up too.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self._lock = threading.Lock()
+        self._archived: List[Segment] = []
+        self._buffers: Columns = empty_columns()
+        self._size = 0
+        self._live = np.zeros(0, dtype=bool)
+        self._cursor = "0"
+        self._view = _View(((self._buffers, self._live),), np.zeros(1, dtype=np.int32), None)
+
+    def __len__(self) -> int:
+        return sum(int(np.count_nonzero(live)) for _, live in self._view.segments)
+
+    @property
+    def refreshed_at(self) -> Optional[datetime]:
+        return self._view.refreshed_at
+
+    @staticmethod
+    def _book_categories(db: Session) -> np.ndarray:
+        rows = db.query(Book.id, Book.category_id).all()
+        lookup = np.zeros(max((book_id for book_id, _ in rows), default=0) + 1, dtype=np.int32)
+        for book_id, category_id in rows:
+            lookup[book_id] = category_id or 0
+        return lookup
+
+    def _publish(self, book_category: np.ndarray) -> None:
+        columns = {name: buffer[:self._size] for name, buffer in self._buffers.items()}
+        segments = tuple(self._archived) + ((columns, self._live),)
+        self._view = _View(segments, book_category, datetime.utcnow())
+
+    def _append(self, rows: Columns) -> None:
+        count = len(rows["sale_id"])
+        needed = self._size + count
+        if needed > len(self._buffers["sale_id"]):
+            grown = empty_columns(max(needed, 2 * len(self._buffers["sale_id"]), 1024))
+            for name, buffer in self._buffers.items():
+                grown[name][:self._size] = buffer[:self._size]
+            self._buffers = grown
+        for name, values in rows.items():
+            self._buffers[name][self._size:needed] = values
+        self._size = needed
+        self._live = np.concatenate([self._live, np.ones(count, dtype=bool)])
+
+    def _compact(self) -> None:
+        """Drop masked-out rows once they make up a quarter of the cube"""
+        dead = self._size - int(np.count_nonzero(self._live))
+        if dead * 4 < max(self._size, 4096):
+            return
+        self._buffers = {name: buffer[:self._size][self._live] for name, buffer in self._buffers.items()}
+        self._size = len(self._buffers["sale_id"])
+        self._live = np.ones(self._size, dtype=bool)
+
+    def _load(self, db: Session) -> None:
+        archive = SalesArchive(settings.SALES_ARCHIVE_DIR) if settings.SALES_ARCHIVE_DIR else None
+        months = archive.months() if archive else []
+        criteria = []
+        if months:
+            cursor = str(min(int(archive.manifest(month)["cursor"]) for month in months))
+            self._archived = [
+                (columns, np.ones(len(columns["sale_id"]), dtype=bool))
+                for columns in (archive.load(month) for month in months)
+            ]
+            criteria.append(Sale.created_at >= datetime.combine(next_month(months[-1]), time.min))
+            oldest = db.query(func.min(OutboxEvent.sequence)).scalar()
+            if oldest and oldest > int(cursor) + 1:
+                logger.warning(
+                    "Change feed no longer reaches back to the oldest archive export; "
+                    "returns or edits to archived sales made since may be missing until those months are rebuilt"
+                )
+        else:
+            cursor = outbox.latest_cursor(db)
+            self._archived = []
+        self._buffers = fetch_sale_lines(db, *criteria)
+        self._size = len(self._buffers["sale_id"])
+        self._live = np.ones(self._size, dtype=bool)
+        self._cursor = cursor
+        self._publish(self._book_categories(db))
+        if months:
+            self._apply_changes(db)
+        self.ready = True
+        archived = sum(len(live) for _, live in self._archived)
+        logger.info(f"Sales cube loaded with {self._size} sale lines from the database and {archived} archived")
+
+    def _apply_changes(self, db: Session) -> int:
+        cursor = self._cursor
+        sale_ids = set()
+        books_changed = False
+        while True:
+            events, cursor, has_more = outbox.get_changes(
+                db, since=cursor, types=[SALE_TOPIC, BOOK_TOPIC], limit=settings.CHANGES_MAX_PAGE_SIZE
+            )
+            for change in events:
+                if change.topic == SALE_TOPIC:
+                    sale_ids.add(change.aggregate_id)
+                else:
+                    books_changed = True
+            if not has_more:
+                break
+
+        book_category = self._view.book_category
+        if sale_ids:
+            ids = sorted(sale_ids)
+            wanted = np.array(ids, dtype=np.int32)
+            self._archived = [
+                (columns, live & ~np.isin(columns["sale_id"], wanted)) for columns, live in self._archived
+            ]
+            self._live = self._live & ~np.isin(self._buffers["sale_id"][:self._size], wanted)
+            for start in range(0, len(ids), _RELOAD_CHUNK):
+                rows = fetch_sale_lines(db, Sale.id.in_(ids[start:start + _RELOAD_CHUNK]))
+                self._append(rows)
+                if len(rows["book_id"]) and int(rows["book_id"].max()) >= len(book_category):
+                    books_changed = True
+            self._compact()
+        if books_changed:
+            book_category = self._book_categories(db)
+        self._cursor = cursor
+        self._publish(book_category)
+        return len(sale_ids)
+
+    def load(self, db: Session) -> None:
+        """(Re)load every sale line, from the archive where possible"""
+        with self._lock:
+            self._load(db)
+
+    def refresh(self, db: Session, *, wait: bool = True) -> bool:
+        """
+        Apply sales and books changed since the last refresh, loading the
+        cube first if needed. With `wait=False`, returns False at once when
+        another thread is already refreshing.
+        """
+        if not self._lock.acquire(blocking=wait):
+            return False
+        try:
+            if not self.ready:
+                self._load(db)
+            else:
+                changed = self._apply_changes(db)
+                if changed:
+                    logger.debug(f"Sales cube refreshed {changed} sales")
+        finally:
+            self._lock.release()
+        return True
+
+    def query(
+        self,
+        *,
+        dimensions: Sequence[str] = (),
+        measures: Sequence[str] = ("revenue", "quantity"),
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        category_ids: Optional[Sequence[int]] = None,
+        customer_ids: Optional[Sequence[int]] = None,
+        book_ids: Optional[Sequence[int]] = None,
+        pivot: Optional[str] = None,
+        order_by: Optional[str] = None,
+        limit: int = 1000,
+    ) -> Dict[str, Any]:
+        """
+        Aggregate `measures` per combination of `dimensions` over sales made
+        from `start` to `end` (inclusive dates) that match every ID filter.
+        With `pivot`, that dimension's values become columns and each row
+        holds one list per measure. `order_by` names a row dimension or a
+        measure, "-" prefixed for descending; rows are otherwise in
+        dimension order.
+        """
+        dimensions = list(dict.fromkeys(dimensions))
+        measures = list(dict.fromkeys(measures))
+        unknown = [d for d in dimensions if d not in DIMENSIONS] + [m for m in measures if m not in MEASURES]
+        if unknown:
+            raise ValueError(f"Unknown dimensions or measures: {', '.join(unknown)}")
+        if not measures:
+            raise ValueError("At least one measure is required")
+        if pivot is not None and pivot not in dimensions:
+            raise ValueError("Pivot must be one of the requested dimensions")
+        row_dimensions = [d for d in dimensions if d != pivot]
+        sort_key = (order_by or "").lstrip("-")
+        if order_by and sort_key not in row_dimensions and sort_key not in measures:
+            raise ValueError("order_by must be a requested measure or non-pivot dimension")
+
+        view = self._view
+        selection = []
+        for columns, live in view.segments:
+            mask = live.copy()
+            if start is not None:
+                mask &= columns["day"] >= day_number(start)
+            if end is not None:
+                mask &= columns["day"] <= day_number(end)
+            if customer_ids:
+                mask &= np.isin(columns["customer_id"], customer_ids)
+            if book_ids:
+                mask &= np.isin(columns["book_id"], book_ids)
+            rows = np.flatnonzero(mask)
+            if category_ids:
+                rows = rows[np.isin(view.book_category[columns["book_id"][rows]], category_ids)]
+            selection.append((columns, rows))
+        matched = sum(len(rows) for _, rows in selection)
+        gathered: Columns = {}
+
+        def column(name: str) -> np.ndarray:
+            """`name` for the matching rows of every segment, in segment order"""
+            if name not in gathered:
+                parts = [columns[name][rows] for columns, rows in selection]
+                gathered[name] = parts[0] if len(parts) == 1 else np.concatenate(parts)
+            return gathered[name]
+
+        def key(dimension: str) -> np.ndarray:
+            if dimension == "category":
+                return view.book_category[column("book_id")].astype(np.int64)
+            if dimension in ("customer", "book"):
+                return column(f"{dimension}_id").astype(np.int64)
+            days = column("day").astype(np.int64)
+            if dimension == "date":
+                return days
+            unit = "datetime64[M]" if dimension == "month" else "datetime64[Y]"
+            return days.astype("datetime64[D]").astype(unit).astype(np.int64)
+
+        group, group_count, group_keys = _factorize([key(d) for d in row_dimensions], matched)
+        cells = group
+        column_count = 1
+        pivot_keys = None
+        if pivot is not None:
+            pivot_group, column_count, (pivot_keys,) = _factorize([key(pivot)], matched)
+            if group_count * column_count > settings.ANALYTICS_MAX_PIVOT_CELLS:
+                raise ValueError("Pivot too large; add filters or use fewer dimensions")
+            cells = group * column_count + pivot_group
+        values = self._measures(column, cells, group_count * column_count, measures)
+
+        if order_by:
+            if sort_key in values:
+                totals = values[sort_key].reshape(group_count, column_count).sum(axis=1)
+            else:
+                totals = group_keys[row_dimensions.index(sort_key)]
+            order = np.argsort(-totals if order_by.startswith("-") else totals, kind="stable")
+        else:
+            order = np.arange(group_count)
+        order = order[:limit]
+
+        labels = {
+            dimension: [_label(dimension, v) for v in group_keys[i][order].tolist()]
+            for i, dimension in enumerate(row_dimensions)
+        }
+        output = {}
+        for measure in measures:
+            matrix = values[measure].reshape(group_count, column_count)[order]
+            if measure in MONEY_MEASURES:
+                matrix = np.round(matrix / 100, 2)
+            output[measure] = matrix.tolist() if pivot is not None else matrix[:, 0].tolist()
+        result_rows = [
+            {**{d: labels[d][i] for d in row_dimensions}, **{m: output[m][i] for m in measures}}
+            for i in range(len(order))
+        ]
+        return {
+            "dimensions": dimensions,
+            "measures": measures,
+            "pivot": pivot,
+            "columns": [_label(pivot, v) for v in pivot_keys.tolist()] if pivot is not None else None,
+            "rows": result_rows,
+            "total_rows": group_count,
+            "matched_lines": matched,
+            "refreshed_at": view.refreshed_at,
+        }
+
+    @staticmethod
+    def _measures(
+        column: Callable[[str], np.ndarray], group: np.ndarray, count: int, measures: Sequence[str]
+    ) -> Dict[str, np.ndarray]:
+        values: Dict[str, np.ndarray] = {}
+
+        def summed(measure: str) -> np.ndarray:
+            if measure not in values:
+                if measure in _NET:
+                    plus, minus = _NET[measure]
+                    values[measure] = summed(plus) - summed(minus)
+                else:
+                    weights = column(_SUMMED[measure])
+                    values[measure] = np.rint(np.bincount(group, weights=weights, minlength=count)).astype(np.int64)
+            return values[measure]
+
+        for measure in measures:
+            if measure == "lines":
+                values[measure] = np.bincount(group, minlength=count)
+            elif measure == "sales":
+                # Distinct sales per group. A sale's lines are stored next to
+                # each other, so numbering the runs of equal sale IDs gives
+                # (run, group) keys that are already nearly sorted
+                sale_ids = column("sale_id")
+                runs = np.zeros(len(sale_ids), dtype=np.int64)
+                np.cumsum(sale_ids[1:] != sale_ids[:-1], out=runs[1:])
+                pairs = np.sort(runs * count + group, kind="stable")
+                distinct = np.ones(len(pairs), dtype=bool)
+                np.not_equal(pairs[1:], pairs[:-1], out=distinct[1:])
+                values[measure] = np.bincount(pairs[distinct] % count, minlength=count)
+            else:
+                summed(measure)
+        return values
+
+
+sales_cube = SalesCube()
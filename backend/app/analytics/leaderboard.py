@@ -0,0 +1,195 @@
+"""
+In-memory top-sellers leaderboard for all time and the last 1, 7 and 30 days
+"""
+import heapq
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+WINDOWS = (1, 7, 30)
+
+_PENDING_KEY = "leaderboard_pending"
+
+# (day, book_id, net quantity, net revenue)
+Delta = Tuple[date, int, int, float]
+
+
+def _utc_today() -> date:
+    return datetime.utcnow().date()
+
+
+class SalesLeaderboard:
+    """
+    Net units sold (and revenue) per book, kept as one counter map per
+    window plus per-day buckets for the longest window. A sale or return
+    adds to all-time, its day's bucket and every window the day falls in.
+    When the UTC day turns over, the bucket that leaves a window is
+    subtracted from it, so expiry costs O(books sold that day). Top-k is a
+    heap selection over one window's counters; results are cached until
+    the next change.
+
+    Counts are UTC days: the N-day window is today plus the N-1 days before.
+    Only writes committed by this process are applied live; a periodic
+    resync from the sales rollup picks up everything else.
+    """
+
+    def __init__(self, windows: Tuple[int, ...] = WINDOWS):
+        self.windows = tuple(sorted(windows))
+        self.horizon = self.windows[-1]
+        self.ready = False
+        self._lock = threading.Lock()
+        self._today: Optional[date] = None
+        self._days: Dict[date, Dict[int, List[float]]] = {}
+        self._totals: Dict[Optional[int], Dict[int, List[float]]] = {}
+        self._version = 0
+        self._top_cache: Dict[Tuple[Optional[int], int], Tuple[int, List[Tuple[int, int, float]]]] = {}
+        self._reset_windows()
+
+    def _reset_windows(self) -> None:
+        self._totals = {None: self._totals.get(None, {})}
+        for window in self.windows:
+            self._totals[window] = {}
+
+    def __len__(self) -> int:
+        return len(self._totals[None])
+
+    @staticmethod
+    def _add(counters: Dict[int, List[float]], book_id: int, quantity: int, revenue: float) -> None:
+        entry = counters.get(book_id)
+        if entry is None:
+            counters[book_id] = [quantity, revenue]
+            return
+        entry[0] += quantity
+        entry[1] += revenue
+        if entry[0] == 0 and abs(entry[1]) < 0.005:
+            del counters[book_id]
+
+    def _in_window(self, day: date, window: int) -> bool:
+        return day > self._today - timedelta(days=window)
+
+    def _roll(self, today: date) -> None:
+        """Advance to `today`, expiring the day buckets that left each window"""
+        if self._today is None or today <= self._today:
+            self._today = self._today or today
+            return
+        if (today - self._today).days >= self.horizon:
+            self._days.clear()
+            self._reset_windows()
+        else:
+            while self._today < today:
+                self._today += timedelta(days=1)
+                for window in self.windows:
+                    bucket = self._days.get(self._today - timedelta(days=window))
+                    for book_id, (quantity, revenue) in (bucket or {}).items():
+                        self._add(self._totals[window], book_id, -quantity, -revenue)
+                self._days.pop(self._today - timedelta(days=self.horizon), None)
+        self._today = today
+        self._version += 1
+        self._top_cache.clear()
+
+    def _apply(self, day: date, book_id: int, quantity: int, revenue: float) -> None:
+        self._add(self._totals[None], book_id, quantity, revenue)
+        if not self._in_window(day, self.horizon):
+            return
+        self._add(self._days.setdefault(day, {}), book_id, quantity, revenue)
+        for window in self.windows:
+            if self._in_window(day, window):
+                self._add(self._totals[window], book_id, quantity, revenue)
+
+    def build(
+        self,
+        all_time: Iterable[Tuple[int, int, float]],
+        recent: Iterable[Delta],
+        today: Optional[date] = None,
+    ) -> None:
+        """
+        (Re)build from `(book_id, quantity, revenue)` all-time totals and
+        `(day, book_id, quantity, revenue)` rows for the last `horizon` days
+        """
+        fresh = SalesLeaderboard(self.windows)
+        fresh._today = today or _utc_today()
+        for book_id, quantity, revenue in all_time:
+            fresh._add(fresh._totals[None], book_id, int(quantity or 0), float(revenue or 0))
+        for day, book_id, quantity, revenue in recent:
+            if fresh._in_window(day, fresh.horizon):
+                fresh._add(fresh._days.setdefault(day, {}), book_id, int(quantity or 0), float(revenue or 0))
+                for window in fresh.windows:
+                    if fresh._in_window(day, window):
+                        fresh._add(fresh._totals[window], book_id, int(quantity or 0), float(revenue or 0))
+        with self._lock:
+            self._today = fresh._today
+            self._days = fresh._days
+            self._totals = fresh._totals
+            self._version += 1
+            self._top_cache.clear()
+            self.ready = True
+
+    def apply(self, deltas: Iterable[Delta]) -> None:
+        """Add committed `(day, book_id, quantity, revenue)` changes (returns are negative)"""
+        with self._lock:
+            self._roll(_utc_today())
+            for day, book_id, quantity, revenue in deltas:
+                self._apply(day, book_id, quantity, revenue)
+            self._version += 1
+            self._top_cache.clear()
+
+    def top(self, *, days: Optional[int] = None, limit: int = 10, offset: int = 0) -> List[Tuple[int, int, float]]:
+        """Best sellers as `(book_id, quantity, revenue)`; `days` is None (all time) or one of `windows`"""
+        if days is not None and days not in self.windows:
+            raise ValueError(f"Leaderboard window must be one of {self.windows}")
+        with self._lock:
+            self._roll(_utc_today())
+            key = (days, offset + limit)
+            cached = self._top_cache.get(key)
+            if cached is None or cached[0] != self._version:
+                ranked = heapq.nlargest(
+                    offset + limit,
+                    ((book_id, int(q), round(r, 2)) for book_id, (q, r) in self._totals[days].items() if q > 0),
+                    key=lambda row: (row[1], -row[0]),
+                )
+                cached = (self._version, ranked)
+                self._top_cache[key] = cached
+        return cached[1][offset:offset + limit]
+
+    def supports(self, days: Optional[int]) -> bool:
+        return self.ready and (days is None or days in self.windows)
+
+
+sales_leaderboard = SalesLeaderboard()
+
+
+def warm_leaderboard(db: Session) -> None:
+    """Seed the leaderboard from the daily sales rollup"""
+    from app.crud.crud_sales_rollup import sales_rollup
+
+    today = _utc_today()
+    since = today - timedelta(days=sales_leaderboard.horizon - 1)
+    sales_leaderboard.build(
+        sales_rollup.book_totals(db),
+        sales_rollup.book_day_totals(db, start=since),
+        today=today,
+    )
+    logger.info(f"Sales leaderboard built with {len(sales_leaderboard)} books")
+
+
+def stage(session: Session, deltas: Iterable[Delta]) -> None:
+    """Queue leaderboard changes to apply once `session` commits"""
+    session.info.setdefault(_PENDING_KEY, []).extend(deltas)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending and sales_leaderboard.ready:
+        sales_leaderboard.apply(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
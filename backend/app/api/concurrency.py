@@ -0,0 +1,35 @@
+"""
+ETag / If-Match helpers for optimistic concurrency on versioned resources
+"""
+from typing import Optional
+
+from fastapi import HTTPException, Response
+
+from app.crud.base import VersionConflict
+
+
+def etag_for(version: int) -> str:
+    return f'"{version}"'
+
+
+def set_etag(response: Response, obj) -> None:
+    response.headers["ETag"] = etag_for(obj.version)
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Version asserted by an If-Match header; None when absent or `*`"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Malformed If-Match header")
+
+
+def conflict_error(e: VersionConflict, expected_version: Optional[int]) -> HTTPException:
+    """412 when the client's If-Match failed, 409 when a concurrent write won"""
+    status_code = 412 if expected_version is not None else 409
+    return HTTPException(status_code=status_code, detail=str(e))
@@ -0,0 +1,116 @@
+"""
+Idempotency-Key support for write endpoints: the first response is stored and
+replayed for retries, and concurrent duplicates wait for the original
+"""
+import hashlib
+import json
+import time
+from typing import Any, Callable, Optional, Type
+
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app import crud, models
+from app.core.config import settings
+from app.models.idempotency_key import COMPLETED, EXECUTED, IN_PROGRESS
+
+POLL_INTERVAL_SECONDS = 0.05
+
+
+def _request_hash(payload: Any) -> str:
+    canonical = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _replay(row: models.IdempotencyKey) -> JSONResponse:
+    headers = {"Idempotent-Replayed": "true"}
+    if row.response_etag:
+        headers["ETag"] = row.response_etag
+    return JSONResponse(content=json.loads(row.response_body), status_code=row.response_status, headers=headers)
+
+
+def _wait_for_original(db: Session, row: models.IdempotencyKey) -> Optional[models.IdempotencyKey]:
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL_SECONDS)
+        db.rollback()  # start a fresh snapshot
+        current = crud.idempotency_key.get(db, scope=row.scope, key=row.key)
+        if current is None or current.status == COMPLETED:
+            return current
+    return row
+
+
+def idempotent(
+    db: Session,
+    *,
+    key: Optional[str],
+    scope: str,
+    current_user: models.User,
+    payload: Any,
+    response_model: Type[BaseModel],
+    execute: Callable[[], Any],
+    response: Optional[Response] = None,
+) -> Any:
+    """
+    Run `execute()` at most once per `(scope, user, key)`. Without a key it
+    simply runs. The first outcome (a result or a non-409 4xx error) is stored and
+    replayed to later requests with the same key; a duplicate that arrives
+    while the original is still running waits for it (up to
+    IDEMPOTENCY_WAIT_SECONDS, then 409). Reusing a key with a different
+    payload is rejected with 422.
+
+    A claim abandoned before its write committed (the worker died) is taken
+    over once its IDEMPOTENCY_LEASE_SECONDS lease runs out. One abandoned
+    after the write committed but before the response was stored is never
+    re-executed; retries get 409.
+    """
+    if not key:
+        return execute()
+
+    scope = f"{scope} user={current_user.id}"
+    request_hash = _request_hash(payload)
+    claimed, row = crud.idempotency_key.claim(db, scope=scope, key=key, request_hash=request_hash)
+    while not claimed:
+        if row.request_hash != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        if row.status == COMPLETED:
+            return _replay(row)
+        if row.status == EXECUTED and crud.idempotency_key.lease_expired(row):
+            raise HTTPException(
+                status_code=409,
+                detail="The request with this Idempotency-Key was applied but its response was not saved",
+            )
+        current = _wait_for_original(db, row)
+        if current is None or (current.status == IN_PROGRESS and crud.idempotency_key.lease_expired(current)):
+            # The original failed and released its claim, or was abandoned
+            # before writing anything; try to take over
+            claimed, row = crud.idempotency_key.claim(db, scope=scope, key=key, request_hash=request_hash)
+        elif current.status == COMPLETED:
+            return _replay(current)
+        else:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+
+    crud.idempotency_key.start(db, row=row)
+    try:
+        result = execute()
+    except HTTPException as e:
+        if e.status_code >= 500 or e.status_code == 409:
+            # Transient (a lost race or a server fault): let a retry run again
+            crud.idempotency_key.release(db, row=row)
+            raise
+        db.rollback()
+        crud.idempotency_key.complete(
+            db, row=row, status_code=e.status_code, body=json.dumps({"detail": e.detail})
+        )
+        raise
+    except Exception:
+        crud.idempotency_key.release(db, row=row)
+        raise
+
+    body = jsonable_encoder(response_model.model_validate(result))
+    etag = response.headers.get("ETag") if response is not None else None
+    crud.idempotency_key.complete(db, row=row, status_code=200, body=json.dumps(body), etag=etag)
+    return body
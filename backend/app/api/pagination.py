@@ -0,0 +1,22 @@
+"""
+Helpers for building paginated list responses
+"""
+import math
+from typing import Any, Dict, List, Tuple
+
+
+def page_envelope(items: List[Any], count: Tuple[int, bool], *, skip: int, limit: int) -> Dict[str, Any]:
+    """
+    Wrap an offset page as `schemas.PaginatedResponse` data. `count` is the
+    `(total, is_estimate)` pair returned by `CRUDBase.get_count_cached`.
+    """
+    total, estimated = count
+    size = max(limit, 1)
+    return {
+        "items": items,
+        "total": total,
+        "page": skip // size + 1,
+        "size": size,
+        "pages": math.ceil(total / size) if total else 0,
+        "total_is_estimate": estimated,
+    }
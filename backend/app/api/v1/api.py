@@ -7,6 +7,9 @@ from app.api.v1.endpoints import (
     books,
     customers,
     sales,
+    reservations,
+    changes,
+    analytics,
     health,
 )
 
@@ -18,3 +21,6 @@ api_router.include_router(categories.router, prefix="/categories", tags=["Catego
 api_router.include_router(books.router, prefix="/books", tags=["Books"])
 api_router.include_router(customers.router, prefix="/customers", tags=["Customers"])
 api_router.include_router(sales.router, prefix="/sales", tags=["Sales"])
+api_router.include_router(reservations.router, prefix="/reservations", tags=["Reservations"])
+api_router.include_router(changes.router, prefix="/changes", tags=["Changes"])
+api_router.include_router(analytics.router, prefix="/analytics", tags=["Analytics"])
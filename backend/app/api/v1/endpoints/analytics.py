@@ -0,0 +1,68 @@
+from datetime import date
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app import models, schemas
+from app.analytics.cube import DIMENSIONS, MEASURES, sales_cube
+from app.core.auth import get_db, get_current_user
+from app.core.config import settings
+from app.core.permissions import PermissionChecker
+
+router = APIRouter()
+
+
+def _split(values: Optional[List[str]]) -> List[str]:
+    return [v.strip() for value in values or [] for v in value.split(",") if v.strip()]
+
+
+def _ids(values: Optional[List[str]], name: str) -> List[int]:
+    try:
+        return [int(v) for v in _split(values)]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be integer IDs")
+
+
+@router.get("/query", response_model=schemas.AnalyticsResult)
+def query_sales(
+    db: Session = Depends(get_db),
+    dimensions: Optional[List[str]] = Query(
+        None, description=f"Group by any of: {', '.join(DIMENSIONS)}; comma-separated or repeated"
+    ),
+    measures: Optional[List[str]] = Query(
+        None, description=f"Any of: {', '.join(MEASURES)} (default revenue,quantity); comma-separated or repeated"
+    ),
+    start_date: Optional[date] = Query(None, description="First sale date included"),
+    end_date: Optional[date] = Query(None, description="Last sale date included"),
+    category_ids: Optional[List[str]] = Query(None, description="Only these categories"),
+    customer_ids: Optional[List[str]] = Query(None, description="Only these customers"),
+    book_ids: Optional[List[str]] = Query(None, description="Only these books"),
+    pivot: Optional[str] = Query(None, description="Requested dimension to spread across columns"),
+    order_by: Optional[str] = Query(None, description="Measure or dimension to sort rows by; prefix with - for descending"),
+    limit: int = Query(1000, ge=1, le=settings.ANALYTICS_MAX_ROWS),
+    current_user: models.User = Depends(get_current_user),
+) -> Any:
+    """
+    Slice sales by date, month, year, category, customer and book (Admin
+    only). Served from an in-memory columnar cube that is loaded on first
+    use and kept current from the change feed, so the latest couple of
+    seconds of sales may not be included yet.
+    """
+    PermissionChecker.can_view_reports(current_user)
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="Start date must be before end date")
+    sales_cube.refresh(db, wait=not sales_cube.ready)
+    try:
+        return sales_cube.query(
+            dimensions=_split(dimensions),
+            measures=_split(measures) or ["revenue", "quantity"],
+            start=start_date,
+            end=end_date,
+            category_ids=_ids(category_ids, "category_ids"),
+            customer_ids=_ids(customer_ids, "customer_ids"),
+            book_ids=_ids(book_ids, "book_ids"),
+            pivot=pivot,
+            order_by=order_by,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,46 +1,137 @@
-from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime
+from typing import Any, List, Optional, Union
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from app import crud, models, schemas
 from app.core.auth import get_db, get_current_user, get_optional_current_user
 from app.core.permissions import PermissionChecker
 from app.core.config import settings
+from app.api.concurrency import conflict_error, parse_if_match, set_etag
+from app.api.idempotency import idempotent
+from app.api.pagination import page_envelope
+from app.crud.base import VersionConflict
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[schemas.Book])
+@router.get(
+    "/",
+    response_model=Union[
+        List[schemas.Book], schemas.CursorPage[schemas.Book], schemas.PaginatedResponse[schemas.Book]
+    ],
+)
 def read_books(
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(settings.DEFAULT_PAGE_SIZE, le=settings.MAX_PAGE_SIZE),
     category_id: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None, description="Keyset pagination cursor; send it empty to start"),
+    envelope: bool = Query(False, description="Wrap results as {items, total, page, size, pages}"),
 ) -> Any:
     """
     Retrieve books with optional category filtering (Public endpoint)
     """
+    if cursor is not None:
+        try:
+            if category_id:
+                books, next_cursor = crud.book.get_multi_by_field_keyset(
+                    db, field_name="category_id", value=category_id, cursor=cursor, limit=limit
+                )
+            else:
+                books, next_cursor = crud.book.get_multi_keyset(db, cursor=cursor, limit=limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"items": books, "next_cursor": next_cursor}
     if category_id:
         books = crud.book.get_by_category(db, category_id=category_id, skip=skip, limit=limit)
+        if envelope:
+            count = crud.book.get_count_cached(
+                db, filters=(models.Book.category_id == category_id,), filter_key=f"category_id={category_id}"
+            )
+            return page_envelope(books, count, skip=skip, limit=limit)
     else:
         books = crud.book.get_multi(db, skip=skip, limit=limit)
+        if envelope:
+            return page_envelope(books, crud.book.get_count_cached(db), skip=skip, limit=limit)
     return books
 
 
-@router.get("/search", response_model=List[schemas.Book])
+@router.get("/search", response_model=Union[List[schemas.Book], schemas.BookSearchResults])
 def search_books(
     db: Session = Depends(get_db),
     q: str = Query(..., min_length=1, description="Search query"),
     category_id: Optional[int] = Query(None),
+    ranked: bool = Query(True, description="Order results by relevance"),
+    fuzzy: bool = Query(False, description="Typo-tolerant title/author matching"),
+    facets: bool = Query(False, description="Also return category, stock and price facet counts"),
     skip: int = Query(0, ge=0),
     limit: int = Query(settings.DEFAULT_PAGE_SIZE, le=settings.MAX_PAGE_SIZE),
 ) -> Any:
     """
     Search books by title, author, or description (Public endpoint)
     """
-    books = crud.book.search_books(db, query=q, category_id=category_id, skip=skip, limit=limit)
+    # Which search produced the items, so the facets count the same matches
+    books, engine = None, "db"
+    if fuzzy:
+        books = crud.book.search_fuzzy(db, query=q, category_id=category_id, skip=skip, limit=limit)
+        engine = "fuzzy"
+    if books is None and ranked:
+        books = crud.book.search_ranked(db, query=q, category_id=category_id, skip=skip, limit=limit)
+        engine = "ranked"
+    if books is None:
+        books = crud.book.search_books(db, query=q, category_id=category_id, skip=skip, limit=limit)
+        engine = "db"
+    if facets:
+        return {
+            "items": books,
+            "facets": crud.book.search_facets(db, query=q, category_id=category_id, engine=engine),
+        }
     return books
 
 
+@router.get("/autocomplete", response_model=List[schemas.BookSuggestion])
+def autocomplete_books(
+    db: Session = Depends(get_db),
+    prefix: str = Query(..., min_length=1, description="Typed prefix of a title, author or ISBN"),
+    limit: int = Query(10, ge=1, le=50),
+) -> Any:
+    """
+    Suggest books whose title, author or ISBN starts with a prefix (Public endpoint)
+    """
+    return crud.book.autocomplete(db, prefix=prefix, limit=limit)
+
+
+@router.get("/by-isbn/{code}", response_model=schemas.Book)
+def read_book_by_isbn(
+    *,
+    db: Session = Depends(get_db),
+    code: str,
+) -> Any:
+    """
+    Get a book by scanned ISBN-10, ISBN-13 or hyphenated code (Public endpoint)
+    """
+    [(_, _, book)] = crud.book.lookup_isbns(db, codes=[code])
+    if not book:
+        raise HTTPException(status_code=404, detail="Book not found")
+    return book
+
+
+@router.post("/by-isbn", response_model=List[schemas.IsbnLookupResult])
+def read_books_by_isbn(
+    *,
+    db: Session = Depends(get_db),
+    lookup_in: schemas.IsbnLookupRequest,
+) -> Any:
+    """
+    Resolve a batch of scanned ISBN codes in one call (Public endpoint)
+    """
+    results = crud.book.lookup_isbns(db, codes=lookup_in.codes)
+    return [
+        {"code": code, "isbn13": isbn13, "book": book}
+        for code, isbn13, book in results
+    ]
+
+
 @router.get("/available", response_model=List[schemas.Book])
 def read_available_books(
     db: Session = Depends(get_db),
@@ -70,18 +161,22 @@ def read_low_stock_books(
     return books
 
 
-@router.get("/popular", response_model=List[dict])
+@router.get("/popular", response_model=List[schemas.PopularBook])
 def read_popular_books(
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, le=50),
+    days: Optional[int] = Query(None, ge=1, description="Only count the last N days (today included)"),
     current_user: models.User = Depends(get_optional_current_user),
 ) -> Any:
     """
     Retrieve most popular books by sales
     """
-    books = crud.book.get_popular_books(db, skip=skip, limit=limit)
-    return [{"book": book, "total_sold": total_sold} for book, total_sold in books]
+    books = crud.book.get_popular_books(db, days=days, skip=skip, limit=limit)
+    return [
+        {"book": book, "total_sold": total_sold, "total_revenue": total_revenue}
+        for book, total_sold, total_revenue in books
+    ]
 
 
 @router.post("/", response_model=schemas.Book)
@@ -115,11 +210,43 @@ def create_book(
     return book
 
 
+@router.post("/stock/receive", response_model=schemas.StockReceiptResponse)
+def receive_stock(
+    *,
+    db: Session = Depends(get_db),
+    receipt_in: schemas.StockReceiptCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    current_user: models.User = Depends(get_current_user),
+) -> Any:
+    """
+    Apply a supplier delivery: stock deltas by book ID or ISBN, all in one
+    transaction (Admin only). Returns the new stock level of every book touched.
+    """
+    PermissionChecker.can_manage_inventory(current_user)
+    
+    def execute():
+        lines = [(line.book_id, line.isbn, line.quantity_delta) for line in receipt_in.lines]
+        try:
+            levels = crud.book.receive_stock(db, lines=lines)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {
+            "received_lines": len(lines),
+            "books": [{"book_id": book_id, "stock": stock} for book_id, stock in levels.items()],
+        }
+    
+    return idempotent(
+        db, key=idempotency_key, scope="POST /books/stock/receive", current_user=current_user,
+        payload=receipt_in, response_model=schemas.StockReceiptResponse, execute=execute,
+    )
+
+
 @router.get("/{book_id}", response_model=schemas.BookWithCategory)
 def read_book(
     *,
     db: Session = Depends(get_db),
     book_id: int,
+    response: Response,
 ) -> Any:
     """
     Get book by ID with category information (Public endpoint)
@@ -127,6 +254,7 @@ def read_book(
     book = crud.book.get(db, id=book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
+    set_etag(response, book)
     return book
 
 
@@ -136,10 +264,13 @@ def update_book(
     db: Session = Depends(get_db),
     book_id: int,
     book_in: schemas.BookUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: models.User = Depends(get_current_user),
 ) -> Any:
     """
-    Update a book (Admin only)
+    Update a book (Admin only). Send the book's ETag as If-Match to fail with
+    412 instead of overwriting someone else's change.
     """
     PermissionChecker.can_manage_inventory(current_user)
     
@@ -150,7 +281,7 @@ def update_book(
     # Check ISBN uniqueness
     if book_in.isbn and book_in.isbn != book.isbn:
         existing_book = crud.book.get_by_isbn(db, isbn=book_in.isbn)
-        if existing_book:
+        if existing_book and existing_book.id != book.id:
             raise HTTPException(
                 status_code=400,
                 detail="A book with this ISBN already exists."
@@ -162,7 +293,12 @@ def update_book(
         if not category:
             raise HTTPException(status_code=400, detail="Category not found")
     
-    book = crud.book.update(db, db_obj=book, obj_in=book_in)
+    expected_version = parse_if_match(if_match)
+    try:
+        book = crud.book.update(db, db_obj=book, obj_in=book_in, expected_version=expected_version)
+    except VersionConflict as e:
+        raise conflict_error(e, expected_version)
+    set_etag(response, book)
     return book
 
 
@@ -172,17 +308,77 @@ def update_book_stock(
     db: Session = Depends(get_db),
     book_id: int,
     quantity_change: int,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     current_user: models.User = Depends(get_current_user),
 ) -> Any:
     """
-    Update book stock (Admin only)
+    Update book stock (Admin only). Without If-Match, lost races are retried
+    automatically; with it, a stale version fails with 412. Retries sent with
+    the same Idempotency-Key replay the first response instead of applying
+    the delta twice.
     """
     PermissionChecker.can_manage_inventory(current_user)
     
-    book = crud.book.update_stock(db, book_id=book_id, quantity_change=quantity_change)
-    if not book:
+    expected_version = parse_if_match(if_match)
+    
+    def execute():
+        try:
+            book = crud.book.update_stock(
+                db, book_id=book_id, quantity_change=quantity_change, expected_version=expected_version
+            )
+        except VersionConflict as e:
+            raise conflict_error(e, expected_version)
+        if not book:
+            raise HTTPException(status_code=404, detail="Book not found")
+        set_etag(response, book)
+        return book
+    
+    return idempotent(
+        db, key=idempotency_key, scope=f"PUT /books/{book_id}/stock", current_user=current_user,
+        payload={"quantity_change": quantity_change, "if_match": expected_version},
+        response_model=schemas.Book, execute=execute, response=response,
+    )
+
+
+@router.get("/{book_id}/stock/history", response_model=List[schemas.InventoryMovement])
+def read_book_stock_history(
+    *,
+    db: Session = Depends(get_db),
+    book_id: int,
+    start: Optional[datetime] = Query(None, description="Include movements at or after this time"),
+    end: Optional[datetime] = Query(None, description="Include movements before this time"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, le=settings.MAX_PAGE_SIZE),
+    current_user: models.User = Depends(get_current_user),
+) -> Any:
+    """
+    Inventory ledger entries for a book, newest first (Admin only)
+    """
+    PermissionChecker.can_manage_inventory(current_user)
+    
+    if not crud.book.get(db, id=book_id):
         raise HTTPException(status_code=404, detail="Book not found")
-    return book
+    return crud.inventory.get_movements(db, book_id=book_id, start=start, end=end, skip=skip, limit=limit)
+
+
+@router.get("/{book_id}/stock/at", response_model=schemas.StockAt)
+def read_book_stock_at(
+    *,
+    db: Session = Depends(get_db),
+    book_id: int,
+    at: datetime = Query(..., description="Point in time (UTC)"),
+    current_user: models.User = Depends(get_current_user),
+) -> Any:
+    """
+    Stock level of a book at a point in time, from the inventory ledger (Admin only)
+    """
+    PermissionChecker.can_manage_inventory(current_user)
+    
+    if not crud.book.get(db, id=book_id):
+        raise HTTPException(status_code=404, detail="Book not found")
+    return {"book_id": book_id, "at": at, "stock": crud.inventory.stock_at(db, book_id=book_id, at=at)}
 
 
 @router.delete("/{book_id}", response_model=schemas.MessageResponse)
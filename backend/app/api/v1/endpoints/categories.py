@@ -1,24 +1,40 @@
-from typing import Any, List
+from typing import Any, List, Optional, Union
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from app import crud, models, schemas
 from app.core.auth import get_db, get_current_user, get_current_superuser
 from app.core.permissions import PermissionChecker
 from app.core.config import settings
+from app.api.pagination import page_envelope
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[schemas.Category])
+@router.get(
+    "/",
+    response_model=Union[
+        List[schemas.Category], schemas.CursorPage[schemas.Category], schemas.PaginatedResponse[schemas.Category]
+    ],
+)
 def read_categories(
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(settings.DEFAULT_PAGE_SIZE, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Keyset pagination cursor; send it empty to start"),
+    envelope: bool = Query(False, description="Wrap results as {items, total, page, size, pages}"),
 ) -> Any:
     """
     Retrieve categories (Public endpoint)
     """
+    if cursor is not None:
+        try:
+            categories, next_cursor = crud.category.get_multi_keyset(db, cursor=cursor, limit=limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"items": categories, "next_cursor": next_cursor}
     categories = crud.category.get_multi(db, skip=skip, limit=limit)
+    if envelope:
+        return page_envelope(categories, crud.category.get_count_cached(db), skip=skip, limit=limit)
     return categories
 
 
@@ -0,0 +1,33 @@
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app import crud, models, schemas
+from app.core.auth import get_db, get_current_user
+from app.core.config import settings
+from app.core.permissions import PermissionChecker
+
+router = APIRouter()
+
+
+@router.get("/", response_model=schemas.ChangeFeed)
+def read_changes(
+    db: Session = Depends(get_db),
+    since: Optional[str] = Query(None, description="Cursor from the previous page; omit to start from the oldest event"),
+    types: Optional[List[str]] = Query(
+        None, description="Topics (sale, stock, book, customer) or event types like book.deleted; comma-separated or repeated"
+    ),
+    limit: int = Query(settings.CHANGES_PAGE_SIZE, ge=1, le=settings.CHANGES_MAX_PAGE_SIZE),
+    current_user: models.User = Depends(get_current_user),
+) -> Any:
+    """
+    Ordered feed of sale, stock, book and customer changes for incremental
+    sync (Admin only). Keep calling with `since=next_cursor`; an empty page
+    means you are caught up.
+    """
+    PermissionChecker.can_view_reports(current_user)
+    type_list = [t.strip() for value in types or [] for t in value.split(",") if t.strip()]
+    try:
+        events, next_cursor, has_more = crud.outbox.get_changes(db, since=since, types=type_list, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": events, "next_cursor": next_cursor, "has_more": has_more}
@@ -1,26 +1,42 @@
-from typing import Any, List
+from typing import Any, List, Optional, Union
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from app import crud, models, schemas
 from app.core.auth import get_db, get_current_user
 from app.core.permissions import PermissionChecker
 from app.core.config import settings
+from app.api.pagination import page_envelope
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[schemas.Customer])
+@router.get(
+    "/",
+    response_model=Union[
+        List[schemas.Customer], schemas.CursorPage[schemas.Customer], schemas.PaginatedResponse[schemas.Customer]
+    ],
+)
 def read_customers(
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(settings.DEFAULT_PAGE_SIZE, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Keyset pagination cursor; send it empty to start"),
+    envelope: bool = Query(False, description="Wrap results as {items, total, page, size, pages}"),
     current_user: models.User = Depends(get_current_user),
 ) -> Any:
     """
     Retrieve customers (Admin only)
     """
     PermissionChecker.can_view_all_customers(current_user)
+    if cursor is not None:
+        try:
+            customers, next_cursor = crud.customer.get_multi_keyset(db, cursor=cursor, limit=limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"items": customers, "next_cursor": next_cursor}
     customers = crud.customer.get_multi(db, skip=skip, limit=limit)
+    if envelope:
+        return page_envelope(customers, crud.customer.get_count_cached(db), skip=skip, limit=limit)
     return customers
 
 
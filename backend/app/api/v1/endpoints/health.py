@@ -5,6 +5,7 @@ from sqlalchemy import text
 from app.core.config import settings
 from app.database import get_db
 from app import schemas
+from app.search.cache import search_cache
 
 router = APIRouter()
 
@@ -26,3 +27,11 @@ def health_check(db: Session = Depends(get_db)):
         "timestamp": datetime.utcnow().isoformat(),
         "version": settings.VERSION
     }
+
+
+@router.get("/search-cache", response_model=dict)
+def search_cache_stats():
+    """
+    Search result cache counters (hits, misses, evictions) for monitoring
+    """
+    return search_cache.stats()
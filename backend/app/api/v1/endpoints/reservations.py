@@ -0,0 +1,109 @@
+from typing import Any
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app import crud, models, schemas
+from app.core.auth import get_db, get_current_user
+from app.core.permissions import PermissionChecker
+
+router = APIRouter()
+
+
+def _get_reservation(db: Session, reservation_id: int) -> models.Reservation:
+    reservation = crud.reservation.get(db, id=reservation_id)
+    if not reservation:
+        raise HTTPException(status_code=404, detail="Reservation not found")
+    return reservation
+
+
+@router.post("/", response_model=schemas.Reservation)
+def create_reservation(
+    *,
+    db: Session = Depends(get_db),
+    reservation_in: schemas.ReservationCreate,
+    current_user: models.User = Depends(get_current_user),
+) -> Any:
+    """
+    Hold stock for a cart until checkout (All authenticated users)
+    """
+    PermissionChecker.can_create_sale(current_user)
+    
+    # Verify customer exists (if provided)
+    if reservation_in.customer_id:
+        customer = crud.customer.get(db, id=reservation_in.customer_id)
+        if not customer:
+            raise HTTPException(status_code=404, detail="Customer not found")
+    
+    try:
+        return crud.reservation.create_reservation(db, obj_in=reservation_in)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/{reservation_id}", response_model=schemas.Reservation)
+def read_reservation(
+    *,
+    db: Session = Depends(get_db),
+    reservation_id: int,
+    current_user: models.User = Depends(get_current_user),
+) -> Any:
+    """
+    Get a reservation (All authenticated users)
+    """
+    PermissionChecker.can_create_sale(current_user)
+    return _get_reservation(db, reservation_id)
+
+
+@router.post("/{reservation_id}/extend", response_model=schemas.Reservation)
+def extend_reservation(
+    *,
+    db: Session = Depends(get_db),
+    reservation_id: int,
+    extend_in: schemas.ReservationExtend,
+    current_user: models.User = Depends(get_current_user),
+) -> Any:
+    """
+    Push back the expiry of an active reservation (All authenticated users)
+    """
+    PermissionChecker.can_create_sale(current_user)
+    reservation = _get_reservation(db, reservation_id)
+    try:
+        return crud.reservation.extend(db, reservation=reservation, ttl_seconds=extend_in.ttl_seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/{reservation_id}/release", response_model=schemas.Reservation)
+def release_reservation(
+    *,
+    db: Session = Depends(get_db),
+    reservation_id: int,
+    current_user: models.User = Depends(get_current_user),
+) -> Any:
+    """
+    Return held stock to sale (All authenticated users)
+    """
+    PermissionChecker.can_create_sale(current_user)
+    reservation = _get_reservation(db, reservation_id)
+    try:
+        return crud.reservation.release(db, reservation=reservation)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/{reservation_id}/convert", response_model=schemas.Sale)
+def convert_reservation(
+    *,
+    db: Session = Depends(get_db),
+    reservation_id: int,
+    convert_in: schemas.ReservationConvert,
+    current_user: models.User = Depends(get_current_user),
+) -> Any:
+    """
+    Complete checkout of a reservation as a sale (All authenticated users)
+    """
+    PermissionChecker.can_create_sale(current_user)
+    reservation = _get_reservation(db, reservation_id)
+    try:
+        return crud.reservation.convert_to_sale(db, reservation=reservation, obj_in=convert_in)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
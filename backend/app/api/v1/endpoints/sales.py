@@ -1,27 +1,46 @@
-from typing import Any, List, Optional
+from typing import Any, List, Optional, Union
 from datetime import date, datetime
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from app import crud, models, schemas
 from app.core.auth import get_db, get_current_user
 from app.core.permissions import PermissionChecker
 from app.core.config import settings
+from app.api.concurrency import conflict_error, parse_if_match, set_etag
+from app.api.idempotency import idempotent
+from app.api.pagination import page_envelope
+from app.crud.base import VersionConflict
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[schemas.SaleDetail])
+@router.get(
+    "/",
+    response_model=Union[
+        List[schemas.SaleDetail], schemas.CursorPage[schemas.SaleDetail], schemas.PaginatedResponse[schemas.SaleDetail]
+    ],
+)
 def read_sales(
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(settings.DEFAULT_PAGE_SIZE, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Keyset pagination cursor; send it empty to start"),
+    envelope: bool = Query(False, description="Wrap results as {items, total, page, size, pages}"),
     current_user: models.User = Depends(get_current_user),
 ) -> Any:
     """
     Retrieve sales with details (Admin only)
     """
     PermissionChecker.can_view_all_sales(current_user)
+    if cursor is not None:
+        try:
+            sales, next_cursor = crud.sale.get_sales_with_details_keyset(db, cursor=cursor, limit=limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"items": sales, "next_cursor": next_cursor}
     sales = crud.sale.get_sales_with_details(db, skip=skip, limit=limit)
+    if envelope:
+        return page_envelope(sales, crud.sale.get_count_cached(db), skip=skip, limit=limit)
     return sales
 
 
@@ -75,10 +94,10 @@ def read_daily_sales_report(
     ]
 
 
-@router.get("/top-books", response_model=List[dict])
+@router.get("/top-books", response_model=List[schemas.PopularBook])
 def read_top_selling_books(
     db: Session = Depends(get_db),
-    days: Optional[int] = Query(None, ge=1, description="Filter by last N days"),
+    days: Optional[int] = Query(None, ge=1, description="Only count the last N days (today included)"),
     limit: int = Query(10, le=50),
     current_user: models.User = Depends(get_current_user),
 ) -> Any:
@@ -90,19 +109,24 @@ def read_top_selling_books(
     return [
         {
             "book": book,
-            "total_sold": int(total_sold),
-            "total_revenue": float(total_revenue)
+            "total_sold": total_sold,
+            "total_revenue": total_revenue
         }
         for book, total_sold, total_revenue in books
     ]
 
 
-@router.get("/customer/{customer_id}", response_model=List[schemas.Sale])
+@router.get(
+    "/customer/{customer_id}",
+    response_model=Union[List[schemas.Sale], schemas.CursorPage[schemas.Sale], schemas.PaginatedResponse[schemas.Sale]],
+)
 def read_customer_sales(
     customer_id: int,
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(settings.DEFAULT_PAGE_SIZE, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Keyset pagination cursor; send it empty to start"),
+    envelope: bool = Query(False, description="Wrap results as {items, total, page, size, pages}"),
     current_user: models.User = Depends(get_current_user),
 ) -> Any:
     """
@@ -115,16 +139,34 @@ def read_customer_sales(
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     
+    if cursor is not None:
+        try:
+            sales, next_cursor = crud.sale.get_multi_by_field_keyset(
+                db, field_name="customer_id", value=customer_id, cursor=cursor, limit=limit
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"items": sales, "next_cursor": next_cursor}
     sales = crud.sale.get_sales_by_customer(db, customer_id=customer_id, skip=skip, limit=limit)
+    if envelope:
+        count = crud.sale.get_count_cached(
+            db, filters=(models.Sale.customer_id == customer_id,), filter_key=f"customer_id={customer_id}"
+        )
+        return page_envelope(sales, count, skip=skip, limit=limit)
     return sales
 
 
-@router.get("/book/{book_id}", response_model=List[schemas.Sale])
+@router.get(
+    "/book/{book_id}",
+    response_model=Union[List[schemas.Sale], schemas.CursorPage[schemas.Sale], schemas.PaginatedResponse[schemas.Sale]],
+)
 def read_book_sales(
     book_id: int,
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(settings.DEFAULT_PAGE_SIZE, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Keyset pagination cursor; send it empty to start"),
+    envelope: bool = Query(False, description="Wrap results as {items, total, page, size, pages}"),
     current_user: models.User = Depends(get_current_user),
 ) -> Any:
     """
@@ -137,7 +179,20 @@ def read_book_sales(
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     
+    if cursor is not None:
+        try:
+            sales, next_cursor = crud.sale.get_multi_by_field_keyset(
+                db, field_name="book_id", value=book_id, cursor=cursor, limit=limit
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"items": sales, "next_cursor": next_cursor}
     sales = crud.sale.get_sales_by_book(db, book_id=book_id, skip=skip, limit=limit)
+    if envelope:
+        count = crud.sale.get_count_cached(
+            db, filters=(models.Sale.book_id == book_id,), filter_key=f"book_id={book_id}"
+        )
+        return page_envelope(sales, count, skip=skip, limit=limit)
     return sales
 
 
@@ -146,29 +201,68 @@ def create_sale(
     *,
     db: Session = Depends(get_db),
     sale_in: schemas.SaleCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     current_user: models.User = Depends(get_current_user),
 ) -> Any:
     """
-    Create new sale (All authenticated users)
+    Check out a basket of items as one sale (All authenticated users).
+    Retries sent with the same Idempotency-Key replay the first response.
     """
     PermissionChecker.can_create_sale(current_user)
     
-    # Verify book exists
-    book = crud.book.get(db, id=sale_in.book_id)
-    if not book:
-        raise HTTPException(status_code=404, detail="Book not found")
+    def execute():
+        # Verify customer exists (if provided)
+        if sale_in.customer_id:
+            customer = crud.customer.get(db, id=sale_in.customer_id)
+            if not customer:
+                raise HTTPException(status_code=404, detail="Customer not found")
+        
+        try:
+            if settings.GROUP_COMMIT_ENABLED:
+                return crud.sale.create_sale_grouped(db, obj_in=sale_in)
+            return crud.sale.create_sale(db, obj_in=sale_in)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     
-    # Verify customer exists (if provided)
-    if sale_in.customer_id:
-        customer = crud.customer.get(db, id=sale_in.customer_id)
-        if not customer:
-            raise HTTPException(status_code=404, detail="Customer not found")
+    return idempotent(
+        db, key=idempotency_key, scope="POST /sales/", current_user=current_user,
+        payload=sale_in, response_model=schemas.Sale, execute=execute,
+    )
+
+
+@router.post("/batch", response_model=schemas.SaleBatchResponse)
+def create_sales_batch(
+    *,
+    db: Session = Depends(get_db),
+    batch_in: schemas.SaleBatchCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    current_user: models.User = Depends(get_current_user),
+) -> Any:
+    """
+    Upload many sales at once, e.g. a POS terminal's end-of-day sync
+    (All authenticated users). Invalid or short-stock entries are reported
+    per row without aborting the rest of the batch. Retries sent with the
+    same Idempotency-Key replay the first response.
+    """
+    PermissionChecker.can_create_sale(current_user)
     
-    try:
-        sale = crud.sale.create_sale(db, obj_in=sale_in)
-        return sale
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    def execute():
+        try:
+            outcomes = crud.sale.create_sales_batch(db, entries=batch_in.sales)
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        
+        results = [
+            {"index": index, "success": error is None, "sale_id": sale_id, "error": error}
+            for index, (sale_id, error) in enumerate(outcomes)
+        ]
+        created = sum(1 for r in results if r["success"])
+        return {"created": created, "failed": len(results) - created, "results": results}
+    
+    return idempotent(
+        db, key=idempotency_key, scope="POST /sales/batch", current_user=current_user,
+        payload=batch_in, response_model=schemas.SaleBatchResponse, execute=execute,
+    )
 
 
 @router.get("/{sale_id}", response_model=schemas.SaleDetail)
@@ -176,6 +270,7 @@ def read_sale(
     *,
     db: Session = Depends(get_db),
     sale_id: int,
+    response: Response,
     current_user: models.User = Depends(get_current_user),
 ) -> Any:
     """
@@ -186,6 +281,7 @@ def read_sale(
     sale = crud.sale.get(db, id=sale_id)
     if not sale:
         raise HTTPException(status_code=404, detail="Sale not found")
+    set_etag(response, sale)
     return sale
 
 
@@ -195,10 +291,13 @@ def update_sale(
     db: Session = Depends(get_db),
     sale_id: int,
     sale_in: schemas.SaleUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: models.User = Depends(get_current_user),
 ) -> Any:
     """
-    Update a sale (Admin only)
+    Update a sale (Admin only). Send the sale's ETag as If-Match to fail with
+    412 instead of overwriting someone else's change.
     """
     PermissionChecker.can_view_all_sales(current_user)
     
@@ -206,26 +305,18 @@ def update_sale(
     if not sale:
         raise HTTPException(status_code=404, detail="Sale not found")
     
-    # If changing book or quantity, validate book exists and stock
-    if sale_in.book_id or sale_in.quantity:
-        book_id = sale_in.book_id or sale.book_id
-        new_quantity = sale_in.quantity or sale.quantity
-        old_quantity = sale.quantity
-        
-        book = crud.book.get(db, id=book_id)
-        if not book:
-            raise HTTPException(status_code=404, detail="Book not found")
-        
-        # Calculate stock change
-        quantity_diff = new_quantity - old_quantity
-        if quantity_diff > book.stock:
-            raise HTTPException(status_code=400, detail="Insufficient stock")
-        
-        # Update book stock
-        if quantity_diff != 0:
-            crud.book.update_stock(db, book_id=book_id, quantity_change=-quantity_diff)
+    # Verify customer exists (if provided)
+    if sale_in.customer_id:
+        customer = crud.customer.get(db, id=sale_in.customer_id)
+        if not customer:
+            raise HTTPException(status_code=404, detail="Customer not found")
     
-    sale = crud.sale.update(db, db_obj=sale, obj_in=sale_in)
+    expected_version = parse_if_match(if_match)
+    try:
+        sale = crud.sale.update(db, db_obj=sale, obj_in=sale_in, expected_version=expected_version)
+    except VersionConflict as e:
+        raise conflict_error(e, expected_version)
+    set_etag(response, sale)
     return sale
 
 
@@ -245,8 +336,57 @@ def delete_sale(
     if not sale:
         raise HTTPException(status_code=404, detail="Sale not found")
     
-    # Restore book stock
-    crud.book.update_stock(db, book_id=sale.book_id, quantity_change=sale.quantity)
+    # Delete the sale and restore book stock
+    crud.sale.remove_sale(db, sale=sale)
+    return {"message": "Sale deleted successfully and stock restored", "success": True}
+
+@router.get("/{sale_id}/returns", response_model=List[schemas.SaleReturn])
+def read_sale_returns(
+    *,
+    db: Session = Depends(get_db),
+    sale_id: int,
+    current_user: models.User = Depends(get_current_user),
+) -> Any:
+    """
+    List the returns recorded against a sale (Admin only)
+    """
+    PermissionChecker.can_view_all_sales(current_user)
+    
+    sale = crud.sale.get(db, id=sale_id)
+    if not sale:
+        raise HTTPException(status_code=404, detail="Sale not found")
+    return crud.sale_return.get_by_sale(db, sale_id=sale_id)
+
+
+@router.post("/{sale_id}/returns", response_model=schemas.SaleReturn)
+def create_sale_return(
+    *,
+    db: Session = Depends(get_db),
+    sale_id: int,
+    return_in: schemas.SaleReturnCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    current_user: models.User = Depends(get_current_user),
+) -> Any:
+    """
+    Return some or all units of a sale's lines and record the refund
+    (Admin only). Stock is restored in the same transaction and the sale is
+    kept, so reports show it net of the return. Retries sent with the same
+    Idempotency-Key replay the first response.
+    """
+    PermissionChecker.can_view_all_sales(current_user)
+    
+    def execute():
+        sale = crud.sale.get(db, id=sale_id)
+        if not sale:
+            raise HTTPException(status_code=404, detail="Sale not found")
+        try:
+            return crud.sale_return.create_return(
+                db, sale=sale, obj_in=return_in, created_by_id=current_user.id
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     
-    crud.sale.remove(db, id=sale_id)
-    return {"message": "Sale deleted successfully and stock restored", "success": True}
\ No newline at end of file
+    return idempotent(
+        db, key=idempotency_key, scope=f"POST /sales/{sale_id}/returns", current_user=current_user,
+        payload=return_in, response_model=schemas.SaleReturn, execute=execute,
+    )
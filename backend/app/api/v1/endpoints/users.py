@@ -1,25 +1,41 @@
-from typing import Any, List
+from typing import Any, List, Optional, Union
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from app import crud, models, schemas
 from app.core.auth import get_db, get_current_user, get_current_superuser
 from app.core.permissions import PermissionChecker
 from app.core.config import settings
+from app.api.pagination import page_envelope
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[schemas.User])
+@router.get(
+    "/",
+    response_model=Union[
+        List[schemas.User], schemas.CursorPage[schemas.User], schemas.PaginatedResponse[schemas.User]
+    ],
+)
 def read_users(
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(settings.DEFAULT_PAGE_SIZE, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Keyset pagination cursor; send it empty to start"),
+    envelope: bool = Query(False, description="Wrap results as {items, total, page, size, pages}"),
     current_user: models.User = Depends(get_current_superuser),
 ) -> Any:
     """
     Retrieve users (Admin only)
     """
+    if cursor is not None:
+        try:
+            users, next_cursor = crud.user.get_multi_keyset(db, cursor=cursor, limit=limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"items": users, "next_cursor": next_cursor}
     users = crud.user.get_multi(db, skip=skip, limit=limit)
+    if envelope:
+        return page_envelope(users, crud.user.get_count_cached(db), skip=skip, limit=limit)
     return users
 
 
@@ -0,0 +1,148 @@
+"""
+Periodic maintenance jobs run inside the API process
+"""
+import asyncio
+import logging
+from typing import Callable, List, Optional
+
+from app.core.config import settings
+from app.db.utils import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Runs a blocking `func()` every `interval_seconds` in a worker thread so
+    the event loop never waits on the database. Failures are logged and the
+    schedule continues.
+    """
+
+    def __init__(self, name: str, interval_seconds: float, func: Callable[[], None]):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await asyncio.to_thread(self.func)
+            except Exception as e:
+                logger.error(f"Background task {self.name} failed: {e}", exc_info=True)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def expire_reservations() -> None:
+    """Release overdue stock holds, one bounded transaction at a time"""
+    from app.crud.crud_reservation import reservation as crud_reservation
+
+    total = 0
+    with DatabaseManager() as db:
+        while True:
+            expired = crud_reservation.expire_due(db)
+            total += expired
+            if expired < settings.RESERVATION_SWEEP_BATCH_SIZE:
+                break
+    if total:
+        logger.info(f"Expired {total} stock reservations")
+
+
+def purge_idempotency_keys() -> None:
+    """Drop stored Idempotency-Key responses past their TTL"""
+    from app.crud.crud_idempotency import idempotency_key as crud_idempotency_key
+
+    with DatabaseManager() as db:
+        removed = crud_idempotency_key.purge_expired(db)
+    if removed:
+        logger.info(f"Purged {removed} expired idempotency keys")
+
+
+def take_stock_snapshots() -> None:
+    """Roll per-book stock snapshots forward over the inventory ledger"""
+    from app.crud.crud_inventory import inventory as crud_inventory
+
+    with DatabaseManager() as db:
+        written = crud_inventory.take_snapshots(db)
+    if written:
+        logger.info(f"Wrote {written} stock snapshots")
+
+
+def clean_outbox() -> None:
+    """Compact superseded book/customer events and drop events past retention"""
+    from app.crud.crud_outbox import outbox as crud_outbox
+
+    with DatabaseManager() as db:
+        compacted = crud_outbox.compact(db)
+        purged = crud_outbox.purge_expired(db)
+    if compacted or purged:
+        logger.info(f"Outbox cleanup: compacted {compacted}, purged {purged} events")
+
+
+def relay_outbox() -> None:
+    """Number newly committed outbox events so the change feed serves them in commit order"""
+    from app.crud.crud_outbox import outbox as crud_outbox
+
+    with DatabaseManager() as db:
+        crud_outbox.relay(db)
+
+
+def sync_search_indexes() -> None:
+    """Apply book changes made by other workers to this worker's search indexes"""
+    from app.search.indexes import sync_search_indexes as sync_indexes
+
+    with DatabaseManager() as db:
+        sync_indexes(db)
+
+
+def resync_leaderboard() -> None:
+    """Rebuild the in-memory sales leaderboard from the daily sales rollup"""
+    from app.analytics.leaderboard import warm_leaderboard
+
+    with DatabaseManager() as db:
+        warm_leaderboard(db)
+
+
+def refresh_sales_cube() -> None:
+    """Apply recent sale and book changes to the analytics cube, once it has been loaded"""
+    from app.analytics.cube import sales_cube
+
+    if not sales_cube.ready:
+        return
+    with DatabaseManager() as db:
+        sales_cube.refresh(db, wait=False)
+
+
+background_tasks: List[PeriodicTask] = [
+    PeriodicTask("expire-reservations", settings.RESERVATION_SWEEP_INTERVAL_SECONDS, expire_reservations),
+    PeriodicTask("purge-idempotency-keys", settings.IDEMPOTENCY_CLEANUP_INTERVAL_SECONDS, purge_idempotency_keys),
+    PeriodicTask("stock-snapshots", settings.STOCK_SNAPSHOT_INTERVAL_SECONDS, take_stock_snapshots),
+    PeriodicTask("outbox-relay", settings.OUTBOX_RELAY_INTERVAL_SECONDS, relay_outbox),
+    PeriodicTask("outbox-cleanup", settings.OUTBOX_CLEANUP_INTERVAL_SECONDS, clean_outbox),
+    PeriodicTask("search-index-sync", settings.SEARCH_INDEX_SYNC_SECONDS, sync_search_indexes),
+    PeriodicTask("leaderboard-resync", settings.LEADERBOARD_RESYNC_SECONDS, resync_leaderboard),
+    PeriodicTask("analytics-refresh", settings.ANALYTICS_REFRESH_SECONDS, refresh_sales_cube),
+]
+
+
+def start_background_tasks() -> None:
+    for task in background_tasks:
+        task.start()
+
+
+async def stop_background_tasks() -> None:
+    for task in background_tasks:
+        await task.stop()
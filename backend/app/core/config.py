@@ -38,6 +38,85 @@ class Settings(BaseSettings):
     # Pagination settings
     DEFAULT_PAGE_SIZE: int = Field(20, env="DEFAULT_PAGE_SIZE")
     MAX_PAGE_SIZE: int = Field(100, env="MAX_PAGE_SIZE")
+    # Totals for paginated responses: cache lifetime, and the table size above
+    # which unfiltered totals come from the planner's row estimate instead of COUNT(*)
+    COUNT_CACHE_TTL_SECONDS: int = Field(30, env="COUNT_CACHE_TTL_SECONDS")
+    COUNT_ESTIMATE_THRESHOLD: int = Field(1_000_000, env="COUNT_ESTIMATE_THRESHOLD")
+    
+    # Search result cache: number of cached queries per worker, how long an
+    # entry may be served, and how often the change feed is checked for
+    # catalog writes made by other workers
+    SEARCH_CACHE_SIZE: int = Field(2048, env="SEARCH_CACHE_SIZE")
+    SEARCH_CACHE_TTL_SECONDS: float = Field(300.0, env="SEARCH_CACHE_TTL_SECONDS")
+    SEARCH_CACHE_SYNC_SECONDS: float = Field(1.0, env="SEARCH_CACHE_SYNC_SECONDS")
+    # How often each worker applies other workers' book changes from the
+    # change feed to its in-memory search indexes
+    SEARCH_INDEX_SYNC_SECONDS: float = Field(5.0, env="SEARCH_INDEX_SYNC_SECONDS")
+
+    # Maximum number of sales accepted by one POST /sales/batch call
+    SALES_BATCH_MAX_SIZE: int = Field(5000, env="SALES_BATCH_MAX_SIZE")
+    # Group commit for POST /sales/ (opt-in): sales queued by concurrent
+    # requests are written by one thread and committed together once
+    # GROUP_COMMIT_MAX_BATCH are queued or GROUP_COMMIT_MAX_DELAY_MS has passed
+    GROUP_COMMIT_ENABLED: bool = Field(False, env="GROUP_COMMIT_ENABLED")
+    GROUP_COMMIT_MAX_BATCH: int = Field(64, env="GROUP_COMMIT_MAX_BATCH")
+    GROUP_COMMIT_MAX_DELAY_MS: float = Field(2.0, env="GROUP_COMMIT_MAX_DELAY_MS")
+    # Maximum number of lines accepted by one POST /books/stock/receive call
+    STOCK_RECEIVE_MAX_LINES: int = Field(20000, env="STOCK_RECEIVE_MAX_LINES")
+
+    # Stock reservations: default and maximum hold time, and how often / how
+    # many expired holds the background sweep releases per transaction
+    RESERVATION_TTL_SECONDS: int = Field(900, env="RESERVATION_TTL_SECONDS")
+    RESERVATION_MAX_TTL_SECONDS: int = Field(3600, env="RESERVATION_MAX_TTL_SECONDS")
+    RESERVATION_SWEEP_INTERVAL_SECONDS: int = Field(30, env="RESERVATION_SWEEP_INTERVAL_SECONDS")
+    RESERVATION_SWEEP_BATCH_SIZE: int = Field(1000, env="RESERVATION_SWEEP_BATCH_SIZE")
+
+    # Attempts for a stock delta that loses a compare-and-swap race before
+    # the request fails with 409
+    STOCK_UPDATE_MAX_RETRIES: int = Field(5, env="STOCK_UPDATE_MAX_RETRIES")
+
+    # Idempotency-Key handling: how long stored responses are replayed, how
+    # long a duplicate waits for the in-flight original, how long a claim is
+    # held before a retry may take it over (keep it above the slowest
+    # idempotent request), and the purge interval
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = Field(86400, env="IDEMPOTENCY_KEY_TTL_SECONDS")
+    IDEMPOTENCY_WAIT_SECONDS: float = Field(10.0, env="IDEMPOTENCY_WAIT_SECONDS")
+    IDEMPOTENCY_LEASE_SECONDS: int = Field(300, env="IDEMPOTENCY_LEASE_SECONDS")
+    IDEMPOTENCY_CLEANUP_INTERVAL_SECONDS: int = Field(3600, env="IDEMPOTENCY_CLEANUP_INTERVAL_SECONDS")
+
+    # Inventory ledger: how often per-book stock snapshots are rolled forward,
+    # and how old a movement must be before a snapshot may include it (so
+    # transactions still in flight are never skipped)
+    STOCK_SNAPSHOT_INTERVAL_SECONDS: int = Field(3600, env="STOCK_SNAPSHOT_INTERVAL_SECONDS")
+    STOCK_SNAPSHOT_GRACE_SECONDS: int = Field(300, env="STOCK_SNAPSHOT_GRACE_SECONDS")
+
+    # Change feed (/changes): page sizes, and how often the outbox relay
+    # numbers newly committed events (an event is served once numbered)
+    CHANGES_PAGE_SIZE: int = Field(1000, env="CHANGES_PAGE_SIZE")
+    CHANGES_MAX_PAGE_SIZE: int = Field(10000, env="CHANGES_MAX_PAGE_SIZE")
+    OUTBOX_RELAY_INTERVAL_SECONDS: float = Field(1.0, env="OUTBOX_RELAY_INTERVAL_SECONDS")
+    # Outbox upkeep: events are dropped after the retention period; older
+    # than OUTBOX_COMPACT_AFTER_SECONDS, only the latest book/customer event
+    # per record is kept (sale and stock events are never compacted)
+    OUTBOX_RETENTION_SECONDS: int = Field(7 * 86400, env="OUTBOX_RETENTION_SECONDS")
+    OUTBOX_COMPACT_AFTER_SECONDS: int = Field(86400, env="OUTBOX_COMPACT_AFTER_SECONDS")
+    OUTBOX_CLEANUP_INTERVAL_SECONDS: int = Field(3600, env="OUTBOX_CLEANUP_INTERVAL_SECONDS")
+
+    # How often the in-memory sales leaderboard is rebuilt from the sales
+    # rollup, to pick up writes made by other workers or processes
+    LEADERBOARD_RESYNC_SECONDS: int = Field(300, env="LEADERBOARD_RESYNC_SECONDS")
+
+    # In-memory analytics cube (/analytics/query): how often it catches up
+    # with the change feed in the background, the most rows one query may
+    # return, and the largest rows x columns grid a pivot may produce
+    ANALYTICS_REFRESH_SECONDS: int = Field(60, env="ANALYTICS_REFRESH_SECONDS")
+    ANALYTICS_MAX_ROWS: int = Field(10000, env="ANALYTICS_MAX_ROWS")
+    ANALYTICS_MAX_PIVOT_CELLS: int = Field(1_000_000, env="ANALYTICS_MAX_PIVOT_CELLS")
+    # Monthly columnar sales archive (export_sales_archive.py). When set, the
+    # analytics cube memory-maps archived months and only reads newer sales
+    # from the database; a month is exported once it has been over this many days
+    SALES_ARCHIVE_DIR: Optional[str] = Field(None, env="SALES_ARCHIVE_DIR")
+    SALES_ARCHIVE_GRACE_DAYS: int = Field(3, env="SALES_ARCHIVE_GRACE_DAYS")
 
     class Config:
         env_file = str(env_path) if env_path.exists() else None
@@ -0,0 +1,46 @@
+"""
+ISBN parsing and canonicalization (ISBN-10, ISBN-13 and hyphenated forms)
+"""
+import re
+from typing import Optional
+
+# An optional "ISBN", "ISBN-10" or "ISBN-13" label, then digits separated by
+# hyphens or spaces, ending in a digit or (ISBN-10 only) a check "X"
+_ISBN_PREFIX_RE = re.compile(r"^ISBN(?:-1[03])?:?")
+_ISBN_SEPARATORS_RE = re.compile(r"[-\s]")
+_ISBN_DIGITS_RE = re.compile(r"^(?:[0-9]{9}[0-9X]|[0-9]{13})$")
+
+
+def _isbn10_is_valid(digits: str) -> bool:
+    total = 0
+    for position, char in enumerate(digits):
+        value = 10 if char == "X" else int(char)
+        total += (10 - position) * value
+    return total % 11 == 0
+
+
+def _isbn13_check_digit(first12: str) -> str:
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+
+def to_isbn13(code: Optional[str]) -> Optional[str]:
+    """
+    Canonical ISBN-13 for any ISBN-10/13 spelling (hyphens, spaces, an
+    "ISBN" label and a lower-case check "x" are accepted). Returns None when
+    the code contains anything else, is not a well-formed ISBN or its check
+    digit does not match.
+    """
+    if not code:
+        return None
+    digits = _ISBN_SEPARATORS_RE.sub("", _ISBN_PREFIX_RE.sub("", code.strip().upper()))
+    if not _ISBN_DIGITS_RE.match(digits):
+        return None
+    if len(digits) == 10:
+        if not _isbn10_is_valid(digits):
+            return None
+        first12 = "978" + digits[:9]
+        return first12 + _isbn13_check_digit(first12)
+    if _isbn13_check_digit(digits[:12]) != digits[12]:
+        return None
+    return digits
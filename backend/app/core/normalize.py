@@ -0,0 +1,43 @@
+"""
+Normalization helpers for lookup keys (phone numbers, emails, names)
+"""
+import re
+from typing import List, Optional
+
+_NON_DIGIT_RE = re.compile(r"\D+")
+_NAME_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_APOSTROPHE_RE = re.compile(r"['\u2019]")
+
+NAME_TOKEN_MAX_LENGTH = 100
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """Digits only, so "+1 (555) 010-2000" and "15550102000" compare equal"""
+    if not phone:
+        return None
+    digits = _NON_DIGIT_RE.sub("", phone)
+    return digits or None
+
+
+def reverse_phone(phone: Optional[str]) -> Optional[str]:
+    """
+    Normalized digits reversed, so "ends with" becomes a prefix match: the
+    national number 5550102000 finds +1 555 010 2000 stored with its country code
+    """
+    digits = normalize_phone(phone)
+    return digits[::-1] if digits else None
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    if not email:
+        return None
+    return email.strip().lower() or None
+
+
+def name_tokens(name: Optional[str]) -> List[str]:
+    """Distinct lower-cased word tokens of a person's name, in order ("O'Neil" -> "oneil")"""
+    if not name:
+        return []
+    folded = _APOSTROPHE_RE.sub("", name.lower())
+    tokens = (t[:NAME_TOKEN_MAX_LENGTH] for t in _NAME_TOKEN_RE.findall(folded))
+    return list(dict.fromkeys(tokens))
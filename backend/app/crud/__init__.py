@@ -3,11 +3,23 @@ from .crud_category import category
 from .crud_book import book
 from .crud_customer import customer
 from .crud_sale import sale
+from .crud_sale_return import sale_return
+from .crud_reservation import reservation
+from .crud_idempotency import idempotency_key
+from .crud_inventory import inventory
+from .crud_outbox import outbox
+from .crud_sales_rollup import sales_rollup
 
 __all__ = [
     "user",
     "category", 
     "book",
     "customer",
-    "sale"
+    "sale",
+    "sale_return",
+    "reservation",
+    "idempotency_key",
+    "inventory",
+    "outbox",
+    "sales_rollup"
 ]
\ No newline at end of file
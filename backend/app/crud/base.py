@@ -1,7 +1,15 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Generic, List, Optional, Tuple, Type, TypeVar, Union
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import func, text, tuple_
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.orm.exc import StaleDataError
+from app.core.config import settings
+from app.crud.count_cache import count_cache
 from app.database import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
@@ -9,6 +17,54 @@ CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
+class VersionConflict(ValueError):
+    """A compare-and-swap update found the row at a different version"""
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    """Opaque, URL-safe cursor for keyset pagination"""
+    raw = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Inverse of `encode_cursor`; raises ValueError for malformed cursors"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid pagination cursor")
+    if not isinstance(payload, dict) or "id" not in payload:
+        raise ValueError("Invalid pagination cursor")
+    # Only values encode_cursor can produce; anything else would reach the
+    # SQL comparison (or the type coercion) and fail there
+    if isinstance(payload["id"], bool) or not isinstance(payload["id"], int):
+        raise ValueError("Invalid pagination cursor")
+    if not isinstance(payload.get("value"), (str, int, float, bool, type(None))):
+        raise ValueError("Invalid pagination cursor")
+    return payload
+
+
+def _coerce_sort_value(column, value: Any) -> Any:
+    """Turn a JSON-decoded cursor value back into the column's Python type; raises ValueError"""
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    try:
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        if python_type is date:
+            return date.fromisoformat(value)
+        if python_type is Decimal:
+            return Decimal(str(value))
+    except (TypeError, ValueError, ArithmeticError):
+        raise ValueError("Invalid pagination cursor")
+    return value
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         """
@@ -29,8 +85,97 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     ) -> List[ModelType]:
         return db.query(self.model).offset(skip).limit(limit).all()
 
+    def paginate_keyset(
+        self,
+        query: Query,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        sort_column: Optional[Any] = None,
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        Keyset (seek) pagination over `query`, ordered by `(sort_column, id)`
+        or by `id` alone. Pass the returned cursor back to fetch the next
+        page; it is None on the last page. Unlike OFFSET, the cost of a page
+        does not grow with its depth.
+        """
+        id_column = self.model.id
+        sort_name = sort_column.key if sort_column is not None else "id"
+        if cursor:
+            payload = decode_cursor(cursor)
+            if payload.get("sort", "id") != sort_name:
+                raise ValueError("Pagination cursor does not match the requested ordering")
+            if sort_column is None:
+                query = query.filter(id_column > payload["id"])
+            else:
+                value = _coerce_sort_value(sort_column, payload.get("value"))
+                query = query.filter(tuple_(sort_column, id_column) > tuple_(value, payload["id"]))
+
+        order_by = [id_column] if sort_column is None else [sort_column, id_column]
+        rows = query.order_by(None).order_by(*order_by).limit(limit + 1).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            payload = {"sort": sort_name, "id": last.id}
+            if sort_column is not None:
+                payload["value"] = getattr(last, sort_name)
+            next_cursor = encode_cursor(payload)
+        return rows, next_cursor
+
+    def get_multi_keyset(
+        self, db: Session, *, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        return self.paginate_keyset(db.query(self.model), cursor=cursor, limit=limit)
+
     def get_count(self, db: Session) -> int:
-        return db.query(self.model).count()
+        count, _ = self.get_count_cached(db)
+        return count
+
+    def _estimate_row_count(self, db: Session) -> Optional[int]:
+        """Cheap approximate table size from the database's own statistics"""
+        table = self.model.__tablename__
+        dialect = db.get_bind().dialect.name
+        try:
+            if dialect == "mysql":
+                return db.execute(
+                    text(
+                        "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+                    ),
+                    {"table": table}
+                ).scalar()
+            if dialect == "sqlite":
+                # Integer primary keys are rowids: MAX() is an index lookup
+                return db.query(func.max(self.model.id)).scalar() or 0
+        except Exception:
+            return None
+        return None
+
+    def get_count_cached(
+        self, db: Session, *, filters: Tuple[Any, ...] = (), filter_key: str = "all"
+    ) -> Tuple[int, bool]:
+        """
+        Row count for `filters`, served from the count cache when possible.
+        `filter_key` must uniquely describe the filters. Unfiltered counts of
+        tables larger than COUNT_ESTIMATE_THRESHOLD are estimated. Returns
+        `(count, is_estimate)`.
+        """
+        table = self.model.__tablename__
+        cached = count_cache.get(table, filter_key)
+        if cached is not None:
+            return cached
+
+        if not filters:
+            estimate = self._estimate_row_count(db)
+            if estimate is not None and estimate > settings.COUNT_ESTIMATE_THRESHOLD:
+                count_cache.set(table, filter_key, int(estimate), estimated=True)
+                return int(estimate), True
+
+        count = db.query(func.count(self.model.id)).filter(*filters).scalar() or 0
+        count_cache.set(table, filter_key, count)
+        return count, False
 
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
@@ -45,18 +190,31 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db: Session,
         *,
         db_obj: ModelType,
-        obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        expected_version: Optional[int] = None
     ) -> ModelType:
+        """
+        Apply `obj_in` to `db_obj`. For versioned models the UPDATE only
+        matches the version that was loaded (and `expected_version`, when
+        given); losing that race raises `VersionConflict`.
+        """
+        if expected_version is not None and getattr(db_obj, "version", None) != expected_version:
+            db.rollback()
+            raise VersionConflict(f"{self.model.__name__} was modified by another request")
         obj_data = jsonable_encoder(db_obj)
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.dict(exclude_unset=True)
         for field in obj_data:
-            if field in update_data:
+            if field in update_data and field != "version":
                 setattr(db_obj, field, update_data[field])
         db.add(db_obj)
-        db.commit()
+        try:
+            db.commit()
+        except StaleDataError:
+            db.rollback()
+            raise VersionConflict(f"{self.model.__name__} was modified by another request")
         db.refresh(db_obj)
         return db_obj
 
@@ -81,4 +239,10 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             .offset(skip)
             .limit(limit)
             .all()
-        )
\ No newline at end of file
+        )
+
+    def get_multi_by_field_keyset(
+        self, db: Session, *, field_name: str, value: Any, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        query = db.query(self.model).filter(getattr(self.model, field_name) == value)
+        return self.paginate_keyset(query, cursor=cursor, limit=limit)
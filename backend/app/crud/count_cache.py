@@ -0,0 +1,87 @@
+"""
+Short-lived cache of row counts used for paginated list responses
+"""
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+_PENDING_TABLES_KEY = "count_cache_pending_tables"
+
+
+class CountCache:
+    """
+    Row counts keyed by `(table, filter_key)` with a TTL. Entries for a table
+    are dropped as soon as a transaction that wrote to it commits, so the TTL
+    only bounds staleness from writes made outside this process.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], Tuple[int, bool, float]] = {}
+
+    def get(self, table: str, filter_key: str) -> Optional[Tuple[int, bool]]:
+        with self._lock:
+            entry = self._entries.get((table, filter_key))
+            if entry is None:
+                return None
+            count, estimated, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[(table, filter_key)]
+                return None
+            return count, estimated
+
+    def set(self, table: str, filter_key: str, count: int, estimated: bool = False) -> None:
+        with self._lock:
+            self._entries[(table, filter_key)] = (count, estimated, time.monotonic() + self.ttl_seconds)
+
+    def invalidate(self, *tables: str) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[0] in tables]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+count_cache = CountCache(ttl_seconds=settings.COUNT_CACHE_TTL_SECONDS)
+
+
+def _pending_tables(session: Session) -> Set[str]:
+    return session.info.setdefault(_PENDING_TABLES_KEY, set())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session, flush_context):
+    pending = _pending_tables(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            pending.add(table)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_tables(orm_execute_state):
+    if orm_execute_state.is_select:
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None:
+        _pending_tables(orm_execute_state.session).add(mapper.local_table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_tables(session):
+    pending = session.info.pop(_PENDING_TABLES_KEY, None)
+    if pending:
+        count_cache.invalidate(*pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_tables(session):
+    session.info.pop(_PENDING_TABLES_KEY, None)
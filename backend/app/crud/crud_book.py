@@ -1,14 +1,171 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, Union
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from app.crud.base import CRUDBase
+from sqlalchemy import and_, bindparam, case, func, or_, true, update
+from app.core.isbn import to_isbn13
+from app.core.config import settings
+from app.crud.base import CRUDBase, VersionConflict
+from app.crud.crud_inventory import inventory
+from app.crud.crud_sales_rollup import sales_rollup
 from app.models.book import Book
+from app.models.inventory import ADJUSTMENT, RECEIPT
 from app.schemas.book import BookCreate, BookUpdate
+from app.search import indexes
+from app.search.autocomplete import book_prefix_index
+from app.search.bm25 import book_search_index, tokenize
+from app.search.cache import normalize_query, search_cache
+from app.search.fulltext import get_fulltext_backend
+from app.search.isbn_index import book_isbn_index
+from app.search.trigram import book_trigram_index
+
+
+# Books per set-based stock UPDATE (bounds the CASE expression and bind parameters)
+STOCK_UPDATE_CHUNK_SIZE = 1000
+
+# Price facet bands as (label, inclusive lower bound, exclusive upper bound)
+PRICE_BANDS = [
+    ("under_10", 0, 10),
+    ("10_25", 10, 25),
+    ("25_50", 25, 50),
+    ("50_plus", 50, None),
+]
+
+
+def _id_filter(ids: List[int]) -> Any:
+    """
+    `Book.id IN (...)` over every matched ID. The integers are rendered into
+    the statement rather than bound, so large match sets stay one query
+    without hitting the driver's bind parameter limit.
+    """
+    return Book.id.in_(bindparam("match_ids", ids, expanding=True, literal_execute=True))
 
 
 class CRUDBook(CRUDBase[Book, BookCreate, BookUpdate]):
+    def create(self, db: Session, *, obj_in: BookCreate) -> Book:
+        book = Book(**jsonable_encoder(obj_in))
+        # The opening stock movement is recorded by the inventory flush hook
+        db.add(book)
+        db.commit()
+        db.refresh(book)
+        indexes.on_book_saved(book)
+        search_cache.bump_version()
+        return book
+
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: Book,
+        obj_in: Union[BookUpdate, Dict[str, Any]],
+        expected_version: Optional[int] = None
+    ) -> Book:
+        if isinstance(obj_in, dict):
+            update_data = dict(obj_in)
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        if update_data.get("stock") is not None and update_data["stock"] != db_obj.stock:
+            inventory.record(
+                db, kind=ADJUSTMENT, quantities={db_obj.id: update_data["stock"] - db_obj.stock},
+                reference_type="book_updated"
+            )
+        if "category_id" in update_data and update_data["category_id"] != db_obj.category_id:
+            sales_rollup.recategorize(db, book_id=db_obj.id, category_id=update_data["category_id"])
+        book = super().update(db, db_obj=db_obj, obj_in=update_data, expected_version=expected_version)
+        indexes.on_book_saved(book)
+        search_cache.bump_version()
+        return book
+
+    def remove(self, db: Session, *, id: int) -> Book:
+        book = super().remove(db, id=id)
+        indexes.on_book_deleted(id)
+        search_cache.bump_version()
+        return book
+
+    def get_by_ids(self, db: Session, *, ids: List[int]) -> List[Book]:
+        """Fetch books by primary key, preserving the order of `ids`"""
+        if not ids:
+            return []
+        by_id = {b.id: b for b in db.query(Book).filter(Book.id.in_(ids)).all()}
+        return [by_id[i] for i in ids if i in by_id]
+
     def get_by_isbn(self, db: Session, *, isbn: str) -> Optional[Book]:
-        return db.query(Book).filter(Book.isbn == isbn).first()
+        """
+        Match on the canonical ISBN-13 so ISBN-10 and hyphenated forms agree,
+        or on the stored `isbn` as typed (rows written before `isbn13` was
+        derived on every insert may not have it)
+        """
+        isbn13 = to_isbn13(isbn)
+        if isbn13 is None:
+            return db.query(Book).filter(Book.isbn == isbn).first()
+        return (
+            db.query(Book)
+            .filter(or_(Book.isbn13 == isbn13, Book.isbn == isbn))
+            .order_by(Book.isbn13.is_(None))
+            .first()
+        )
+
+    def resolve_isbn_ids(self, db: Session, *, codes: List[str]) -> Dict[str, int]:
+        """
+        Map scanned codes to book IDs, keyed by canonical ISBN-13 (or the raw
+        code when it is not a valid ISBN). Codes are resolved through the
+        in-memory ISBN map first; misses take one query against the `isbn13`
+        index and the raw `isbn` column (valid codes are matched there too,
+        for rows stored without `isbn13`). Unknown codes are left out.
+        """
+        ids: Dict[str, int] = {}
+        wanted13 = set()
+        wanted_raw = set()
+        raw_to13: Dict[str, str] = {}
+        for code in codes:
+            isbn13 = to_isbn13(code)
+            book_id = book_isbn_index.get(isbn13) if isbn13 else None
+            if book_id is not None:
+                ids[isbn13] = book_id
+            elif isbn13:
+                wanted13.add(isbn13)
+                raw_to13[code] = isbn13
+            else:
+                wanted_raw.add(code)
+
+        if wanted13 or wanted_raw:
+            filters = []
+            if wanted13:
+                filters.append(Book.isbn13.in_(wanted13))
+            if wanted_raw or raw_to13:
+                filters.append(Book.isbn.in_(wanted_raw | set(raw_to13)))
+            rows = db.query(Book.id, Book.isbn, Book.isbn13).filter(or_(*filters)).all()
+            fallback: Dict[str, int] = {}
+            for book_id, isbn, isbn13 in rows:
+                if isbn13 in wanted13:
+                    ids[isbn13] = book_id
+                    book_isbn_index.set(book_id, isbn13)
+                if isbn in wanted_raw:
+                    ids[isbn] = book_id
+                if isbn in raw_to13:
+                    fallback[raw_to13[isbn]] = book_id
+            for isbn13, book_id in fallback.items():
+                ids.setdefault(isbn13, book_id)
+        return ids
+
+    def lookup_isbns(
+        self, db: Session, *, codes: List[str]
+    ) -> List[Tuple[str, Optional[str], Optional[Book]]]:
+        """
+        Resolve scanned codes to books as `(code, isbn13, book)` in input
+        order, hydrating every hit with one query
+        """
+        ids = self.resolve_isbn_ids(db, codes=codes)
+        books = {b.id: b for b in self.get_by_ids(db, ids=list(set(ids.values())))}
+        results = []
+        for code in codes:
+            isbn13 = to_isbn13(code)
+            book = books.get(ids.get(isbn13 or code))
+            if book is not None and isbn13 and to_isbn13(book.isbn) != isbn13:
+                # Stale map entry: the book's ISBN changed in another process
+                book_isbn_index.remove(book.id)
+                book = None
+            results.append((code, isbn13, book))
+        return results
 
     def search_books(
         self,
@@ -19,24 +176,163 @@ class CRUDBook(CRUDBase[Book, BookCreate, BookUpdate]):
         skip: int = 0,
         limit: int = 100
     ) -> List[Book]:
-        """Search books by title, author, or description"""
-        search_filter = or_(
-            Book.title.ilike(f"%{query}%"),
-            Book.author.ilike(f"%{query}%"),
-            Book.description.ilike(f"%{query}%")
-        )
-        
-        filters = [search_filter]
-        if category_id:
-            filters.append(Book.category_id == category_id)
+        """
+        Search books by title, author, or description using the database's
+        full-text index when one exists (falls back to an ILIKE scan)
+        """
+        def compute() -> List[int]:
+            search_filter = get_fulltext_backend(db).match(query)
             
-        return (
+            filters = [search_filter]
+            if category_id:
+                filters.append(Book.category_id == category_id)
+                
+            rows = (
+                db.query(Book.id)
+                .filter(and_(*filters))
+                .offset(skip)
+                .limit(limit)
+                .all()
+            )
+            return [row.id for row in rows]
+
+        key = ("db", normalize_query(query), category_id, skip, limit)
+        search_cache.sync(db)
+        return self.get_by_ids(db, ids=search_cache.get_or_compute(key, compute))
+
+    def search_facets(
+        self, db: Session, *, query: str, category_id: Optional[int] = None, engine: str = "db"
+    ) -> Dict[str, Any]:
+        """
+        Facet counts for a search, from one GROUP BY over (category, in stock,
+        price band). Category counts ignore the category filter so the other
+        categories stay visible; stock and price counts respect it.
+
+        `engine` names the search that produced the items ("db", "ranked" or
+        "fuzzy") so the facets count the same matches: for the in-memory
+        indexes, the matched IDs are passed in as one IN list.
+        """
+        from app.models.category import Category
+
+        if engine == "ranked":
+            match_filter = _id_filter(book_search_index.matches(query))
+        elif engine == "fuzzy":
+            match_filter = _id_filter(book_trigram_index.matches(query))
+        else:
+            match_filter = get_fulltext_backend(db).match(query)
+
+        in_stock = case((Book.stock - Book.reserved > 0, 1), else_=0)
+        price_band = case(
+            *[
+                (Book.price < upper, label)
+                for label, _, upper in PRICE_BANDS if upper is not None
+            ],
+            else_=PRICE_BANDS[-1][0]
+        )
+        rows = (
+            db.query(
+                Book.category_id,
+                Category.name,
+                in_stock.label("in_stock"),
+                price_band.label("price_band"),
+                func.count(Book.id).label("count")
+            )
+            .outerjoin(Category, Book.category_id == Category.id)
+            .filter(match_filter)
+            .group_by(Book.category_id, Category.name, in_stock, price_band)
+            .all()
+        )
+
+        categories: Dict[Optional[int], Dict[str, Any]] = {}
+        stock = {"in_stock": 0, "out_of_stock": 0}
+        bands = {label: 0 for label, _, _ in PRICE_BANDS}
+        for row in rows:
+            facet = categories.setdefault(
+                row.category_id, {"category_id": row.category_id, "name": row.name, "count": 0}
+            )
+            facet["count"] += row.count
+            if category_id and row.category_id != category_id:
+                continue
+            stock["in_stock" if row.in_stock else "out_of_stock"] += row.count
+            bands[row.price_band] += row.count
+
+        return {
+            "categories": sorted(categories.values(), key=lambda f: -f["count"]),
+            "stock": stock,
+            "price_bands": [
+                {"label": label, "min": lower, "max": upper, "count": bands[label]}
+                for label, lower, upper in PRICE_BANDS
+            ],
+        }
+
+    def search_ranked(
+        self,
+        db: Session,
+        *,
+        query: str,
+        category_id: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Optional[List[Book]]:
+        """
+        Relevance-ranked search served from the in-memory BM25 index; only the
+        final page of IDs is loaded from the database. Returns None while the
+        index has not been built, or when the query is only stopwords, so
+        callers can fall back to `search_books`.
+        """
+        if not book_search_index.ready or not tokenize(query):
+            return None
+        key = ("ranked", normalize_query(query), category_id, skip, limit)
+        search_cache.sync(db)
+        ids = search_cache.get_or_compute(
+            key, lambda: book_search_index.search(query, category_id=category_id, skip=skip, limit=limit)
+        )
+        return self.get_by_ids(db, ids=ids)
+
+    def search_fuzzy(
+        self,
+        db: Session,
+        *,
+        query: str,
+        category_id: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Optional[List[Book]]:
+        """
+        Typo-tolerant title/author search ranked by trigram similarity.
+        Returns None while the trigram index has not been built.
+        """
+        if not book_trigram_index.ready:
+            return None
+        key = ("fuzzy", normalize_query(query), category_id, skip, limit)
+        search_cache.sync(db)
+        ids = search_cache.get_or_compute(
+            key,
+            lambda: [
+                book_id for book_id, _ in
+                book_trigram_index.search(query, category_id=category_id, skip=skip, limit=limit)
+            ]
+        )
+        return self.get_by_ids(db, ids=ids)
+
+    def autocomplete(self, db: Session, *, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Title/author/ISBN suggestions for a typed prefix, served from the
+        in-memory prefix index (anchored LIKE on titles until it is built)
+        """
+        if book_prefix_index.ready:
+            return book_prefix_index.suggest(prefix, limit=limit)
+        books = (
             db.query(Book)
-            .filter(and_(*filters))
-            .offset(skip)
+            .filter(Book.title.ilike(f"{prefix}%"))
+            .order_by(Book.title)
             .limit(limit)
             .all()
         )
+        return [
+            {"book_id": b.id, "title": b.title, "author": b.author, "isbn": b.isbn, "match": "title"}
+            for b in books
+        ]
 
     def get_by_category(
         self, db: Session, *, category_id: int, skip: int = 0, limit: int = 100
@@ -63,17 +359,187 @@ class CRUDBook(CRUDBase[Book, BookCreate, BookUpdate]):
     def get_out_of_stock_books(self, db: Session) -> List[Book]:
         return db.query(Book).filter(Book.stock == 0).all()
 
-    def update_stock(self, db: Session, *, book_id: int, quantity_change: int) -> Optional[Book]:
-        """Update book stock by adding/subtracting quantity_change"""
-        book = self.get(db, book_id)
-        if book:
-            new_stock = book.stock + quantity_change
-            if new_stock < 0:
-                new_stock = 0
-            book.stock = new_stock
+    def update_stock(
+        self,
+        db: Session,
+        *,
+        book_id: int,
+        quantity_change: int,
+        expected_version: Optional[int] = None,
+        kind: str = ADJUSTMENT,
+        reference_type: Optional[str] = None,
+        reference_id: Optional[int] = None
+    ) -> Optional[Book]:
+        """
+        Add `quantity_change` to stock (clamped at zero) with a
+        compare-and-swap on `version`, recording the applied change in the
+        inventory ledger as a `kind` movement. A lost race is retried from a
+        fresh read up to STOCK_UPDATE_MAX_RETRIES times; with
+        `expected_version` (an If-Match) there is exactly one attempt.
+        Raises `VersionConflict`.
+        """
+        attempts = 1 if expected_version is not None else settings.STOCK_UPDATE_MAX_RETRIES
+        for _ in range(attempts):
+            row = db.query(Book.stock, Book.version).filter(Book.id == book_id).first()
+            if row is None:
+                db.rollback()
+                return None
+            if expected_version is not None and row.version != expected_version:
+                db.rollback()
+                raise VersionConflict("Book was modified by another request")
+            new_stock = max(row.stock + quantity_change, 0)
+            result = db.execute(
+                update(Book)
+                .where(Book.id == book_id, Book.version == row.version)
+                .values(stock=new_stock, version=row.version + 1)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                inventory.record(
+                    db, kind=kind, quantities={book_id: new_stock - row.stock},
+                    reference_type=reference_type, reference_id=reference_id
+                )
+                db.commit()
+                search_cache.bump_version()
+                book = self.get(db, book_id)
+                db.refresh(book)
+                return book
+            db.rollback()
+        raise VersionConflict("Book stock is being updated concurrently, please retry")
+
+    def _apply_stock_delta(self, db: Session, quantities: Dict[int, int], *, guard, **values) -> bool:
+        """
+        One conditional `UPDATE ... CASE id` per STOCK_UPDATE_CHUNK_SIZE books
+        (keeping bind parameters under driver limits). True when every book
+        matched `guard`.
+        """
+        matched = 0
+        book_ids = list(quantities)
+        for start in range(0, len(book_ids), STOCK_UPDATE_CHUNK_SIZE):
+            chunk = {book_id: quantities[book_id] for book_id in book_ids[start:start + STOCK_UPDATE_CHUNK_SIZE]}
+            wanted = case(chunk, value=Book.id)
+            chunk_values = {column: expr(wanted) for column, expr in values.items()}
+            chunk_values["version"] = Book.version + 1
+            result = db.execute(
+                update(Book)
+                .where(Book.id.in_(list(chunk)), guard(wanted))
+                .values(chunk_values)
+                .execution_options(synchronize_session=False)
+            )
+            matched += result.rowcount
+        return matched == len(quantities)
+
+    def decrement_stock(self, db: Session, *, quantities: Dict[int, int]) -> bool:
+        """
+        Take `quantities` ({book_id: qty}) off available stock (stock not
+        held by reservations) in one conditional UPDATE inside the caller's
+        transaction. Returns False unless every book exists and has enough
+        available stock, in which case the caller must roll back (rows that
+        did qualify were already decremented).
+        """
+        return self._apply_stock_delta(
+            db, quantities,
+            guard=lambda q: Book.stock - Book.reserved >= q,
+            stock=lambda q: Book.stock - q,
+        )
+
+    def increment_stock(self, db: Session, *, quantities: Dict[int, int]) -> None:
+        """Add `quantities` back to stock (e.g. returned goods) inside the caller's transaction"""
+        self._apply_stock_delta(
+            db, quantities,
+            guard=lambda q: true(),
+            stock=lambda q: Book.stock + q,
+        )
+
+    def receive_stock(
+        self, db: Session, *, lines: List[Tuple[Optional[int], Optional[str], int]]
+    ) -> Dict[int, int]:
+        """
+        Apply a delivery of `(book_id, isbn, quantity_delta)` lines in one
+        transaction: ISBNs are resolved in one query, deltas are summed per
+        book and applied with set-based UPDATEs, and each book gets one
+        receipt movement. Any unknown book or a delta that would take stock
+        below zero rejects the whole delivery (ValueError). Returns the new
+        stock per book.
+        """
+        codes = [isbn for book_id, isbn, _ in lines if book_id is None and isbn]
+        isbn_ids = self.resolve_isbn_ids(db, codes=codes) if codes else {}
+
+        deltas: Dict[int, int] = {}
+        unknown = []
+        for book_id, isbn, delta in lines:
+            if book_id is None:
+                book_id = isbn_ids.get(to_isbn13(isbn) or isbn)
+                if book_id is None:
+                    unknown.append(isbn)
+                    continue
+            deltas[book_id] = deltas.get(book_id, 0) + delta
+        if unknown:
+            raise ValueError(f"Unknown ISBNs: {', '.join(unknown[:20])}")
+
+        try:
+            if not self._apply_stock_delta(
+                db, deltas,
+                guard=lambda q: Book.stock + q >= 0,
+                stock=lambda q: Book.stock + q,
+            ):
+                db.rollback()
+                existing = {
+                    row.id for row in db.query(Book.id).filter(Book.id.in_(list(deltas)))
+                }
+                missing = [str(book_id) for book_id in deltas if book_id not in existing]
+                if missing:
+                    raise ValueError(f"Books not found: {', '.join(missing[:20])}")
+                raise ValueError("Delivery would make stock negative for some books")
+            inventory.record(db, kind=RECEIPT, quantities=deltas, reference_type="stock_receipt")
+            book_ids = list(deltas)
+            levels: Dict[int, int] = {}
+            for start in range(0, len(book_ids), STOCK_UPDATE_CHUNK_SIZE):
+                chunk = book_ids[start:start + STOCK_UPDATE_CHUNK_SIZE]
+                levels.update(db.query(Book.id, Book.stock).filter(Book.id.in_(chunk)).all())
             db.commit()
-            db.refresh(book)
-        return book
+        except Exception:
+            db.rollback()
+            raise
+        search_cache.bump_version()
+        return levels
+
+    def hold_stock(self, db: Session, *, quantities: Dict[int, int]) -> bool:
+        """Move available stock into `reserved`; same contract as `decrement_stock`"""
+        return self._apply_stock_delta(
+            db, quantities,
+            guard=lambda q: Book.stock - Book.reserved >= q,
+            reserved=lambda q: Book.reserved + q,
+        )
+
+    def release_stock(self, db: Session, *, quantities: Dict[int, int]) -> None:
+        """Return held units to available stock"""
+        self._apply_stock_delta(
+            db, quantities,
+            guard=lambda q: Book.reserved >= q,
+            reserved=lambda q: Book.reserved - q,
+        )
+
+    def consume_held_stock(self, db: Session, *, quantities: Dict[int, int]) -> bool:
+        """Take held units off both `stock` and `reserved` (a hold becoming a sale)"""
+        return self._apply_stock_delta(
+            db, quantities,
+            guard=lambda q: and_(Book.reserved >= q, Book.stock >= q),
+            stock=lambda q: Book.stock - q,
+            reserved=lambda q: Book.reserved - q,
+        )
+
+    def stock_shortfall_reason(self, db: Session, *, quantities: Dict[int, int]) -> str:
+        """Explain why a conditional stock update for `quantities` matched too few rows"""
+        available = dict(
+            db.query(Book.id, Book.stock - Book.reserved).filter(Book.id.in_(list(quantities))).all()
+        )
+        for book_id, quantity in quantities.items():
+            if book_id not in available:
+                return f"Book {book_id} not found"
+            if available[book_id] < quantity:
+                return f"Insufficient stock for book {book_id}"
+        return "Stock changed during checkout, please retry"
 
     def get_books_with_category(
         self, db: Session, *, skip: int = 0, limit: int = 100
@@ -90,32 +556,36 @@ class CRUDBook(CRUDBase[Book, BookCreate, BookUpdate]):
         )
 
     def get_popular_books(
-        self, db: Session, *, skip: int = 0, limit: int = 10
-    ) -> List[Dict[str, Any]]:
-        """Get most sold books"""
-        from app.models.sale import Sale
-        from sqlalchemy import func
-        
-        return (
-            db.query(
-                Book,
-                func.sum(Sale.quantity).label('total_sold')
-            )
-            .join(Sale)
-            .group_by(Book.id)
-            .order_by(func.sum(Sale.quantity).desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        self, db: Session, *, days: Optional[int] = None, skip: int = 0, limit: int = 10
+    ) -> List[Tuple[Book, int, float]]:
+        """
+        Best sellers by net units as `(book, total_sold, total_revenue)`,
+        over all time or the last `days` UTC days (today included). Served
+        from the in-memory leaderboard for its windows, otherwise from the
+        daily sales rollup.
+        """
+        from datetime import datetime, timedelta
+        from app.analytics.leaderboard import sales_leaderboard
+
+        if sales_leaderboard.supports(days):
+            ranked = sales_leaderboard.top(days=days, limit=limit, offset=skip)
+        else:
+            start = datetime.utcnow().date() - timedelta(days=days - 1) if days else None
+            ranked = sales_rollup.top_books(db, start=start, skip=skip, limit=limit)
+        books = {book.id: book for book in self.get_by_ids(db, ids=[book_id for book_id, _, _ in ranked])}
+        return [
+            (books[book_id], int(total_sold), float(total_revenue))
+            for book_id, total_sold, total_revenue in ranked
+            if book_id in books
+        ]
 
     def get_available_books(
         self, db: Session, *, skip: int = 0, limit: int = 100
     ) -> List[Book]:
-        """Get books that are in stock"""
+        """Get books with stock available to sell (not held by reservations)"""
         return (
             db.query(Book)
-            .filter(Book.stock > 0)
+            .filter(Book.stock - Book.reserved > 0)
             .offset(skip)
             .limit(limit)
             .all()
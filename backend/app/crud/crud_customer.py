@@ -1,32 +1,125 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Union
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
+from app.core.normalize import name_tokens, normalize_email, normalize_phone, reverse_phone
 from app.crud.base import CRUDBase
 from app.models.customer import Customer
+from app.models.customer_name_token import CustomerNameToken
 from app.schemas.customer import CustomerCreate, CustomerUpdate
 
+# Shorter digit strings match too many phone numbers to be useful as a prefix
+MIN_PHONE_PREFIX_DIGITS = 3
+# Two numbers are the same phone when one ends with the other and the shorter
+# has at least this many digits (a national number vs. one with country code)
+MIN_PHONE_SUFFIX_DIGITS = 7
+
 
 class CRUDCustomer(CRUDBase[Customer, CustomerCreate, CustomerUpdate]):
+    @staticmethod
+    def _apply_lookup_keys(db_obj: Customer) -> None:
+        """Refresh normalized phone/email columns and the name-token rows"""
+        db_obj.phone_normalized = normalize_phone(db_obj.phone)
+        db_obj.phone_reversed = reverse_phone(db_obj.phone)
+        db_obj.email_normalized = normalize_email(db_obj.email)
+        tokens = name_tokens(db_obj.name)
+        if [t.token for t in db_obj.name_tokens] != tokens:
+            db_obj.name_tokens = [CustomerNameToken(token=token) for token in tokens]
+
+    def create(self, db: Session, *, obj_in: CustomerCreate) -> Customer:
+        db_obj = Customer(**jsonable_encoder(obj_in))
+        self._apply_lookup_keys(db_obj)
+        db.add(db_obj)
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: Customer,
+        obj_in: Union[CustomerUpdate, Dict[str, Any]]
+    ) -> Customer:
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        for field in ("name", "email", "phone"):
+            if field in update_data:
+                setattr(db_obj, field, update_data[field])
+        self._apply_lookup_keys(db_obj)
+        db.add(db_obj)
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+
     def get_by_email(self, db: Session, *, email: str) -> Optional[Customer]:
-        return db.query(Customer).filter(Customer.email == email).first()
+        return (
+            db.query(Customer)
+            .filter(Customer.email_normalized == normalize_email(email))
+            .first()
+        )
 
     def get_by_phone(self, db: Session, *, phone: str) -> Optional[Customer]:
-        return db.query(Customer).filter(Customer.phone == phone).first()
+        digits = normalize_phone(phone)
+        if not digits:
+            return None
+        customer = db.query(Customer).filter(Customer.phone_normalized == digits).first()
+        if customer is not None or len(digits) < MIN_PHONE_SUFFIX_DIGITS:
+            return customer
+        # Same number with or without a country code: the stored number ends
+        # with the given one, or the given one ends with the stored number
+        reversed_digits = digits[::-1]
+        shorter = [reversed_digits[:n] for n in range(MIN_PHONE_SUFFIX_DIGITS, len(reversed_digits))]
+        return (
+            db.query(Customer)
+            .filter(or_(
+                Customer.phone_reversed.startswith(reversed_digits),
+                Customer.phone_reversed.in_(shorter),
+            ))
+            .order_by(Customer.id)
+            .first()
+        )
 
     def search_customers(
         self, db: Session, *, query: str, skip: int = 0, limit: int = 100
     ) -> List[Customer]:
-        """Search customers by name, email, or phone"""
-        from sqlalchemy import or_
-        
-        search_filter = or_(
-            Customer.name.ilike(f"%{query}%"),
-            Customer.email.ilike(f"%{query}%"),
-            Customer.phone.ilike(f"%{query}%")
-        )
-        
+        """
+        Search customers by name, email, or phone using prefix matches on the
+        normalized lookup columns and the name-token index
+        """
+        conditions = []
+
+        # An "@" means the user is typing an email; don't match name fragments
+        tokens = name_tokens(query) if "@" not in query else []
+        if tokens:
+            # Every typed word must prefix-match one of the customer's name tokens
+            conditions.append(and_(*[
+                Customer.id.in_(
+                    db.query(CustomerNameToken.customer_id)
+                    .filter(CustomerNameToken.token.startswith(token, autoescape=True))
+                )
+                for token in tokens
+            ]))
+
+        email = normalize_email(query)
+        if email and " " not in email:
+            conditions.append(Customer.email_normalized.startswith(email, autoescape=True))
+
+        digits = normalize_phone(query)
+        if digits and len(digits) >= MIN_PHONE_PREFIX_DIGITS:
+            # Typed from the start (with or without country code) or as the
+            # trailing digits of the number
+            conditions.append(Customer.phone_normalized.startswith(digits))
+            conditions.append(Customer.phone_reversed.startswith(digits[::-1]))
+
+        if not conditions:
+            return []
+
         return (
             db.query(Customer)
-            .filter(search_filter)
+            .filter(or_(*conditions))
             .offset(skip)
             .limit(limit)
             .all()
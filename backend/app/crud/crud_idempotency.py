@@ -0,0 +1,197 @@
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy import delete, event, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.idempotency_key import COMPLETED, EXECUTED, IN_PROGRESS, IdempotencyKey
+
+# session.info keys: the claim whose request is executing, and whether the
+# current transaction has written anything
+_ACTIVE_CLAIM_KEY = "idempotency_claim_id"
+_WROTE_KEY = "idempotency_claim_wrote"
+
+
+class CRUDIdempotencyKey:
+    """
+    Storage for Idempotency-Key claims. The unique (scope, key) constraint is
+    the lock: exactly one request manages to insert the in-progress row and
+    executes, every duplicate finds the row instead.
+    """
+
+    def claim(
+        self, db: Session, *, scope: str, key: str, request_hash: str
+    ) -> Tuple[bool, IdempotencyKey]:
+        """
+        Insert an in-progress row and commit. Returns `(True, row)` for the
+        caller that should execute, `(False, existing_row)` otherwise. An
+        expired leftover row is replaced, and an in-progress claim for the
+        same request whose lease ran out is taken over.
+        """
+        now = datetime.utcnow()
+        row = IdempotencyKey(
+            scope=scope,
+            key=key,
+            request_hash=request_hash,
+            status=IN_PROGRESS,
+            expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS),
+            lease_expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS),
+        )
+        db.add(row)
+        try:
+            db.commit()
+            return True, row
+        except IntegrityError:
+            db.rollback()
+
+        existing = self.get(db, scope=scope, key=key)
+        if existing is not None and existing.expires_at <= now:
+            db.delete(existing)
+            db.commit()
+            return self.claim(db, scope=scope, key=key, request_hash=request_hash)
+        if existing is None:
+            # The holder released its claim between our insert and read
+            return self.claim(db, scope=scope, key=key, request_hash=request_hash)
+        if (
+            existing.status == IN_PROGRESS
+            and existing.request_hash == request_hash
+            and self.lease_expired(existing, now=now)
+        ):
+            return self._take_over(db, row=existing, now=now)
+        return False, existing
+
+    def _take_over(self, db: Session, *, row: IdempotencyKey, now: datetime) -> Tuple[bool, IdempotencyKey]:
+        """
+        Renew an abandoned claim's lease. Safe to re-execute: the request
+        never committed a write, or the row would be EXECUTED. The
+        conditional UPDATE lets one of several racing retries win.
+        """
+        taken = db.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.id == row.id,
+                IdempotencyKey.status == IN_PROGRESS,
+                or_(IdempotencyKey.lease_expires_at.is_(None), IdempotencyKey.lease_expires_at <= now),
+            )
+            .values(lease_expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS))
+            .execution_options(synchronize_session=False)
+        ).rowcount == 1
+        db.commit()
+        current = self.get(db, scope=row.scope, key=row.key)
+        if current is None:
+            return self.claim(db, scope=row.scope, key=row.key, request_hash=row.request_hash)
+        return taken, current
+
+    def lease_expired(self, row: IdempotencyKey, *, now: Optional[datetime] = None) -> bool:
+        return row.lease_expires_at is None or row.lease_expires_at <= (now or datetime.utcnow())
+
+    def start(self, db: Session, *, row: IdempotencyKey) -> None:
+        """
+        Mark `row` as executing on `db`: the first commit that writes
+        anything also flips it to EXECUTED, atomically with the request's
+        business write, so an abandoned claim is never re-executed after its
+        effects are already committed
+        """
+        db.info[_ACTIVE_CLAIM_KEY] = row.id
+        db.info.pop(_WROTE_KEY, None)
+
+    def active_claim_id(self, db: Session) -> Optional[int]:
+        """ID of the claim executing on `db`, if any"""
+        return db.info.get(_ACTIVE_CLAIM_KEY)
+
+    def mark_executed(self, db: Session, *, claim_id: int) -> None:
+        """
+        Flip an in-progress claim to EXECUTED in `db`'s transaction. Writes
+        committed through another session (e.g. the group-commit writer)
+        call this themselves so the flip commits with them.
+        """
+        db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.id == claim_id, IdempotencyKey.status == IN_PROGRESS)
+            .values(status=EXECUTED)
+            .execution_options(synchronize_session=False)
+        )
+
+    def _stop(self, db: Session) -> None:
+        db.info.pop(_ACTIVE_CLAIM_KEY, None)
+        db.info.pop(_WROTE_KEY, None)
+
+    def get(self, db: Session, *, scope: str, key: str) -> Optional[IdempotencyKey]:
+        return db.execute(
+            select(IdempotencyKey).where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+        ).scalar_one_or_none()
+
+    def complete(
+        self, db: Session, *, row: IdempotencyKey, status_code: int, body: str, etag: Optional[str] = None
+    ) -> None:
+        self._stop(db)
+        row.status = COMPLETED
+        row.response_status = status_code
+        row.response_body = body
+        row.response_etag = etag
+        db.add(row)
+        db.commit()
+
+    def release(self, db: Session, *, row: IdempotencyKey) -> None:
+        """
+        Drop a claim whose request failed unexpectedly so a retry can run.
+        A claim that already committed a write is kept: re-running it would
+        apply the request twice.
+        """
+        self._stop(db)
+        db.rollback()
+        db.execute(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.id == row.id, IdempotencyKey.status == IN_PROGRESS)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+    def purge_expired(self, db: Session, *, batch_size: int = 5000) -> int:
+        """Delete expired keys in bounded batches; returns the number removed"""
+        removed = 0
+        while True:
+            ids = db.execute(
+                select(IdempotencyKey.id)
+                .where(IdempotencyKey.expires_at <= datetime.utcnow())
+                .limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                return removed
+            db.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(ids)))
+            db.commit()
+            removed += len(ids)
+
+
+idempotency_key = CRUDIdempotencyKey()
+
+
+@event.listens_for(Session, "after_flush")
+def _note_flushed_write(session, flush_context):
+    if session.info.get(_ACTIVE_CLAIM_KEY) is not None:
+        session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_bulk_write(orm_execute_state):
+    session = orm_execute_state.session
+    if session.info.get(_ACTIVE_CLAIM_KEY) is None:
+        return
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, "before_commit")
+def _mark_claim_executed(session):
+    claim_id = session.info.get(_ACTIVE_CLAIM_KEY)
+    if claim_id is None:
+        return
+    session.flush()
+    if not session.info.get(_WROTE_KEY):
+        return
+    idempotency_key.mark_executed(session, claim_id=claim_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_claim_write(session):
+    session.info.pop(_WROTE_KEY, None)
@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import event, func, insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.crud.crud_outbox import outbox
+from app.models.book import Book
+from app.models.inventory import ADJUSTMENT, InventoryMovement, StockSnapshot
+
+# Books per IN list when rolling snapshots forward
+SNAPSHOT_CHUNK_SIZE = 5000
+
+
+class CRUDInventory:
+    """
+    Inventory ledger. `record` only adds rows to the caller's transaction, so
+    the movement commits (or rolls back) together with the stock change.
+    """
+
+    def record(
+        self,
+        db: Session,
+        *,
+        kind: str,
+        quantities: Dict[int, int],
+        reference_type: Optional[str] = None,
+        reference_id: Optional[int] = None,
+    ) -> None:
+        """Append one movement per book for signed `quantities` ({book_id: delta})"""
+        self.record_many(
+            db,
+            [(book_id, kind, quantity, reference_type, reference_id) for book_id, quantity in quantities.items()],
+        )
+
+    def record_many(
+        self, db: Session, movements: Iterable[Tuple[int, str, int, Optional[str], Optional[int]]]
+    ) -> None:
+        """Append `(book_id, kind, quantity, reference_type, reference_id)` rows with one executemany"""
+        now = datetime.utcnow()
+        rows = [
+            {
+                "book_id": book_id,
+                "kind": kind,
+                "quantity": quantity,
+                "reference_type": reference_type,
+                "reference_id": reference_id,
+                "created_at": now,
+            }
+            for book_id, kind, quantity, reference_type, reference_id in movements
+            if quantity
+        ]
+        if rows:
+            db.execute(insert(InventoryMovement), rows)
+            outbox.add_stock_events(db, rows)
+
+    def get_movements(
+        self,
+        db: Session,
+        *,
+        book_id: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[InventoryMovement]:
+        """Movements for a book in [start, end), newest first"""
+        query = db.query(InventoryMovement).filter(InventoryMovement.book_id == book_id)
+        if start:
+            query = query.filter(InventoryMovement.created_at >= start)
+        if end:
+            query = query.filter(InventoryMovement.created_at < end)
+        return query.order_by(InventoryMovement.id.desc()).offset(skip).limit(limit).all()
+
+    def stock_at(self, db: Session, *, book_id: int, at: datetime) -> int:
+        """
+        Stock of a book at `at`: the latest snapshot taken at or before `at`
+        plus the movements after it, so only the movements since one snapshot
+        interval are scanned.
+        """
+        snapshot = (
+            db.query(StockSnapshot.stock, StockSnapshot.last_movement_id)
+            .filter(StockSnapshot.book_id == book_id, StockSnapshot.taken_at <= at)
+            .order_by(StockSnapshot.taken_at.desc(), StockSnapshot.id.desc())
+            .first()
+        )
+        base, after_id = (snapshot.stock, snapshot.last_movement_id) if snapshot else (0, 0)
+        delta = (
+            db.query(func.coalesce(func.sum(InventoryMovement.quantity), 0))
+            .filter(
+                InventoryMovement.book_id == book_id,
+                InventoryMovement.id > after_id,
+                InventoryMovement.created_at <= at,
+            )
+            .scalar()
+        )
+        return base + int(delta)
+
+    def take_snapshots(self, db: Session) -> int:
+        """
+        Roll snapshots forward for every book with movements since the last
+        run. New snapshots are previous snapshot + ledger deltas (never read
+        from `Book.stock`), cut at the newest movement older than
+        STOCK_SNAPSHOT_GRACE_SECONDS. Returns the number of snapshots written.
+        """
+        previous_cutoff = db.query(func.coalesce(func.max(StockSnapshot.last_movement_id), 0)).scalar()
+        grace_limit = datetime.utcnow() - timedelta(seconds=settings.STOCK_SNAPSHOT_GRACE_SECONDS)
+        cutoff = (
+            db.query(InventoryMovement.id, InventoryMovement.created_at)
+            .filter(InventoryMovement.created_at <= grace_limit, InventoryMovement.id > previous_cutoff)
+            .order_by(InventoryMovement.id.desc())
+            .first()
+        )
+        if cutoff is None:
+            db.rollback()
+            return 0
+
+        deltas: Dict[int, int] = dict(
+            db.query(InventoryMovement.book_id, func.sum(InventoryMovement.quantity))
+            .filter(InventoryMovement.id > previous_cutoff, InventoryMovement.id <= cutoff.id)
+            .group_by(InventoryMovement.book_id)
+            .all()
+        )
+        book_ids = list(deltas)
+        written = 0
+        for start in range(0, len(book_ids), SNAPSHOT_CHUNK_SIZE):
+            chunk = book_ids[start:start + SNAPSHOT_CHUNK_SIZE]
+            latest = (
+                db.query(StockSnapshot.book_id, func.max(StockSnapshot.id).label("id"))
+                .filter(StockSnapshot.book_id.in_(chunk))
+                .group_by(StockSnapshot.book_id)
+                .subquery()
+            )
+            previous = dict(
+                db.query(StockSnapshot.book_id, StockSnapshot.stock)
+                .join(latest, StockSnapshot.id == latest.c.id)
+                .all()
+            )
+            rows: List[Dict[str, Any]] = [
+                {
+                    "book_id": book_id,
+                    "stock": previous.get(book_id, 0) + int(deltas[book_id]),
+                    "last_movement_id": cutoff.id,
+                    "taken_at": cutoff.created_at,
+                }
+                for book_id in chunk
+            ]
+            db.execute(insert(StockSnapshot), rows)
+            written += len(rows)
+        db.commit()
+        return written
+
+
+inventory = CRUDInventory()
+
+
+@event.listens_for(Session, "after_flush")
+def _record_opening_stock(session, flush_context):
+    """
+    Opening ADJUSTMENT for every new book with stock, whoever inserted it
+    (CRUDBook, sample data, scripts), so the ledger always sums to
+    `Book.stock` and `stock_at` holds from the book's creation
+    """
+    movements = [
+        (obj.id, ADJUSTMENT, obj.stock, "book_created", None)
+        for obj in session.new
+        if isinstance(obj, Book) and obj.stock
+    ]
+    if movements:
+        inventory.record_many(session, movements)
@@ -0,0 +1,286 @@
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, event, func, insert, inspect, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.book import Book
+from app.models.customer import Customer
+from app.models.outbox import BOOK_TOPIC, CUSTOMER_TOPIC, SALE_TOPIC, STOCK_TOPIC, TOPICS, OutboxEvent, OutboxSequence
+from app.models.sale import Sale
+from app.models.sale_return import SaleReturn
+
+# Topics whose events carry the full row, so only the latest per record matters
+COMPACTED_TOPICS = (BOOK_TOPIC, CUSTOMER_TOPIC)
+
+# The one row of the outbox_sequence table
+_SEQUENCE_ROW_ID = 1
+
+# ORM classes whose inserts, updates and deletes are published automatically
+_ENTITY_TOPICS = {Book: BOOK_TOPIC, Customer: CUSTOMER_TOPIC, Sale: SALE_TOPIC}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return str(value)
+
+
+def _dumps(payload: Dict[str, Any]) -> str:
+    return json.dumps(payload, default=_json_default, separators=(",", ":"))
+
+
+def _row_payload(obj: Any) -> Dict[str, Any]:
+    """Loaded column values of `obj` (never triggers a load mid-flush)"""
+    state = inspect(obj)
+    return {attr.key: state.dict[attr.key] for attr in state.mapper.column_attrs if attr.key in state.dict}
+
+
+class CRUDOutbox:
+    """
+    Transactional outbox behind the change feed. Book, customer and sale
+    writes are captured by a session `after_flush` hook and stock movements
+    by the inventory ledger, so events commit or roll back with the change
+    that produced them and no write path has to remember to publish.
+    """
+
+    def add(self, db: Session, events: Iterable[Tuple[str, str, int, Dict[str, Any]]]) -> None:
+        """Append `(topic, event_type, aggregate_id, payload)` events to the caller's transaction"""
+        now = datetime.utcnow()
+        rows = [
+            {
+                "topic": topic,
+                "event_type": event_type,
+                "aggregate_id": aggregate_id,
+                "payload": _dumps(payload),
+                "created_at": now,
+            }
+            for topic, event_type, aggregate_id, payload in events
+        ]
+        if rows:
+            db.execute(insert(OutboxEvent), rows)
+
+    def add_stock_events(self, db: Session, movements: List[Dict[str, Any]]) -> None:
+        """Publish inventory ledger rows as `stock.<kind>` events"""
+        self.add(
+            db,
+            (
+                (
+                    STOCK_TOPIC,
+                    f"{STOCK_TOPIC}.{m['kind']}",
+                    m["book_id"],
+                    {
+                        "book_id": m["book_id"],
+                        "quantity": m["quantity"],
+                        "reference_type": m["reference_type"],
+                        "reference_id": m["reference_id"],
+                    },
+                )
+                for m in movements
+            ),
+        )
+
+    @staticmethod
+    def parse_cursor(cursor: Optional[str]) -> int:
+        if not cursor:
+            return 0
+        try:
+            value = int(cursor)
+        except ValueError:
+            raise ValueError("Invalid change feed cursor")
+        if value < 0:
+            raise ValueError("Invalid change feed cursor")
+        return value
+
+    def _lock_sequence(self, db: Session) -> int:
+        """
+        Take the counter row's write lock for the rest of the transaction and
+        return its value, creating the row on first use
+        """
+        locked = db.execute(
+            update(OutboxSequence)
+            .where(OutboxSequence.id == _SEQUENCE_ROW_ID)
+            .values(value=OutboxSequence.value)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not locked:
+            start = db.query(func.coalesce(func.max(OutboxEvent.sequence), 0)).scalar()
+            db.add(OutboxSequence(id=_SEQUENCE_ROW_ID, value=start))
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()  # another worker created it first
+            return self._lock_sequence(db)
+        return db.query(OutboxSequence.value).filter(OutboxSequence.id == _SEQUENCE_ROW_ID).scalar()
+
+    def relay(self, db: Session, *, batch_size: int = 5000) -> int:
+        """
+        Number committed events that have no sequence yet, in ID order, after
+        the last sequence handed out. Holding the counter row's lock keeps
+        relays in different workers from interleaving; only events visible
+        (committed) when the batch is read are numbered, so one still in an
+        open transaction is numbered by a later run, after everything a
+        consumer may already have read. Runs its own transactions (anything
+        pending on `db` is rolled back first, so every batch reads a snapshot
+        taken after the lock). Returns the number of events numbered.
+        """
+        db.rollback()
+        relayed = 0
+        while True:
+            last = self._lock_sequence(db)
+            ids = db.execute(
+                select(OutboxEvent.id)
+                .where(OutboxEvent.sequence.is_(None))
+                .order_by(OutboxEvent.id)
+                .limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                db.rollback()
+                return relayed
+            db.execute(
+                update(OutboxEvent),
+                [{"id": event_id, "sequence": last + n} for n, event_id in enumerate(ids, start=1)],
+            )
+            db.execute(
+                update(OutboxSequence)
+                .where(OutboxSequence.id == _SEQUENCE_ROW_ID)
+                .values(value=last + len(ids))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            relayed += len(ids)
+            if len(ids) < batch_size:
+                return relayed
+
+    def get_changes(
+        self,
+        db: Session,
+        *,
+        since: Optional[str] = None,
+        types: Optional[List[str]] = None,
+        limit: int = settings.CHANGES_PAGE_SIZE,
+    ) -> Tuple[List[OutboxEvent], str, bool]:
+        """
+        Relayed events after cursor `since` in commit (sequence) order,
+        optionally limited to `types` (topics like "stock" or event types
+        like "book.deleted"). Returns `(events, next_cursor, has_more)`; the
+        next cursor stays at `since` when nothing new has been relayed yet.
+        """
+        after = self.parse_cursor(since)
+        query = db.query(OutboxEvent).filter(OutboxEvent.sequence > after)
+
+        if types:
+            topics = [t for t in types if "." not in t]
+            event_types = [t for t in types if "." in t]
+            unknown = [t for t in types if t.split(".", 1)[0] not in TOPICS]
+            if unknown:
+                raise ValueError(f"Unknown change types: {', '.join(unknown)}")
+            query = query.filter(or_(OutboxEvent.topic.in_(topics), OutboxEvent.event_type.in_(event_types)))
+
+        events = query.order_by(OutboxEvent.sequence).limit(limit + 1).all()
+        has_more = len(events) > limit
+        events = events[:limit]
+        next_cursor = str(events[-1].sequence) if events else str(after)
+        return events, next_cursor, has_more
+
+    def latest_cursor(self, db: Session, *, topics: Optional[List[str]] = None) -> str:
+        """
+        Cursor of the newest relayed event (of `topics`, when given): a
+        consumer that snapshots state right after reading it and then
+        follows the feed from it misses nothing (events committed but not
+        yet relayed come after it)
+        """
+        query = db.query(func.max(OutboxEvent.sequence))
+        if topics:
+            query = query.filter(OutboxEvent.topic.in_(topics))
+        return str(query.scalar() or 0)
+
+    def purge_expired(self, db: Session, *, batch_size: int = 5000) -> int:
+        """Delete events past OUTBOX_RETENTION_SECONDS in bounded batches"""
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.OUTBOX_RETENTION_SECONDS)
+        removed = 0
+        while True:
+            ids = db.execute(
+                select(OutboxEvent.id)
+                .where(OutboxEvent.created_at < cutoff, OutboxEvent.sequence.isnot(None))
+                .order_by(OutboxEvent.id)
+                .limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                return removed
+            db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(ids)))
+            db.commit()
+            removed += len(ids)
+
+    def compact(self, db: Session, *, batch_size: int = 5000) -> int:
+        """
+        Drop book/customer events older than OUTBOX_COMPACT_AFTER_SECONDS
+        that a later event for the same record supersedes. Their payload is
+        the full row, so a consumer starting from an old cursor still ends
+        up with the latest state of every record.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.OUTBOX_COMPACT_AFTER_SECONDS)
+        removed = 0
+        while True:
+            latest = (
+                select(func.max(OutboxEvent.sequence).label("sequence"))
+                .where(OutboxEvent.topic.in_(COMPACTED_TOPICS))
+                .group_by(OutboxEvent.topic, OutboxEvent.aggregate_id)
+                .subquery()
+            )
+            ids = db.execute(
+                select(OutboxEvent.id)
+                .outerjoin(latest, latest.c.sequence == OutboxEvent.sequence)
+                .where(
+                    OutboxEvent.topic.in_(COMPACTED_TOPICS),
+                    OutboxEvent.created_at < cutoff,
+                    OutboxEvent.sequence.isnot(None),
+                    latest.c.sequence.is_(None),
+                )
+                .limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                return removed
+            db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(ids)))
+            db.commit()
+            removed += len(ids)
+
+
+outbox = CRUDOutbox()
+
+
+@event.listens_for(Session, "after_flush")
+def _publish_entity_changes(session, flush_context):
+    now = datetime.utcnow()
+    rows = []
+
+    def publish(topic: str, action: str, aggregate_id: int, payload: Dict[str, Any]) -> None:
+        rows.append({
+            "topic": topic,
+            "event_type": f"{topic}.{action}",
+            "aggregate_id": aggregate_id,
+            "payload": _dumps(payload),
+            "created_at": now,
+        })
+
+    for obj in session.new:
+        topic = _ENTITY_TOPICS.get(type(obj))
+        if topic:
+            publish(topic, "created", obj.id, _row_payload(obj))
+        elif isinstance(obj, SaleReturn):
+            publish(SALE_TOPIC, "returned", obj.sale_id, _row_payload(obj))
+    for obj in session.dirty:
+        topic = _ENTITY_TOPICS.get(type(obj))
+        if topic and session.is_modified(obj, include_collections=False):
+            publish(topic, "updated", obj.id, _row_payload(obj))
+    for obj in session.deleted:
+        topic = _ENTITY_TOPICS.get(type(obj))
+        if topic:
+            publish(topic, "deleted", obj.id, {"id": obj.id})
+
+    if rows:
+        session.connection().execute(OutboxEvent.__table__.insert(), rows)
@@ -0,0 +1,224 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Optional
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.crud.base import CRUDBase
+from app.crud.crud_inventory import inventory
+from app.crud.crud_sales_rollup import sales_rollup
+from app.models.inventory import SALE
+from app.models.reservation import ACTIVE, CONVERTED, EXPIRED, RELEASED, Reservation, ReservationItem
+from app.models.sale import Sale
+from app.models.sale_item import SaleItem
+from app.schemas.reservation import ReservationConvert, ReservationCreate, ReservationExtend
+
+
+class CRUDReservation(CRUDBase[Reservation, ReservationCreate, ReservationExtend]):
+    """
+    Stock holds for carts. Every hold is mirrored in `Book.reserved` inside
+    the same transaction, so availability (stock - reserved) is a column read
+    and never an aggregate over this table. State changes are compare-and-set
+    on `status`, which makes release/convert/expiry safe to race.
+    """
+
+    @staticmethod
+    def _expiry(ttl_seconds: Optional[int]) -> datetime:
+        ttl = min(ttl_seconds or settings.RESERVATION_TTL_SECONDS, settings.RESERVATION_MAX_TTL_SECONDS)
+        return datetime.utcnow() + timedelta(seconds=ttl)
+
+    @staticmethod
+    def _quantities(reservation: Reservation) -> Dict[int, int]:
+        quantities: Dict[int, int] = {}
+        for item in reservation.items:
+            quantities[item.book_id] = quantities.get(item.book_id, 0) + item.quantity
+        return quantities
+
+    def _transition(self, db: Session, reservation: Reservation, status: str, *, require_unexpired: bool) -> bool:
+        criteria = [Reservation.id == reservation.id, Reservation.status == ACTIVE]
+        if require_unexpired:
+            criteria.append(Reservation.expires_at > datetime.utcnow())
+        result = db.execute(
+            update(Reservation)
+            .where(*criteria)
+            .values(status=status)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    def create_reservation(self, db: Session, *, obj_in: ReservationCreate) -> Reservation:
+        """Hold stock for every line or for none of them"""
+        from app.crud.crud_book import book as crud_book
+
+        quantities: Dict[int, int] = {}
+        for item in obj_in.items:
+            quantities[item.book_id] = quantities.get(item.book_id, 0) + item.quantity
+
+        try:
+            if not crud_book.hold_stock(db, quantities=quantities):
+                db.rollback()
+                raise ValueError(crud_book.stock_shortfall_reason(db, quantities=quantities))
+            reservation = Reservation(
+                customer_id=obj_in.customer_id,
+                status=ACTIVE,
+                expires_at=self._expiry(obj_in.ttl_seconds),
+                items=[ReservationItem(book_id=i.book_id, quantity=i.quantity) for i in obj_in.items],
+            )
+            db.add(reservation)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        db.refresh(reservation)
+        return reservation
+
+    def extend(self, db: Session, *, reservation: Reservation, ttl_seconds: Optional[int] = None) -> Reservation:
+        result = db.execute(
+            update(Reservation)
+            .where(
+                Reservation.id == reservation.id,
+                Reservation.status == ACTIVE,
+                Reservation.expires_at > datetime.utcnow(),
+            )
+            .values(expires_at=self._expiry(ttl_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            db.rollback()
+            raise ValueError("Reservation is no longer active")
+        db.commit()
+        db.refresh(reservation)
+        return reservation
+
+    def release(self, db: Session, *, reservation: Reservation) -> Reservation:
+        from app.crud.crud_book import book as crud_book
+
+        try:
+            if not self._transition(db, reservation, RELEASED, require_unexpired=False):
+                raise ValueError("Reservation is no longer active")
+            crud_book.release_stock(db, quantities=self._quantities(reservation))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        db.refresh(reservation)
+        return reservation
+
+    def convert_to_sale(
+        self, db: Session, *, reservation: Reservation, obj_in: ReservationConvert
+    ) -> Sale:
+        """
+        Turn an unexpired hold into a sale: held units come off both stock
+        and reserved, and the sale is priced at current book prices unless
+        a total is given.
+        """
+        from app.crud.crud_book import book as crud_book
+        from app.models.book import Book
+        from app.search.cache import search_cache
+
+        quantities = self._quantities(reservation)
+        try:
+            if not self._transition(db, reservation, CONVERTED, require_unexpired=True):
+                raise ValueError("Reservation is no longer active")
+            if not crud_book.consume_held_stock(db, quantities=quantities):
+                raise ValueError("Reserved stock is no longer on hand")
+
+            prices = dict(db.query(Book.id, Book.price).filter(Book.id.in_(list(quantities))).all())
+            total = obj_in.total_amount or sum(
+                (Decimal(prices[book_id]) * quantity for book_id, quantity in quantities.items()),
+                Decimal("0"),
+            )
+            sale = Sale(
+                book_id=reservation.items[0].book_id,
+                customer_id=reservation.customer_id,
+                quantity=sum(quantities.values()),
+                total_amount=total,
+            )
+            db.add(sale)
+            db.flush()
+            db.execute(
+                insert(SaleItem),
+                [
+                    {
+                        "sale_id": sale.id,
+                        "book_id": item.book_id,
+                        "quantity": item.quantity,
+                        "unit_price": float(prices[item.book_id]),
+                        "subtotal": float(prices[item.book_id] * item.quantity),
+                    }
+                    for item in reservation.items
+                ],
+            )
+            inventory.record(
+                db, kind=SALE, quantities={b: -q for b, q in quantities.items()},
+                reference_type="sale", reference_id=sale.id
+            )
+            sales_rollup.add_sales(
+                db,
+                [(
+                    sale.created_at.date(),
+                    total,
+                    [(item.book_id, item.quantity, Decimal(prices[item.book_id]) * item.quantity) for item in reservation.items],
+                )],
+            )
+            db.execute(
+                update(Reservation)
+                .where(Reservation.id == reservation.id)
+                .values(sale_id=sale.id)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        search_cache.bump_version()
+        db.refresh(sale)
+        return sale
+
+    def expire_due(self, db: Session, *, limit: Optional[int] = None) -> int:
+        """
+        Expire up to `limit` overdue holds in one transaction: one status
+        UPDATE over their IDs and one aggregated release of their units.
+        Returns the number of reservations expired.
+        """
+        from app.crud.crud_book import book as crud_book
+
+        limit = limit or settings.RESERVATION_SWEEP_BATCH_SIZE
+        try:
+            ids = [
+                row.id
+                for row in db.query(Reservation.id)
+                .filter(Reservation.status == ACTIVE, Reservation.expires_at <= datetime.utcnow())
+                .order_by(Reservation.expires_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            ]
+            if not ids:
+                db.rollback()
+                return 0
+            result = db.execute(
+                update(Reservation)
+                .where(Reservation.id.in_(ids), Reservation.status == ACTIVE)
+                .values(status=EXPIRED)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != len(ids):
+                # Some holds were released or converted meanwhile; the next sweep retries
+                db.rollback()
+                return 0
+            quantities = dict(
+                db.query(ReservationItem.book_id, func.sum(ReservationItem.quantity))
+                .filter(ReservationItem.reservation_id.in_(ids))
+                .group_by(ReservationItem.book_id)
+                .all()
+            )
+            crud_book.release_stock(db, quantities={k: int(v) for k, v in quantities.items()})
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return len(ids)
+
+
+reservation = CRUDReservation(Reservation)
@@ -1,33 +1,290 @@
-from typing import List, Optional, Dict, Any
-from datetime import datetime, date
+from typing import List, Optional, Dict, Any, Tuple, Union
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import insert
 from app.crud.base import CRUDBase
+from app.crud.crud_inventory import inventory
+from app.crud.crud_sales_rollup import sales_rollup
+from app.models.inventory import RETURN, SALE
 from app.models.sale import Sale
-from app.schemas.sale import SaleCreate, SaleUpdate
+from app.models.sale_item import SaleItem
+from app.schemas.sale import SaleBatchEntry, SaleCreate, SaleUpdate
+
+# Times a sales batch is re-planned when stock changes between read and update
+BATCH_STOCK_ATTEMPTS = 3
+
+
+class StockShortfall(ValueError):
+    """A basket could not be sold because some of its books are short"""
+
+    def __init__(self, quantities: Dict[int, int]):
+        super().__init__("Insufficient stock")
+        self.quantities = quantities
 
 
 class CRUDSale(CRUDBase[Sale, SaleCreate, SaleUpdate]):
     def create_sale(self, db: Session, *, obj_in: SaleCreate) -> Sale:
-        """Create a sale and update book stock"""
+        """
+        Check out a basket in one transaction: the sale and all its items are
+        inserted together and stock is decremented with a single conditional
+        UPDATE, so a short line fails the whole basket and concurrent
+        checkouts cannot oversell. `Sale.book_id`/`quantity` keep the first
+        line's book and the basket's total quantity for older reports.
+        """
         from app.crud.crud_book import book as crud_book
-        
-        # Check if book exists and has enough stock
-        book_obj = crud_book.get(db, obj_in.book_id)
-        if not book_obj:
-            raise ValueError("Book not found")
-        
-        if book_obj.stock < obj_in.quantity:
-            raise ValueError("Insufficient stock")
-        
-        # Create sale
-        sale = self.create(db, obj_in=obj_in)
-        
-        # Update book stock
-        crud_book.update_stock(db, book_id=obj_in.book_id, quantity_change=-obj_in.quantity)
-        
+        from app.search.cache import search_cache
+
+        try:
+            sale = self._insert_sale(db, obj_in)
+            db.commit()
+        except StockShortfall as e:
+            db.rollback()
+            raise ValueError(crud_book.stock_shortfall_reason(db, quantities=e.quantities))
+        except Exception:
+            db.rollback()
+            raise
+
+        search_cache.bump_version()
+        db.refresh(sale)
+        return sale
+
+    def create_sale_grouped(self, db: Session, *, obj_in: SaleCreate, writer=None) -> Sale:
+        """
+        Same checkout as `create_sale`, but the writes are handed to the
+        group-commit writer and committed together with other concurrent
+        sales; returns once this sale's batch has committed. An
+        Idempotency-Key claim executing on `db` is marked EXECUTED in the
+        writer's transaction, since `db` itself never commits the sale.
+        """
+        from app.crud.crud_book import book as crud_book
+        from app.crud.crud_idempotency import idempotency_key
+        from app.db.group_commit import sale_writer
+        from app.search.cache import search_cache
+
+        writer = writer or sale_writer
+        claim_id = idempotency_key.active_claim_id(db)
+
+        def write(wdb: Session) -> int:
+            sale_id = self._insert_sale(wdb, obj_in).id
+            if claim_id is not None:
+                idempotency_key.mark_executed(wdb, claim_id=claim_id)
+            return sale_id
+
+        try:
+            sale_id = writer.execute(write)
+        except StockShortfall as e:
+            raise ValueError(crud_book.stock_shortfall_reason(db, quantities=e.quantities))
+
+        search_cache.bump_version()
+        return self.get(db, sale_id)
+
+    def _insert_sale(self, db: Session, obj_in: SaleCreate) -> Sale:
+        """Decrement stock and insert the sale, its items and ledger rows without committing"""
+        from app.crud.crud_book import book as crud_book
+
+        if not obj_in.items:
+            raise ValueError("Sale must contain at least one item")
+
+        quantities: Dict[int, int] = {}
+        for item in obj_in.items:
+            quantities[item.book_id] = quantities.get(item.book_id, 0) + item.quantity
+
+        if not crud_book.decrement_stock(db, quantities=quantities):
+            raise StockShortfall(quantities)
+
+        sale = Sale(
+            book_id=obj_in.items[0].book_id,
+            customer_id=obj_in.customer_id,
+            quantity=sum(quantities.values()),
+            total_amount=obj_in.total_amount,
+        )
+        db.add(sale)
+        db.flush()
+        db.execute(insert(SaleItem), self._item_rows(sale.id, obj_in.items))
+        inventory.record(
+            db, kind=SALE, quantities={b: -q for b, q in quantities.items()},
+            reference_type="sale", reference_id=sale.id
+        )
+        sales_rollup.add_sales(db, [(sale.created_at.date(), obj_in.total_amount, self._rollup_lines(obj_in.items))])
         return sale
 
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: Sale,
+        obj_in: Union[SaleUpdate, Dict[str, Any]],
+        expected_version: Optional[int] = None
+    ) -> Sale:
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.dict(exclude_unset=True)
+        total_amount = update_data.get("total_amount")
+        if total_amount is not None and total_amount != db_obj.total_amount:
+            # Committed (or rolled back) together with the sale by the base update
+            sales_rollup.change_sale_total(db, sale=db_obj, total_amount=total_amount)
+        return super().update(db, db_obj=db_obj, obj_in=update_data, expected_version=expected_version)
+
+    def remove_sale(self, db: Session, *, sale: Sale) -> None:
+        """
+        Delete a sale and put its items back on the shelf in one
+        transaction, recording the restock as return movements
+        """
+        from app.crud.crud_book import book as crud_book
+        from app.search.cache import search_cache
+
+        quantities: Dict[int, int] = {}
+        for item in sale.items:
+            # Units already returned were restocked by their SaleReturn
+            outstanding = item.quantity - (item.returned_quantity or 0)
+            if outstanding > 0:
+                quantities[item.book_id] = quantities.get(item.book_id, 0) + outstanding
+        if not sale.items:
+            # Sales recorded before line items existed
+            quantities = {sale.book_id: sale.quantity}
+        try:
+            crud_book.increment_stock(db, quantities=quantities)
+            inventory.record(
+                db, kind=RETURN, quantities=quantities, reference_type="sale_deleted", reference_id=sale.id
+            )
+            sales_rollup.remove_sale(db, sale=sale)
+            db.delete(sale)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        search_cache.bump_version()
+
+    @staticmethod
+    def _rollup_lines(items) -> List[Tuple[int, int, Decimal]]:
+        return [(item.book_id, item.quantity, item.unit_price * item.quantity) for item in items]
+
+    @staticmethod
+    def _item_rows(sale_id: int, items) -> List[Dict[str, Any]]:
+        return [
+            {
+                "sale_id": sale_id,
+                "book_id": item.book_id,
+                "quantity": item.quantity,
+                "unit_price": float(item.unit_price),
+                "subtotal": float(item.unit_price * item.quantity),
+            }
+            for item in items
+        ]
+
+    def create_sales_batch(
+        self, db: Session, *, entries: List[SaleBatchEntry]
+    ) -> List[Tuple[Optional[int], Optional[str]]]:
+        """
+        Ingest many sales in one transaction, returning `(sale_id, error)` per
+        entry in input order. Referenced books and customers are loaded with
+        one IN query each, entries are allocated against that stock snapshot
+        in order (a short or invalid entry is rejected on its own), and the
+        accepted entries' stock is taken with one aggregated conditional
+        UPDATE. If stock moved underneath us the batch is re-planned.
+        """
+        from app.crud.crud_book import book as crud_book
+        from app.models.book import Book
+        from app.models.customer import Customer
+        from app.search.cache import search_cache
+
+        book_ids = {item.book_id for entry in entries for item in entry.items}
+        customer_ids = {entry.customer_id for entry in entries if entry.customer_id}
+
+        for _ in range(BATCH_STOCK_ATTEMPTS):
+            stock = dict(
+                db.query(Book.id, Book.stock - Book.reserved)
+                .filter(Book.id.in_(book_ids))
+                .with_for_update()
+                .all()
+            ) if book_ids else {}
+            known_customers = {
+                row.id for row in db.query(Customer.id).filter(Customer.id.in_(customer_ids))
+            } if customer_ids else set()
+
+            results: List[Tuple[Optional[int], Optional[str]]] = []
+            accepted = []
+            decrements: Dict[int, int] = {}
+            for entry in entries:
+                quantities: Dict[int, int] = {}
+                for item in entry.items:
+                    quantities[item.book_id] = quantities.get(item.book_id, 0) + item.quantity
+                error = None
+                if not entry.items:
+                    error = "Sale must contain at least one item"
+                elif entry.customer_id and entry.customer_id not in known_customers:
+                    error = "Customer not found"
+                else:
+                    for book_id, quantity in quantities.items():
+                        if book_id not in stock:
+                            error = f"Book {book_id} not found"
+                            break
+                        if stock[book_id] < quantity:
+                            error = f"Insufficient stock for book {book_id}"
+                            break
+                if error:
+                    results.append((None, error))
+                    continue
+                for book_id, quantity in quantities.items():
+                    stock[book_id] -= quantity
+                    decrements[book_id] = decrements.get(book_id, 0) + quantity
+                accepted.append((len(results), entry, sum(quantities.values())))
+                results.append((None, None))
+
+            if crud_book.decrement_stock(db, quantities=decrements):
+                break
+            db.rollback()
+        else:
+            raise ValueError("Stock changed during batch ingestion, please retry")
+
+        try:
+            sales = [
+                Sale(
+                    book_id=entry.items[0].book_id,
+                    customer_id=entry.customer_id,
+                    quantity=quantity,
+                    total_amount=entry.total_amount,
+                    created_at=entry.created_at or datetime.utcnow(),
+                )
+                for _, entry, quantity in accepted
+            ]
+            db.add_all(sales)
+            db.flush()
+            sale_ids = [sale.id for sale in sales]
+            if sales:
+                db.execute(
+                    insert(SaleItem),
+                    [
+                        row
+                        for sale_id, (_, entry, _) in zip(sale_ids, accepted)
+                        for row in self._item_rows(sale_id, entry.items)
+                    ],
+                )
+                inventory.record_many(
+                    db,
+                    [
+                        (item.book_id, SALE, -item.quantity, "sale", sale_id)
+                        for sale_id, (_, entry, _) in zip(sale_ids, accepted)
+                        for item in entry.items
+                    ],
+                )
+                sales_rollup.add_sales(
+                    db,
+                    [
+                        (sale.created_at.date(), entry.total_amount, self._rollup_lines(entry.items))
+                        for sale, (_, entry, _) in zip(sales, accepted)
+                    ],
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        for sale_id, (index, _, _) in zip(sale_ids, accepted):
+            results[index] = (sale_id, None)
+        if sales:
+            search_cache.bump_version()
+        return results
+
     def get_sales_by_customer(
         self, db: Session, *, customer_id: int, skip: int = 0, limit: int = 100
     ) -> List[Sale]:
@@ -50,6 +307,14 @@ class CRUDSale(CRUDBase[Sale, SaleCreate, SaleUpdate]):
             .all()
         )
 
+    @staticmethod
+    def _day_bounds(start_date: date, end_date: date) -> Tuple[datetime, datetime]:
+        """Half-open `[start, end)` timestamps covering whole days `start_date`..`end_date`"""
+        return (
+            datetime.combine(start_date, time.min),
+            datetime.combine(end_date + timedelta(days=1), time.min),
+        )
+
     def get_sales_by_date_range(
         self,
         db: Session,
@@ -59,14 +324,12 @@ class CRUDSale(CRUDBase[Sale, SaleCreate, SaleUpdate]):
         skip: int = 0,
         limit: int = 100
     ) -> List[Sale]:
+        # Compare the raw column against timestamps so ix_sales_created_at applies
+        start, end = self._day_bounds(start_date, end_date)
         return (
             db.query(Sale)
-            .filter(
-                and_(
-                    func.date(Sale.created_at) >= start_date,
-                    func.date(Sale.created_at) <= end_date
-                )
-            )
+            .filter(Sale.created_at >= start, Sale.created_at < end)
+            .order_by(Sale.created_at, Sale.id)
             .offset(skip)
             .limit(limit)
             .all()
@@ -78,10 +341,7 @@ class CRUDSale(CRUDBase[Sale, SaleCreate, SaleUpdate]):
             db, start_date=today, end_date=today
         )
 
-    def get_sales_with_details(
-        self, db: Session, *, skip: int = 0, limit: int = 100
-    ) -> List[Sale]:
-        """Get sales with book and customer information"""
+    def _sales_with_details_query(self, db: Session):
         from app.models.book import Book
         from app.models.customer import Customer
         
@@ -89,11 +349,20 @@ class CRUDSale(CRUDBase[Sale, SaleCreate, SaleUpdate]):
             db.query(Sale)
             .join(Book, Sale.book_id == Book.id)
             .join(Customer, Sale.customer_id == Customer.id, isouter=True)
-            .offset(skip)
-            .limit(limit)
-            .all()
         )
 
+    def get_sales_with_details(
+        self, db: Session, *, skip: int = 0, limit: int = 100
+    ) -> List[Sale]:
+        """Get sales with book and customer information"""
+        return self._sales_with_details_query(db).offset(skip).limit(limit).all()
+
+    def get_sales_with_details_keyset(
+        self, db: Session, *, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[Sale], Optional[str]]:
+        """Keyset-paginated variant of `get_sales_with_details`"""
+        return self.paginate_keyset(self._sales_with_details_query(db), cursor=cursor, limit=limit)
+
     def get_sales_summary(
         self,
         db: Session,
@@ -101,29 +370,18 @@ class CRUDSale(CRUDBase[Sale, SaleCreate, SaleUpdate]):
         start_date: Optional[date] = None,
         end_date: Optional[date] = None
     ) -> Dict[str, Any]:
-        """Get sales summary statistics"""
-        query = db.query(
-            func.count(Sale.id).label('total_sales'),
-            func.sum(Sale.total_amount).label('total_revenue'),
-            func.sum(Sale.quantity).label('total_books_sold'),
-            func.avg(Sale.total_amount).label('average_sale_amount')
-        )
-        
-        if start_date and end_date:
-            query = query.filter(
-                and_(
-                    func.date(Sale.created_at) >= start_date,
-                    func.date(Sale.created_at) <= end_date
-                )
-            )
-        
-        result = query.first()
+        """Get sales summary statistics, net of returns, from the daily rollup"""
+        totals = sales_rollup.totals(db, start=start_date, end=end_date)
+        total_sales = totals.sales_count or 0
+        revenue = float(totals.revenue or 0) - float(totals.refunded_amount or 0)
         
         return {
-            'total_sales': result.total_sales or 0,
-            'total_revenue': float(result.total_revenue or 0),
-            'total_books_sold': result.total_books_sold or 0,
-            'average_sale_amount': float(result.average_sale_amount or 0),
+            'total_sales': total_sales,
+            'total_revenue': revenue,
+            'total_books_sold': (totals.quantity or 0) - (totals.returned_quantity or 0),
+            'average_sale_amount': revenue / total_sales if total_sales else 0.0,
+            'total_refunded': float(totals.refunded_amount or 0),
+            'total_books_returned': totals.returned_quantity or 0,
             'period_start': start_date,
             'period_end': end_date
         }
@@ -131,57 +389,18 @@ class CRUDSale(CRUDBase[Sale, SaleCreate, SaleUpdate]):
     def get_daily_sales_report(
         self, db: Session, *, days: int = 30
     ) -> List[Dict[str, Any]]:
-        """Get daily sales for the last N days"""
-        from datetime import timedelta
-        
+        """Get daily sales for the last N days, net of returns (booked on the sale's day)"""
         end_date = date.today()
         start_date = end_date - timedelta(days=days)
         
-        return (
-            db.query(
-                func.date(Sale.created_at).label('sale_date'),
-                func.count(Sale.id).label('total_sales'),
-                func.sum(Sale.total_amount).label('total_revenue'),
-                func.sum(Sale.quantity).label('total_books_sold')
-            )
-            .filter(
-                and_(
-                    func.date(Sale.created_at) >= start_date,
-                    func.date(Sale.created_at) <= end_date
-                )
-            )
-            .group_by(func.date(Sale.created_at))
-            .order_by(func.date(Sale.created_at))
-            .all()
-        )
+        return sales_rollup.daily_totals(db, start=start_date, end=end_date)
 
     def get_top_selling_books(
         self, db: Session, *, days: Optional[int] = None, limit: int = 10
-    ) -> List[Dict[str, Any]]:
-        """Get top selling books"""
-        from app.models.book import Book
-        
-        query = (
-            db.query(
-                Book,
-                func.sum(Sale.quantity).label('total_sold'),
-                func.sum(Sale.total_amount).label('total_revenue')
-            )
-            .join(Sale, Book.id == Sale.book_id)
-        )
-        
-        if days:
-            from datetime import timedelta
-            start_date = date.today() - timedelta(days=days)
-            query = query.filter(func.date(Sale.created_at) >= start_date)
-        
-        return (
-            query
-            .group_by(Book.id)
-            .order_by(func.sum(Sale.quantity).desc())
-            .limit(limit)
-            .all()
-        )
+    ) -> List[Tuple[Any, int, float]]:
+        """Get top selling books, net of returns (see `CRUDBook.get_popular_books`)"""
+        from app.crud.crud_book import book as crud_book
 
+        return crud_book.get_popular_books(db, days=days, limit=limit)
 
 sale = CRUDSale(Sale)
\ No newline at end of file
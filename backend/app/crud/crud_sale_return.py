@@ -0,0 +1,117 @@
+from decimal import Decimal
+from typing import Dict, List, Optional
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.crud.base import CRUDBase
+from app.crud.crud_inventory import inventory
+from app.crud.crud_sales_rollup import sales_rollup
+from app.models.inventory import RETURN
+from app.models.sale import Sale
+from app.models.sale_item import SaleItem
+from app.models.sale_return import SaleReturn, SaleReturnItem
+from app.schemas.sale import SaleReturnCreate
+
+CENT = Decimal("0.01")
+
+
+class CRUDSaleReturn(CRUDBase[SaleReturn, SaleReturnCreate, SaleReturnCreate]):
+    """
+    Partial or full returns against a sale's line items. A return bumps the
+    per-line and per-sale returned totals with conditional UPDATEs (so two
+    concurrent returns cannot take back more than was sold or refund more
+    than was paid), puts the goods back in stock and records RETURN ledger
+    movements, all in one transaction.
+    """
+
+    def get_by_sale(self, db: Session, *, sale_id: int) -> List[SaleReturn]:
+        return db.query(SaleReturn).filter(SaleReturn.sale_id == sale_id).order_by(SaleReturn.id).all()
+
+    def create_return(
+        self, db: Session, *, sale: Sale, obj_in: SaleReturnCreate, created_by_id: Optional[int] = None
+    ) -> SaleReturn:
+        from app.crud.crud_book import book as crud_book
+        from app.search.cache import search_cache
+
+        lines = {item.id: item for item in sale.items}
+        if not lines:
+            raise ValueError("Sale has no line items to return")
+
+        requested: Dict[int, int] = {}
+        for item in obj_in.items:
+            if item.sale_item_id not in lines:
+                raise ValueError(f"Sale item {item.sale_item_id} does not belong to sale {sale.id}")
+            requested[item.sale_item_id] = requested.get(item.sale_item_id, 0) + item.quantity
+
+        line_refunds = {
+            item_id: (Decimal(str(lines[item_id].unit_price)) * quantity).quantize(CENT)
+            for item_id, quantity in requested.items()
+        }
+        refund = obj_in.refund_amount if obj_in.refund_amount is not None else sum(line_refunds.values())
+        returned = sum(requested.values())
+        quantities: Dict[int, int] = {}
+        for item_id, quantity in requested.items():
+            book_id = lines[item_id].book_id
+            quantities[book_id] = quantities.get(book_id, 0) + quantity
+
+        try:
+            for item_id, quantity in requested.items():
+                result = db.execute(
+                    update(SaleItem)
+                    .where(SaleItem.id == item_id, SaleItem.returned_quantity + quantity <= SaleItem.quantity)
+                    .values(returned_quantity=SaleItem.returned_quantity + quantity)
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount != 1:
+                    raise ValueError(f"Cannot return more than was sold on sale item {item_id}")
+
+            result = db.execute(
+                update(Sale)
+                .where(Sale.id == sale.id, Sale.refunded_amount + refund <= Sale.total_amount)
+                .values(
+                    returned_quantity=Sale.returned_quantity + returned,
+                    refunded_amount=Sale.refunded_amount + refund,
+                    version=Sale.version + 1,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != 1:
+                raise ValueError("Refund exceeds the amount left to refund on this sale")
+
+            crud_book.increment_stock(db, quantities=quantities)
+            sale_return = SaleReturn(
+                sale_id=sale.id,
+                quantity=returned,
+                refund_amount=refund,
+                reason=obj_in.reason,
+                created_by_id=created_by_id,
+                items=[
+                    SaleReturnItem(
+                        sale_item_id=item_id,
+                        book_id=lines[item_id].book_id,
+                        quantity=quantity,
+                        refund_amount=line_refunds[item_id],
+                    )
+                    for item_id, quantity in requested.items()
+                ],
+            )
+            db.add(sale_return)
+            db.flush()
+            inventory.record(
+                db, kind=RETURN, quantities=quantities, reference_type="sale_return", reference_id=sale_return.id
+            )
+            if sale.created_at is not None:
+                sales_rollup.add_return(
+                    db, day=sale.created_at.date(), refund_amount=refund,
+                    lines=[(lines[i].book_id, q, line_refunds[i]) for i, q in requested.items()],
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        search_cache.bump_version()
+        db.refresh(sale_return)
+        return sale_return
+
+
+sale_return = CRUDSaleReturn(SaleReturn)
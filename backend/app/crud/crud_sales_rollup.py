@@ -0,0 +1,291 @@
+from datetime import date
+from decimal import ROUND_DOWN, Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, func, update
+from sqlalchemy.orm import Session, selectinload
+from app.models.book import Book
+from app.models.sale import Sale
+from app.models.sale_return import SaleReturn
+from app.models.sales_rollup import UNCATEGORIZED, SalesDailyRollup
+
+CENT = Decimal("0.01")
+
+# Additive columns, in the order deltas are accumulated
+COUNTERS = ("sales_count", "quantity", "revenue", "returned_quantity", "refunded_amount")
+
+# (book_id, quantity, value) per line, in line order
+Lines = List[Tuple[int, int, Decimal]]
+Deltas = Dict[Tuple[date, int], List[Any]]
+
+
+def allocate(amount: Decimal, weights: List[Decimal]) -> List[Decimal]:
+    """Split `amount` across `weights` to the cent; rounding leftovers go to the first share"""
+    total = sum(weights, Decimal("0"))
+    if total <= 0:
+        shares = [Decimal("0")] * len(weights)
+    else:
+        shares = [(amount * w / total).quantize(CENT, rounding=ROUND_DOWN) for w in weights]
+    shares[0] += amount - sum(shares, Decimal("0"))
+    return shares
+
+
+def _sale_lines(sale: Sale) -> Lines:
+    if not sale.items:
+        # Sales recorded before line items existed
+        return [(sale.book_id, sale.quantity, Decimal(str(sale.total_amount)))]
+    return [
+        (item.book_id, item.quantity, Decimal(str(item.subtotal)))
+        for item in sorted(sale.items, key=lambda i: i.id)
+    ]
+
+
+def _return_lines(sale_return: SaleReturn) -> Lines:
+    return [
+        (item.book_id, item.quantity, Decimal(str(item.refund_amount)))
+        for item in sorted(sale_return.items, key=lambda i: i.id)
+    ]
+
+
+class CRUDSalesRollup:
+    """
+    Maintains `sales_daily_rollup` inside the caller's transaction and
+    answers the date-range sales reports from it, so a report costs one row
+    per day and book instead of one per sale. Writers pass plain
+    `(day, amount, lines)` tuples; the same split of a sale's total across
+    its lines is used when adding and removing it, so the two always cancel.
+    """
+
+    @staticmethod
+    def _entry(deltas: Deltas, day: date, book_id: int) -> List[Any]:
+        return deltas.setdefault((day, book_id), [0, 0, Decimal("0"), 0, Decimal("0")])
+
+    def _add_sale(self, deltas: Deltas, day: date, total_amount: Decimal, lines: Lines, sign: int) -> None:
+        shares = allocate(Decimal(str(total_amount)), [value for _, _, value in lines])
+        for index, ((book_id, quantity, _), share) in enumerate(zip(lines, shares)):
+            entry = self._entry(deltas, day, book_id)
+            if index == 0:
+                entry[0] += sign
+            entry[1] += sign * quantity
+            entry[2] += sign * share
+
+    def _add_return(self, deltas: Deltas, day: date, refund_amount: Decimal, lines: Lines, sign: int) -> None:
+        shares = allocate(Decimal(str(refund_amount)), [value for _, _, value in lines])
+        for (book_id, quantity, _), share in zip(lines, shares):
+            entry = self._entry(deltas, day, book_id)
+            entry[3] += sign * quantity
+            entry[4] += sign * share
+
+    def add_sales(
+        self, db: Session, sales: Iterable[Tuple[date, Decimal, Lines]], *, sign: int = 1
+    ) -> None:
+        """Count `(day, total_amount, lines)` sales in (or, with sign=-1, out of) the rollup"""
+        deltas: Deltas = {}
+        for day, total_amount, lines in sales:
+            self._add_sale(deltas, day, total_amount, lines, sign)
+        self._apply(db, deltas)
+
+    def add_return(self, db: Session, *, day: date, refund_amount: Decimal, lines: Lines) -> None:
+        """Record a return against a sale made on `day`"""
+        deltas: Deltas = {}
+        self._add_return(deltas, day, refund_amount, lines, 1)
+        self._apply(db, deltas)
+
+    def remove_sale(self, db: Session, *, sale: Sale) -> None:
+        """Take a sale and its returns back out of the rollup"""
+        if sale.created_at is None:
+            return
+        deltas: Deltas = {}
+        day = sale.created_at.date()
+        self._add_sale(deltas, day, sale.total_amount, _sale_lines(sale), -1)
+        for sale_return in sale.returns:
+            self._add_return(deltas, day, sale_return.refund_amount, _return_lines(sale_return), -1)
+        self._apply(db, deltas)
+
+    def change_sale_total(self, db: Session, *, sale: Sale, total_amount: Decimal) -> None:
+        """Re-split a sale's revenue after its total changes"""
+        if sale.created_at is None:
+            return
+        deltas: Deltas = {}
+        day, lines = sale.created_at.date(), _sale_lines(sale)
+        self._add_sale(deltas, day, sale.total_amount, lines, -1)
+        self._add_sale(deltas, day, total_amount, lines, 1)
+        self._apply(db, deltas)
+
+    def recategorize(self, db: Session, *, book_id: int, category_id: Optional[int]) -> None:
+        """Move a book's rows to its new category (rows always carry the current one)"""
+        db.execute(
+            update(SalesDailyRollup)
+            .where(SalesDailyRollup.book_id == book_id)
+            .values(category_id=category_id or UNCATEGORIZED)
+            .execution_options(synchronize_session=False)
+        )
+
+    def _apply(self, db: Session, deltas: Deltas, *, publish: bool = True) -> None:
+        from app.analytics.leaderboard import stage
+
+        deltas = {key: values for key, values in deltas.items() if any(values)}
+        if not deltas:
+            return
+        book_ids = {book_id for _, book_id in deltas}
+        categories = dict(db.query(Book.id, Book.category_id).filter(Book.id.in_(book_ids)).all())
+        rows = [
+            {
+                "sale_date": day,
+                "book_id": book_id,
+                "category_id": categories.get(book_id) or UNCATEGORIZED,
+                **dict(zip(COUNTERS, values)),
+            }
+            # Sorted so concurrent writers lock rows in the same order
+            for (day, book_id), values in sorted(deltas.items())
+        ]
+        self._upsert(db, rows)
+        if publish:
+            stage(db, [
+                (day, book_id, values[1] - values[3], float(values[2] - values[4]))
+                for (day, book_id), values in deltas.items()
+                if values[1] != values[3] or values[2] != values[4]
+            ])
+
+    @staticmethod
+    def _upsert(db: Session, rows: List[Dict[str, Any]]) -> None:
+        table = SalesDailyRollup.__table__
+        dialect = db.get_bind().dialect.name
+        if dialect == "mysql":
+            from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+            stmt = mysql_insert(table)
+            stmt = stmt.on_duplicate_key_update({c: table.c[c] + stmt.inserted[c] for c in COUNTERS})
+            db.execute(stmt, rows)
+        elif dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+
+            stmt = dialect_insert(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["sale_date", "book_id", "category_id"],
+                set_={c: table.c[c] + stmt.excluded[c] for c in COUNTERS},
+            )
+            db.execute(stmt, rows)
+        else:
+            for row in rows:
+                key = (
+                    table.c.sale_date == row["sale_date"],
+                    table.c.book_id == row["book_id"],
+                    table.c.category_id == row["category_id"],
+                )
+                result = db.execute(
+                    table.update().where(*key).values({c: table.c[c] + row[c] for c in COUNTERS})
+                )
+                if result.rowcount == 0:
+                    db.execute(table.insert(), [row])
+
+    def rebuild(self, db: Session, *, chunk_size: int = 2000) -> int:
+        """
+        Regenerate the whole rollup from `sales`, their items and returns in
+        one transaction; returns the number of rollup rows written. Sales
+        without a `created_at` belong to no day and are left out, as they
+        are from every date-range report.
+        """
+        deltas: Deltas = {}
+        last_id = 0
+        try:
+            db.execute(delete(SalesDailyRollup))
+            while True:
+                sales = (
+                    db.query(Sale)
+                    .options(selectinload(Sale.items), selectinload(Sale.returns).selectinload(SaleReturn.items))
+                    .filter(Sale.id > last_id)
+                    .order_by(Sale.id)
+                    .limit(chunk_size)
+                    .all()
+                )
+                if not sales:
+                    break
+                for sale in sales:
+                    if sale.created_at is None:
+                        continue
+                    day = sale.created_at.date()
+                    self._add_sale(deltas, day, sale.total_amount, _sale_lines(sale), 1)
+                    for sale_return in sale.returns:
+                        self._add_return(deltas, day, sale_return.refund_amount, _return_lines(sale_return), 1)
+                last_id = sales[-1].id
+                db.expunge_all()
+            # Running leaderboards resync from the rebuilt table instead
+            self._apply(db, deltas, publish=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return len(deltas)
+
+    def daily_totals(self, db: Session, *, start: date, end: date):
+        """Per-day totals net of returns for days in [start, end] that had sales"""
+        return (
+            db.query(
+                SalesDailyRollup.sale_date.label('sale_date'),
+                func.sum(SalesDailyRollup.sales_count).label('total_sales'),
+                (func.sum(SalesDailyRollup.revenue) - func.sum(SalesDailyRollup.refunded_amount)).label('total_revenue'),
+                (func.sum(SalesDailyRollup.quantity) - func.sum(SalesDailyRollup.returned_quantity)).label('total_books_sold'),
+            )
+            .filter(SalesDailyRollup.sale_date >= start, SalesDailyRollup.sale_date <= end)
+            .group_by(SalesDailyRollup.sale_date)
+            .having(func.sum(SalesDailyRollup.sales_count) > 0)
+            .order_by(SalesDailyRollup.sale_date)
+            .all()
+        )
+
+    def _net_by_book(self, db: Session, *columns):
+        return db.query(
+            *columns,
+            SalesDailyRollup.book_id,
+            (func.sum(SalesDailyRollup.quantity) - func.sum(SalesDailyRollup.returned_quantity)).label('total_sold'),
+            (func.sum(SalesDailyRollup.revenue) - func.sum(SalesDailyRollup.refunded_amount)).label('total_revenue'),
+        )
+
+    def book_totals(self, db: Session) -> List[Tuple[int, int, Decimal]]:
+        """All-time `(book_id, net quantity, net revenue)` per book"""
+        return [tuple(row) for row in self._net_by_book(db).group_by(SalesDailyRollup.book_id)]
+
+    def book_day_totals(self, db: Session, *, start: date) -> List[Tuple[date, int, int, Decimal]]:
+        """`(day, book_id, net quantity, net revenue)` for every day from `start` on"""
+        return [
+            tuple(row)
+            for row in self._net_by_book(db, SalesDailyRollup.sale_date)
+            .filter(SalesDailyRollup.sale_date >= start)
+            .group_by(SalesDailyRollup.sale_date, SalesDailyRollup.book_id)
+        ]
+
+    def top_books(
+        self, db: Session, *, start: Optional[date] = None, skip: int = 0, limit: int = 10
+    ) -> List[Tuple[int, int, Decimal]]:
+        """Best sellers by net quantity since `start` (all time when omitted)"""
+        query = self._net_by_book(db)
+        if start:
+            query = query.filter(SalesDailyRollup.sale_date >= start)
+        net_sold = func.sum(SalesDailyRollup.quantity) - func.sum(SalesDailyRollup.returned_quantity)
+        return [
+            tuple(row)
+            for row in query.group_by(SalesDailyRollup.book_id)
+            .having(net_sold > 0)
+            .order_by(net_sold.desc(), SalesDailyRollup.book_id)
+            .offset(skip)
+            .limit(limit)
+        ]
+
+    def totals(self, db: Session, *, start: Optional[date] = None, end: Optional[date] = None):
+        """Gross totals and returns over [start, end] (all time when either is missing)"""
+        query = db.query(
+            func.sum(SalesDailyRollup.sales_count).label('sales_count'),
+            func.sum(SalesDailyRollup.quantity).label('quantity'),
+            func.sum(SalesDailyRollup.revenue).label('revenue'),
+            func.sum(SalesDailyRollup.returned_quantity).label('returned_quantity'),
+            func.sum(SalesDailyRollup.refunded_amount).label('refunded_amount'),
+        )
+        if start and end:
+            query = query.filter(SalesDailyRollup.sale_date >= start, SalesDailyRollup.sale_date <= end)
+        return query.one()
+
+
+sales_rollup = CRUDSalesRollup()
@@ -0,0 +1,136 @@
+"""
+Group commit: concurrent requests hand their writes to one writer thread
+that applies them in a shared transaction and commits once per batch
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """
+    Each submitted `fn(db)` runs in its own SAVEPOINT inside the batch
+    transaction, so one failing item is rolled back and reported alone while
+    the rest commit together. A batch is flushed when `max_batch` items are
+    queued or `max_delay_ms` after its first item arrived. Futures resolve
+    only after the batch commit; a failed commit fails every item in it.
+
+    `fn` runs on the writer thread with the writer's session and must not
+    commit, and should return plain values (e.g. IDs) rather than ORM
+    objects, which belong to the writer's session.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        *,
+        max_batch: int = settings.GROUP_COMMIT_MAX_BATCH,
+        max_delay_ms: float = settings.GROUP_COMMIT_MAX_DELAY_MS,
+    ):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def submit(self, fn: Callable[[Session], Any]) -> Future:
+        self.start()
+        future: Future = Future()
+        self._queue.put((fn, future))
+        return future
+
+    def execute(self, fn: Callable[[Session], Any]) -> Any:
+        """Submit `fn` and wait for its committed result (re-raising its error)"""
+        return self.submit(fn).result()
+
+    def _collect(self, first) -> Tuple[List, bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        db = self.session_factory()
+        try:
+            stopping = False
+            while not stopping:
+                first = self._queue.get()
+                if first is _STOP:
+                    break
+                batch, stopping = self._collect(first)
+                self._flush(db, batch)
+        finally:
+            db.close()
+
+    def _flush(self, db: Session, batch: List) -> None:
+        outcomes = []
+        try:
+            if db.get_bind().dialect.name == "sqlite":
+                # pysqlite only opens a transaction on DML; start one explicitly
+                # so item SAVEPOINTs nest inside a single batch transaction
+                db.connection().exec_driver_sql("BEGIN")
+            for fn, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    with db.begin_nested():
+                        outcomes.append((future, fn(db), None))
+                except Exception as e:
+                    outcomes.append((future, None, e))
+            db.commit()
+        except Exception as e:
+            logger.error(f"Group commit of {len(batch)} items failed: {e}")
+            db.rollback()
+            for future, _, error in outcomes:
+                future.set_exception(error or e)
+            for fn, future in batch[len(outcomes):]:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.items += len(outcomes)
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+sale_writer = GroupCommitWriter()
@@ -6,6 +6,10 @@ from app.models.book import Book
 from app.models.customer import Customer
 from app.models.sale import Sale
 from app.core.security import get_password_hash
+from app.search.fulltext import ensure_sqlite_fts
+# Registers the session hooks (change feed, inventory ledger) that sample
+# data writes must go through, even when run outside the API
+import app.crud  # noqa: F401
 import logging
 
 logger = logging.getLogger(__name__)
@@ -165,6 +169,13 @@ def init_db():
     # Create tables
     create_tables()
     
+    # Make sure SQLite has its FTS5 shadow table (MySQL gets FULLTEXT via Alembic)
+    try:
+        if ensure_sqlite_fts(engine):
+            logger.info("Created FTS5 search index for books")
+    except Exception as e:
+        logger.warning(f"Full-text index setup failed, search will use ILIKE: {e}")
+    
     # Try to create superuser (non-blocking)
     try:
         create_superuser()
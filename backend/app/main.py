@@ -9,8 +9,13 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 import time
 
 from app.core.config import settings
+from app.analytics.leaderboard import warm_leaderboard
 from app.api.v1.api import api_router
+from app.core.background import start_background_tasks, stop_background_tasks
+from app.db.group_commit import sale_writer
 from app.db.init_db import init_db
+from app.db.utils import DatabaseManager
+from app.search.indexes import warm_search_indexes
 
 # Configure logging
 logging.basicConfig(
@@ -35,10 +40,28 @@ async def lifespan(app: FastAPI):
         logger.error(f"Failed to initialize database: {e}")
         raise e
     
+    # Warm in-memory search indexes (non-blocking: search falls back to SQL)
+    try:
+        with DatabaseManager() as db:
+            warm_search_indexes(db)
+    except Exception as e:
+        logger.warning(f"Search index warmup failed, continuing: {e}")
+    
+    # Seed the sales leaderboard (non-blocking: rankings fall back to SQL)
+    try:
+        with DatabaseManager() as db:
+            warm_leaderboard(db)
+    except Exception as e:
+        logger.warning(f"Sales leaderboard warmup failed, continuing: {e}")
+    
+    start_background_tasks()
+    
     yield
     
     # Shutdown
     logger.info("Shutting down Bookstore Management API...")
+    await stop_background_tasks()
+    sale_writer.stop()
 
 
 app = FastAPI(
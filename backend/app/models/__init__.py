@@ -5,9 +5,16 @@ from .role import Role  # noqa: F401
 from .category import Category  # noqa: F401
 from .book import Book  # noqa: F401
 from .customer import Customer  # noqa: F401
+from .customer_name_token import CustomerNameToken  # noqa: F401
 from .sale import Sale  # noqa: F401
 # SaleItem was missing — import it now
 from .sale_item import SaleItem  # noqa: F401
+from .sale_return import SaleReturn, SaleReturnItem  # noqa: F401
+from .reservation import Reservation, ReservationItem  # noqa: F401
+from .idempotency_key import IdempotencyKey  # noqa: F401
+from .inventory import InventoryMovement, StockSnapshot  # noqa: F401
+from .outbox import OutboxEvent, OutboxSequence  # noqa: F401
+from .sales_rollup import SalesDailyRollup  # noqa: F401
 
 __all__ = [
     "User",
@@ -15,6 +22,17 @@ __all__ = [
     "Category",
     "Book",
     "Customer",
+    "CustomerNameToken",
     "Sale",
     "SaleItem",
+    "SaleReturn",
+    "SaleReturnItem",
+    "Reservation",
+    "ReservationItem",
+    "IdempotencyKey",
+    "InventoryMovement",
+    "StockSnapshot",
+    "OutboxEvent",
+    "OutboxSequence",
+    "SalesDailyRollup",
 ]
@@ -1,8 +1,9 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Integer, Numeric, String, Text, ForeignKey
+from sqlalchemy import Column, DateTime, Integer, Numeric, String, Text, ForeignKey, event
 from sqlalchemy.orm import relationship
 
+from app.core.isbn import to_isbn13
 from app.db.base import Base
 
 
@@ -14,13 +15,35 @@ class Book(Base):
     author = Column(String(255), nullable=True)
     price = Column(Numeric(10, 2), nullable=False)
     stock = Column(Integer, default=0, nullable=False)
+    # Units held by active reservations; available-to-sell is stock - reserved
+    reserved = Column(Integer, default=0, server_default="0", nullable=False)
     isbn = Column(String(30), unique=True, nullable=True)
+    # Canonical ISBN-13 derived from `isbn` on every ORM insert/update (see
+    # below); NULL when `isbn` is not a valid ISBN
+    isbn13 = Column(String(13), unique=True, index=True, nullable=True)
     description = Column(Text, nullable=True)
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Row version for optimistic concurrency (compare-and-swap on every update)
+    version = Column(Integer, default=1, server_default="1", nullable=False)
 
     category = relationship("Category", back_populates="books")
     sales = relationship("Sale", back_populates="book")
 
+    __mapper_args__ = {"version_id_col": version}
+
+    @property
+    def available(self) -> int:
+        return max((self.stock or 0) - (self.reserved or 0), 0)
+
     def __repr__(self) -> str:
         return f"<Book id={self.id} title={self.title!r}>"
+
+
+@event.listens_for(Book, "before_insert")
+@event.listens_for(Book, "before_update")
+def _derive_isbn13(mapper, connection, target: Book) -> None:
+    """Keep `isbn13` in step with `isbn` for every writer, not just CRUDBook"""
+    isbn13 = to_isbn13(target.isbn)
+    if target.isbn13 != isbn13:
+        target.isbn13 = isbn13
@@ -13,9 +13,18 @@ class Customer(Base):
     name = Column(String(255), nullable=False)
     email = Column(String(255), unique=True, nullable=True, index=True)
     phone = Column(String(50), nullable=True)
+    # Lookup keys maintained by CRUDCustomer: digits-only phone (also stored
+    # reversed, for matching numbers typed without their country code),
+    # lower-cased email
+    phone_normalized = Column(String(50), nullable=True, index=True)
+    phone_reversed = Column(String(50), nullable=True, index=True)
+    email_normalized = Column(String(255), nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     sales = relationship("Sale", back_populates="customer")
+    name_tokens = relationship(
+        "CustomerNameToken", back_populates="customer", cascade="all, delete-orphan"
+    )
 
     def __repr__(self) -> str:
         return f"<Customer id={self.id} name={self.name!r}>"
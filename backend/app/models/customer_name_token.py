@@ -0,0 +1,22 @@
+from sqlalchemy import Column, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import relationship
+
+from app.db.base import Base
+
+
+class CustomerNameToken(Base):
+    """One row per word of a customer's name, for indexed prefix lookups"""
+
+    __tablename__ = "customer_name_tokens"
+    __table_args__ = (
+        Index("ix_customer_name_tokens_token_customer", "token", "customer_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    customer_id = Column(Integer, ForeignKey("customers.id", ondelete="CASCADE"), nullable=False)
+    token = Column(String(100), nullable=False)
+
+    customer = relationship("Customer", back_populates="name_tokens")
+
+    def __repr__(self) -> str:
+        return f"<CustomerNameToken customer_id={self.customer_id} token={self.token!r}>"
@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text, UniqueConstraint
+
+from app.db.base import Base
+
+IN_PROGRESS = "in_progress"
+# The request's business write committed but its response is not stored yet
+EXECUTED = "executed"
+COMPLETED = "completed"
+
+
+class IdempotencyKey(Base):
+    """First response to a write sent with an Idempotency-Key, kept for replays"""
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True)
+    # Endpoint and caller the key is scoped to, e.g. "POST /sales/ user=3"
+    scope = Column(String(255), nullable=False)
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status = Column(String(20), nullable=False, default=IN_PROGRESS)
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    response_etag = Column(String(64), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    # An in-progress claim past its lease was abandoned (the worker died
+    # before writing anything) and may be taken over by a retry
+    lease_expires_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("scope", "key", name="uq_idempotency_keys_scope_key"),
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<IdempotencyKey scope={self.scope!r} key={self.key!r} status={self.status}>"
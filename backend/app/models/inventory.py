@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+
+from app.db.base import Base
+
+SALE = "sale"
+RETURN = "return"
+RECEIPT = "receipt"
+ADJUSTMENT = "adjustment"
+MOVEMENT_KINDS = (SALE, RETURN, RECEIPT, ADJUSTMENT)
+
+
+class InventoryMovement(Base):
+    """
+    Append-only ledger of stock changes. Each row is written in the same
+    transaction as the `Book.stock` update it records; rows are never
+    updated or deleted.
+    """
+    __tablename__ = "inventory_movements"
+
+    id = Column(Integer, primary_key=True)
+    book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(20), nullable=False)
+    # Signed change applied to Book.stock
+    quantity = Column(Integer, nullable=False)
+    # What caused the movement, e.g. ("sale", 42)
+    reference_type = Column(String(30), nullable=True)
+    reference_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_inventory_movements_book_id_id", "book_id", "id"),
+        Index("ix_inventory_movements_created_at", "created_at"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<InventoryMovement book_id={self.book_id} kind={self.kind} qty={self.quantity}>"
+
+
+class StockSnapshot(Base):
+    """
+    Stock of one book after every ledger movement up to `last_movement_id`.
+    Point-in-time stock is the latest snapshot plus the movements after it.
+    """
+    __tablename__ = "stock_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), nullable=False)
+    stock = Column(Integer, nullable=False)
+    last_movement_id = Column(Integer, nullable=False, default=0)
+    taken_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (Index("ix_stock_snapshots_book_id_taken_at", "book_id", "taken_at"),)
+
+    def __repr__(self) -> str:
+        return f"<StockSnapshot book_id={self.book_id} stock={self.stock} taken_at={self.taken_at}>"
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, Text
+
+from app.db.base import Base
+
+# Change feed topics; `OutboxEvent.event_type` is "<topic>.<action>"
+SALE_TOPIC = "sale"
+STOCK_TOPIC = "stock"
+BOOK_TOPIC = "book"
+CUSTOMER_TOPIC = "customer"
+TOPICS = (SALE_TOPIC, STOCK_TOPIC, BOOK_TOPIC, CUSTOMER_TOPIC)
+
+
+class OutboxEvent(Base):
+    """
+    Change events written in the same transaction as the change they
+    describe. The change feed serves them in `sequence` order: the relay
+    numbers events only once they are committed, so a transaction that
+    commits late still lands after everything a consumer has already read.
+    """
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True)
+    topic = Column(String(20), nullable=False)
+    event_type = Column(String(40), nullable=False)
+    # ID of the book, customer or sale the event is about
+    aggregate_id = Column(Integer, nullable=False)
+    # JSON document: the row after the change, or the stock movement
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Feed position in commit order, assigned by the relay; NULL until then
+    sequence = Column(BigInteger, nullable=True)
+
+    __table_args__ = (
+        Index("ix_outbox_events_sequence", "sequence", unique=True),
+        Index("ix_outbox_events_topic_sequence", "topic", "sequence"),
+        Index("ix_outbox_events_created_at", "created_at"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<OutboxEvent id={self.id} type={self.event_type} aggregate_id={self.aggregate_id}>"
+
+
+class OutboxSequence(Base):
+    """
+    Single-row counter holding the last sequence the relay handed out. Its
+    row lock serializes relays across workers.
+    """
+    __tablename__ = "outbox_sequence"
+
+    id = Column(Integer, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
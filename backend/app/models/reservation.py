@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import relationship
+
+from app.db.base import Base
+
+ACTIVE = "active"
+RELEASED = "released"
+CONVERTED = "converted"
+EXPIRED = "expired"
+
+
+class Reservation(Base):
+    """A time-limited hold on stock for a cart, counted in `Book.reserved`"""
+    __tablename__ = "reservations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=True)
+    status = Column(String(20), nullable=False, default=ACTIVE)
+    expires_at = Column(DateTime, nullable=False)
+    sale_id = Column(Integer, ForeignKey("sales.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    items = relationship("ReservationItem", back_populates="reservation", cascade="all, delete-orphan")
+
+    # The expiry sweep scans active holds in expiry order
+    __table_args__ = (Index("ix_reservations_status_expires_at", "status", "expires_at"),)
+
+    def __repr__(self) -> str:
+        return f"<Reservation id={self.id} status={self.status} expires_at={self.expires_at}>"
+
+
+class ReservationItem(Base):
+    __tablename__ = "reservation_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    reservation_id = Column(Integer, ForeignKey("reservations.id", ondelete="CASCADE"), nullable=False, index=True)
+    book_id = Column(Integer, ForeignKey("books.id", ondelete="RESTRICT"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+
+    reservation = relationship("Reservation", back_populates="items")
+    book = relationship("Book")
+
+    def __repr__(self) -> str:
+        return f"<ReservationItem reservation_id={self.reservation_id} book_id={self.book_id} qty={self.quantity}>"
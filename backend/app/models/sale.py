@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, Numeric
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, Numeric
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
@@ -15,11 +15,24 @@ class Sale(Base):
     quantity = Column(Integer, nullable=False, default=1)
     total_amount = Column(Numeric(10, 2), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Row version for optimistic concurrency (compare-and-swap on every update)
+    version = Column(Integer, default=1, server_default="1", nullable=False)
+    # Running totals of SaleReturn rows, kept in step by CRUDSaleReturn
+    returned_quantity = Column(Integer, default=0, server_default="0", nullable=False)
+    refunded_amount = Column(Numeric(10, 2), default=0, server_default="0", nullable=False)
 
     # Relationships
     book = relationship("Book", back_populates="sales")
     customer = relationship("Customer", back_populates="sales")
     items = relationship("SaleItem", back_populates="sale", cascade="all, delete-orphan")
+    returns = relationship("SaleReturn", back_populates="sale", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_sales_created_at", "created_at"),
+        Index("ix_sales_book_id_created_at", "book_id", "created_at"),
+        Index("ix_sales_customer_id_created_at", "customer_id", "created_at"),
+    )
+    __mapper_args__ = {"version_id_col": version}
 
     def __repr__(self):
         return f"<Sale(id={self.id}, book_id={self.book_id}, total={self.total_amount})>"
@@ -10,6 +10,8 @@ class SaleItem(Base):
     quantity = Column(Integer, nullable=False, default=1)
     unit_price = Column(Float, nullable=False, default=0.0)
     subtotal = Column(Float, nullable=False, default=0.0)
+    # Units of this line already returned (never exceeds quantity)
+    returned_quantity = Column(Integer, nullable=False, default=0, server_default="0")
 
     # relationships (back_populates should match definitions in related models)
     sale = relationship("Sale", back_populates="items")
@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, Numeric, String
+from sqlalchemy.orm import relationship
+
+from app.db.base import Base
+
+
+class SaleReturn(Base):
+    """
+    Goods brought back against a sale and the money refunded for them. The
+    returned quantities are also rolled up onto `SaleItem.returned_quantity`
+    and `Sale.returned_quantity`/`refunded_amount` in the same transaction,
+    so reports can net out returns without joining this table.
+    """
+    __tablename__ = "sale_returns"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sale_id = Column(Integer, ForeignKey("sales.id", ondelete="CASCADE"), nullable=False, index=True)
+    quantity = Column(Integer, nullable=False)
+    refund_amount = Column(Numeric(10, 2), nullable=False)
+    reason = Column(String(255), nullable=True)
+    created_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    sale = relationship("Sale", back_populates="returns")
+    items = relationship("SaleReturnItem", back_populates="sale_return", cascade="all, delete-orphan")
+
+    def __repr__(self) -> str:
+        return f"<SaleReturn id={self.id} sale_id={self.sale_id} refund={self.refund_amount}>"
+
+
+class SaleReturnItem(Base):
+    __tablename__ = "sale_return_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    return_id = Column(Integer, ForeignKey("sale_returns.id", ondelete="CASCADE"), nullable=False, index=True)
+    sale_item_id = Column(Integer, ForeignKey("sale_items.id", ondelete="CASCADE"), nullable=False)
+    book_id = Column(Integer, ForeignKey("books.id", ondelete="RESTRICT"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    # Line value at the original unit price
+    refund_amount = Column(Numeric(10, 2), nullable=False)
+
+    sale_return = relationship("SaleReturn", back_populates="items")
+
+    def __repr__(self) -> str:
+        return f"<SaleReturnItem return_id={self.return_id} sale_item_id={self.sale_item_id} qty={self.quantity}>"
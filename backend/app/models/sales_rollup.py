@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Date, Index, Integer, Numeric
+
+from app.db.base import Base
+
+# `category_id` stored for books without a category (the column is part of the key)
+UNCATEGORIZED = 0
+
+
+class SalesDailyRollup(Base):
+    """
+    Sales totals per UTC day, book and category, kept up to date by every
+    sale, sale update, return and delete in the same transaction. Each sale
+    counts once, on its first line's book; quantities are per line and the
+    sale total and refunds are split across lines in proportion to their
+    value. Rows carry the book's current category.
+    """
+    __tablename__ = "sales_daily_rollup"
+
+    sale_date = Column(Date, primary_key=True)
+    book_id = Column(Integer, primary_key=True)
+    category_id = Column(Integer, primary_key=True, default=UNCATEGORIZED)
+    sales_count = Column(Integer, nullable=False, default=0)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(12, 2), nullable=False, default=0)
+    returned_quantity = Column(Integer, nullable=False, default=0)
+    refunded_amount = Column(Numeric(12, 2), nullable=False, default=0)
+
+    __table_args__ = (Index("ix_sales_daily_rollup_book_id", "book_id"),)
+
+    def __repr__(self) -> str:
+        return f"<SalesDailyRollup {self.sale_date} book_id={self.book_id} qty={self.quantity}>"
@@ -19,7 +19,17 @@ from .book import (
     BookUpdate,
     BookWithCategory,
     BookWithSales,
-    BookDetail
+    BookDetail,
+    BookSuggestion,
+    IsbnLookupRequest,
+    IsbnLookupResult,
+    StockReceiptLine,
+    StockReceiptCreate,
+    StockLevel,
+    StockReceiptResponse,
+    BookSearchFacets,
+    BookSearchResults,
+    PopularBook
 )
 from .customer import (
     Customer,
@@ -30,21 +40,56 @@ from .customer import (
 from .sale import (
     Sale,
     SaleCreate,
+    SaleBatchEntry,
+    SaleBatchCreate,
+    SaleBatchResult,
+    SaleBatchResponse,
     SaleUpdate,
     SaleItem,
     SaleItemCreate,
+    SaleReturnItemCreate,
+    SaleReturnCreate,
+    SaleReturnItem,
+    SaleReturn,
     SaleWithBook,
     SaleWithCustomer,
     SaleDetail,
     SaleSummary
 )
+from .reservation import (
+    Reservation,
+    ReservationCreate,
+    ReservationExtend,
+    ReservationConvert,
+    ReservationItem,
+    ReservationItemCreate
+)
+from .inventory import (
+    InventoryMovement,
+    StockAt
+)
+from .change import (
+    ChangeEvent,
+    ChangeFeed
+)
+from .analytics import AnalyticsResult
 from .common import (
     PaginatedResponse,
+    CursorPage,
     MessageResponse,
     ErrorResponse,
     HealthCheck
 )
 
+# Resolve the cross-module forward references ("Book", "Category", "Sale",
+# "Customer") now that every schema module has been imported
+for _schema in (
+    BookWithCategory, BookWithSales, BookDetail,
+    CategoryWithBooks, CustomerWithSales,
+    SaleWithBook, SaleWithCustomer, SaleDetail,
+):
+    _schema.model_rebuild()
+
 __all__ = [
     # User schemas
     "User",
@@ -66,6 +111,16 @@ __all__ = [
     "BookWithCategory",
     "BookWithSales", 
     "BookDetail",
+    "BookSuggestion",
+    "IsbnLookupRequest",
+    "IsbnLookupResult",
+    "StockReceiptLine",
+    "StockReceiptCreate",
+    "StockLevel",
+    "StockReceiptResponse",
+    "BookSearchFacets",
+    "BookSearchResults",
+    "PopularBook",
     # Customer schemas
     "Customer",
     "CustomerCreate",
@@ -74,13 +129,37 @@ __all__ = [
     # Sale schemas
     "Sale",
     "SaleCreate",
+    "SaleBatchEntry",
+    "SaleBatchCreate",
+    "SaleBatchResult",
+    "SaleBatchResponse",
     "SaleUpdate",
+    "SaleReturnItemCreate",
+    "SaleReturnCreate",
+    "SaleReturnItem",
+    "SaleReturn",
     "SaleWithBook",
     "SaleWithCustomer",
     "SaleDetail",
     "SaleSummary",
+    # Reservation schemas
+    "Reservation",
+    "ReservationCreate",
+    "ReservationExtend",
+    "ReservationConvert",
+    "ReservationItem",
+    "ReservationItemCreate",
+    # Inventory schemas
+    "InventoryMovement",
+    "StockAt",
+    # Change feed schemas
+    "ChangeEvent",
+    "ChangeFeed",
+    # Analytics schemas
+    "AnalyticsResult",
     # Common schemas
     "PaginatedResponse",
+    "CursorPage",
     "MessageResponse",
     "ErrorResponse",
     "HealthCheck"
@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+
+
+# Schema for an analytics cube query result
+class AnalyticsResult(BaseModel):
+    dimensions: List[str]
+    measures: List[str]
+    pivot: Optional[str] = None
+    # Labels of the pivot dimension, one per entry in each row's measure lists
+    columns: Optional[List[Any]] = None
+    rows: List[Dict[str, Any]]
+    # Row count before `limit`
+    total_rows: int
+    matched_lines: int
+    refreshed_at: Optional[datetime] = None
@@ -1,7 +1,9 @@
 from datetime import datetime
 from decimal import Decimal
 from typing import Optional, List
-from pydantic import BaseModel, ConfigDict, validator
+from pydantic import BaseModel, ConfigDict, Field, model_validator, validator
+
+from app.core.config import settings
 
 
 # Base Book Schema
@@ -60,9 +62,97 @@ class Book(BookBase):
     model_config = ConfigDict(from_attributes=True)
     
     id: int
+    isbn13: Optional[str] = None
+    reserved: int = 0
+    available: int = 0
+    version: int = 1
     created_at: datetime
 
 
+# Schemas for barcode (ISBN) lookups
+class IsbnLookupRequest(BaseModel):
+    codes: List[str] = Field(..., min_length=1, max_length=500)
+
+
+class IsbnLookupResult(BaseModel):
+    code: str
+    isbn13: Optional[str] = None
+    book: Optional[Book] = None
+
+
+# Schemas for receiving supplier deliveries
+class StockReceiptLine(BaseModel):
+    book_id: Optional[int] = None
+    isbn: Optional[str] = None
+    quantity_delta: int
+
+    @model_validator(mode='after')
+    def validate_book_reference(self):
+        if (self.book_id is None) == (self.isbn is None):
+            raise ValueError('Provide exactly one of book_id or isbn')
+        return self
+
+
+class StockReceiptCreate(BaseModel):
+    lines: List[StockReceiptLine] = Field(..., min_length=1, max_length=settings.STOCK_RECEIVE_MAX_LINES)
+
+
+class StockLevel(BaseModel):
+    book_id: int
+    stock: int
+
+
+class StockReceiptResponse(BaseModel):
+    received_lines: int
+    books: List[StockLevel]
+
+
+# Schema for autocomplete suggestions
+class BookSuggestion(BaseModel):
+    book_id: int
+    title: str
+    author: Optional[str] = None
+    isbn: Optional[str] = None
+    match: str
+
+
+# Search facet schemas
+class CategoryFacet(BaseModel):
+    category_id: Optional[int] = None
+    name: Optional[str] = None
+    count: int
+
+
+class StockFacet(BaseModel):
+    in_stock: int
+    out_of_stock: int
+
+
+class PriceBandFacet(BaseModel):
+    label: str
+    min: Optional[Decimal] = None
+    max: Optional[Decimal] = None
+    count: int
+
+
+class BookSearchFacets(BaseModel):
+    categories: List[CategoryFacet]
+    stock: StockFacet
+    price_bands: List[PriceBandFacet]
+
+
+class BookSearchResults(BaseModel):
+    items: List[Book]
+    facets: BookSearchFacets
+
+
+# Schema for best-seller rankings (net of returns)
+class PopularBook(BaseModel):
+    book: Book
+    total_sold: int
+    total_revenue: float
+
+
 # Forward declaration for category relationship
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
@@ -0,0 +1,30 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, List
+from pydantic import BaseModel, ConfigDict, Field, validator
+
+
+# Schema for one change feed event
+class ChangeEvent(BaseModel):
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+
+    id: int
+    # Position in commit order; cursors are sequences
+    sequence: int
+    topic: str
+    type: str = Field(..., validation_alias="event_type")
+    aggregate_id: int
+    payload: Dict[str, Any]
+    created_at: datetime
+
+    @validator('payload', pre=True)
+    def parse_payload(cls, v):
+        return json.loads(v) if isinstance(v, str) else v
+
+
+# Schema for a change feed page
+class ChangeFeed(BaseModel):
+    items: List[ChangeEvent]
+    # Pass back as `since` to continue; unchanged when nothing new has been relayed
+    next_cursor: str
+    has_more: bool
@@ -10,6 +10,12 @@ class PaginatedResponse(BaseModel, Generic[T]):
     page: int
     size: int
     pages: int
+    total_is_estimate: bool = False
+
+
+class CursorPage(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
 
 
 class MessageResponse(BaseModel):
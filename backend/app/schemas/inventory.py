@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, ConfigDict
+
+
+# Schema for an inventory ledger entry
+class InventoryMovement(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    book_id: int
+    kind: str
+    quantity: int
+    reference_type: Optional[str] = None
+    reference_id: Optional[int] = None
+    created_at: datetime
+
+
+# Schema for point-in-time stock
+class StockAt(BaseModel):
+    book_id: int
+    at: datetime
+    stock: int
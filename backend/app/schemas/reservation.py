@@ -0,0 +1,57 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field, validator
+
+
+class ReservationItemBase(BaseModel):
+    book_id: int
+    quantity: int
+
+    @validator('quantity')
+    def validate_quantity(cls, v):
+        if v <= 0:
+            raise ValueError('Quantity must be greater than 0')
+        return v
+
+
+class ReservationItemCreate(ReservationItemBase):
+    pass
+
+
+class ReservationItem(ReservationItemBase):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+
+
+# Schema for Reservation Creation
+class ReservationCreate(BaseModel):
+    customer_id: Optional[int] = None
+    items: List[ReservationItemCreate] = Field(..., min_length=1)
+    # Hold time; defaults to RESERVATION_TTL_SECONDS, capped at RESERVATION_MAX_TTL_SECONDS
+    ttl_seconds: Optional[int] = Field(None, gt=0)
+
+
+# Schema for extending a Reservation
+class ReservationExtend(BaseModel):
+    ttl_seconds: Optional[int] = Field(None, gt=0)
+
+
+# Schema for converting a Reservation into a Sale
+class ReservationConvert(BaseModel):
+    # Defaults to the sum of current book prices
+    total_amount: Optional[Decimal] = Field(None, gt=0)
+
+
+# Schema for Reservation Response
+class Reservation(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    customer_id: Optional[int] = None
+    status: str
+    expires_at: datetime
+    sale_id: Optional[int] = None
+    created_at: datetime
+    items: List[ReservationItem] = []
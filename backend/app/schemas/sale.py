@@ -1,7 +1,9 @@
 from datetime import datetime
 from decimal import Decimal
 from typing import Optional, List
-from pydantic import BaseModel, ConfigDict, validator
+from pydantic import BaseModel, ConfigDict, Field, validator
+
+from app.core.config import settings
 
 
 # SaleItem schemas
@@ -46,6 +48,65 @@ class SaleCreate(SaleBase):
     items: List[SaleItemCreate]
 
 
+# Schemas for bulk sale ingestion (POS end-of-day sync)
+class SaleBatchEntry(SaleCreate):
+    # When the terminal recorded the sale; defaults to the time of upload
+    created_at: Optional[datetime] = None
+
+
+class SaleBatchCreate(BaseModel):
+    sales: List[SaleBatchEntry] = Field(..., min_length=1, max_length=settings.SALES_BATCH_MAX_SIZE)
+
+
+class SaleBatchResult(BaseModel):
+    index: int
+    success: bool
+    sale_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class SaleBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[SaleBatchResult]
+
+
+# Schemas for returning goods from a Sale
+class SaleReturnItemCreate(BaseModel):
+    sale_item_id: int
+    quantity: int = Field(..., gt=0)
+
+
+class SaleReturnCreate(BaseModel):
+    items: List[SaleReturnItemCreate] = Field(..., min_length=1)
+    reason: Optional[str] = Field(None, max_length=255)
+    # Defaults to the returned lines at their original unit prices
+    refund_amount: Optional[Decimal] = Field(None, ge=0)
+
+
+class SaleReturnItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    sale_item_id: int
+    book_id: int
+    quantity: int
+    refund_amount: Decimal
+
+
+class SaleReturn(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    sale_id: int
+    quantity: int
+    refund_amount: Decimal
+    reason: Optional[str] = None
+    created_by_id: Optional[int] = None
+    created_at: datetime
+    items: List[SaleReturnItem] = []
+
+
 # Schema for Sale Update
 class SaleUpdate(BaseModel):
     customer_id: Optional[int] = None
@@ -63,7 +124,10 @@ class Sale(SaleBase):
     model_config = ConfigDict(from_attributes=True)
     
     id: int
+    version: int = 1
     created_at: datetime
+    returned_quantity: int = 0
+    refunded_amount: Decimal = Decimal("0")
 
 
 # Forward declaration for relationships
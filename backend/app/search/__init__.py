@@ -0,0 +1,7 @@
+from .fulltext import FullTextBackend, get_fulltext_backend, ensure_sqlite_fts
+
+__all__ = [
+    "FullTextBackend",
+    "get_fulltext_backend",
+    "ensure_sqlite_fts",
+]
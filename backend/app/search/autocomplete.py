@@ -0,0 +1,142 @@
+"""
+Sorted-array prefix index backing search-as-you-type suggestions
+"""
+import bisect
+import re
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.search.trigram import normalize
+
+TITLE, AUTHOR, ISBN = 0, 1, 2
+KIND_NAMES = {TITLE: "title", AUTHOR: "author", ISBN: "isbn"}
+
+_ISBN_STRIP_RE = re.compile(r"[^0-9x]")
+
+
+def normalize_isbn_key(value: Optional[str]) -> str:
+    if not value:
+        return ""
+    return _ISBN_STRIP_RE.sub("", value.lower())
+
+
+class PrefixIndex:
+    """
+    Normalized titles, authors and ISBNs kept in one sorted list of strings
+    with parallel `array` columns for the book ID and key kind. A lookup is a
+    binary search followed by a short forward scan; writes are a bisect plus
+    an in-place insert/delete on the three columns.
+    """
+
+    SCAN_FACTOR = 4
+
+    def __init__(self):
+        self.ready = False
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self._keys: List[str] = []
+        self._ids = array("i")
+        self._kinds = array("b")
+        self._books: Dict[int, Tuple[str, Optional[str], Optional[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @staticmethod
+    def _book_keys(title, author, isbn) -> List[Tuple[str, int]]:
+        keys = [(normalize(title), TITLE), (normalize(author), AUTHOR), (normalize_isbn_key(isbn), ISBN)]
+        return [(key, kind) for key, kind in keys if key]
+
+    def _insert(self, key: str, book_id: int, kind: int) -> None:
+        i = bisect.bisect_right(self._keys, key)
+        self._keys.insert(i, key)
+        self._ids.insert(i, book_id)
+        self._kinds.insert(i, kind)
+
+    def _delete(self, key: str, book_id: int, kind: int) -> None:
+        i = bisect.bisect_left(self._keys, key)
+        while i < len(self._keys) and self._keys[i] == key:
+            if self._ids[i] == book_id and self._kinds[i] == kind:
+                del self._keys[i]
+                del self._ids[i]
+                del self._kinds[i]
+                return
+            i += 1
+
+    def _remove(self, book_id: int) -> None:
+        book = self._books.pop(book_id, None)
+        if book is None:
+            return
+        for key, kind in self._book_keys(*book):
+            self._delete(key, book_id, kind)
+
+    def build(self, rows: Iterable[Tuple[int, str, Optional[str], Optional[str]]]) -> None:
+        """(Re)build from `(id, title, author, isbn)` rows"""
+        entries = []
+        books = {}
+        for book_id, title, author, isbn in rows:
+            books[book_id] = (title, author, isbn)
+            entries.extend((key, book_id, kind) for key, kind in self._book_keys(title, author, isbn))
+        entries.sort()
+        with self._lock:
+            self._clear()
+            self._keys = [key for key, _, _ in entries]
+            self._ids = array("i", (book_id for _, book_id, _ in entries))
+            self._kinds = array("b", (kind for _, _, kind in entries))
+            self._books = books
+            self.ready = True
+
+    def upsert(self, book) -> None:
+        with self._lock:
+            self._remove(book.id)
+            self._books[book.id] = (book.title, book.author, book.isbn)
+            for key, kind in self._book_keys(book.title, book.author, book.isbn):
+                self._insert(key, book.id, kind)
+
+    def remove(self, book_id: int) -> None:
+        with self._lock:
+            self._remove(book_id)
+
+    def suggest(self, prefix: str, *, limit: int = 10) -> List[Dict]:
+        """
+        Up to `limit` suggestions (one per book) whose title, author or ISBN
+        starts with `prefix`, shortest matching key first.
+        """
+        text_prefix = normalize(prefix)
+        isbn_prefix = normalize_isbn_key(prefix)
+        with self._lock:
+            hits = []
+            for key_prefix, kinds in ((text_prefix, (TITLE, AUTHOR)), (isbn_prefix, (ISBN,))):
+                if not key_prefix:
+                    continue
+                i = bisect.bisect_left(self._keys, key_prefix)
+                end = min(len(self._keys), i + limit * self.SCAN_FACTOR)
+                while i < end and self._keys[i].startswith(key_prefix):
+                    if self._kinds[i] in kinds:
+                        hits.append((len(self._keys[i]), self._keys[i], self._ids[i], self._kinds[i]))
+                    i += 1
+            hits.sort()
+
+            suggestions = []
+            seen = set()
+            for _, _, book_id, kind in hits:
+                if book_id in seen:
+                    continue
+                seen.add(book_id)
+                title, author, isbn = self._books[book_id]
+                suggestions.append({
+                    "book_id": book_id,
+                    "title": title,
+                    "author": author,
+                    "isbn": isbn,
+                    "match": KIND_NAMES[kind],
+                })
+                if len(suggestions) >= limit:
+                    break
+        return suggestions
+
+
+book_prefix_index = PrefixIndex()
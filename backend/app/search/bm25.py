@@ -0,0 +1,179 @@
+"""
+In-process BM25 inverted index over the book catalog
+"""
+import bisect
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in",
+    "is", "it", "of", "on", "or", "the", "to", "with",
+})
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    """Lower-case word tokens with common English stopwords removed"""
+    if not value:
+        return []
+    return [t for t in _TOKEN_RE.findall(value.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Inverted index with BM25 scoring. Each book is a document made of its
+    title, author and description; field weights scale term frequencies so
+    a title hit outranks a description hit.
+
+    The index lives in the worker process: every worker builds its own copy
+    at startup, applies its own `CRUDBook` writes immediately and other
+    workers' writes from the change feed (see `sync_search_indexes`).
+    """
+
+    FIELD_WEIGHTS = {"title": 3.0, "author": 2.0, "description": 1.0}
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ready = False
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._doc_terms: Dict[int, Tuple[str, ...]] = {}
+        self._doc_len: Dict[int, float] = {}
+        self._doc_category: Dict[int, Optional[int]] = {}
+        self._total_len = 0.0
+        self._vocabulary: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def _weighted_terms(self, title, author, description) -> Counter:
+        terms: Counter = Counter()
+        for field, value in (("title", title), ("author", author), ("description", description)):
+            weight = self.FIELD_WEIGHTS[field]
+            for token in tokenize(value):
+                terms[token] += weight
+        return terms
+
+    def _add(self, book_id: int, title, author, description, category_id) -> None:
+        terms = self._weighted_terms(title, author, description)
+        for term, tf in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                bisect.insort(self._vocabulary, term)
+            postings[book_id] = tf
+        length = sum(terms.values())
+        self._doc_terms[book_id] = tuple(terms)
+        self._doc_len[book_id] = length
+        self._doc_category[book_id] = category_id
+        self._total_len += length
+
+    def _remove(self, book_id: int) -> None:
+        terms = self._doc_terms.pop(book_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(book_id, None)
+            if not postings:
+                del self._postings[term]
+                i = bisect.bisect_left(self._vocabulary, term)
+                if i < len(self._vocabulary) and self._vocabulary[i] == term:
+                    del self._vocabulary[i]
+        self._total_len -= self._doc_len.pop(book_id, 0.0)
+        self._doc_category.pop(book_id, None)
+
+    def build(self, rows: Iterable[Tuple[int, str, Optional[str], Optional[str], Optional[int]]]) -> None:
+        """(Re)build from `(id, title, author, description, category_id)` rows"""
+        with self._lock:
+            self._clear()
+            for row in rows:
+                self._add(*row)
+            self.ready = True
+
+    def upsert(self, book) -> None:
+        """Index a new book or re-index an updated one"""
+        with self._lock:
+            self._remove(book.id)
+            self._add(book.id, book.title, book.author, book.description, book.category_id)
+
+    def remove(self, book_id: int) -> None:
+        with self._lock:
+            self._remove(book_id)
+
+    def _expand_prefix(self, prefix: str, max_terms: int = 20) -> List[str]:
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        expanded = []
+        for term in self._vocabulary[start:start + max_terms]:
+            if not term.startswith(prefix):
+                break
+            expanded.append(term)
+        return expanded
+
+    def _scores(self, tokens: List[str], category_id: Optional[int]) -> Dict[int, float]:
+        n_docs = len(self._doc_len)
+        if n_docs == 0:
+            return {}
+        avg_len = self._total_len / n_docs
+        query_terms = list(dict.fromkeys(tokens))
+        if tokens[-1] not in self._postings:
+            query_terms.extend(t for t in self._expand_prefix(tokens[-1]) if t not in query_terms)
+
+        scores: Dict[int, float] = {}
+        for term in query_terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            for book_id, tf in postings.items():
+                if category_id is not None and self._doc_category.get(book_id) != category_id:
+                    continue
+                norm = self.k1 * (1.0 - self.b + self.b * self._doc_len[book_id] / avg_len)
+                scores[book_id] = scores.get(book_id, 0.0) + idf * tf * (self.k1 + 1.0) / (tf + norm)
+        return scores
+
+    def search(
+        self,
+        query: str,
+        *,
+        category_id: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Optional[List[int]]:
+        """
+        Return book IDs ordered by descending BM25 score. The last query token
+        is also prefix-expanded so partially typed words still match. Returns
+        None when the query has no searchable tokens (only stopwords), so the
+        caller can fall back to another search.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        with self._lock:
+            scores = self._scores(tokens, category_id)
+
+        top = heapq.nlargest(skip + limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [book_id for book_id, _ in top[skip:skip + limit]]
+
+    def matches(self, query: str) -> List[int]:
+        """Every book `search` would rank for `query`, in any category"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        with self._lock:
+            return list(self._scores(tokens, None))
+
+
+book_search_index = BM25Index()
@@ -0,0 +1,124 @@
+"""
+Bounded LRU cache of book search results, invalidated by a catalog version
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class SearchResultCache:
+    """
+    Maps a search key to the list of matching book IDs. Every catalog write
+    bumps `version`; entries remember the version they were computed at and
+    are treated as misses once it moves on, so invalidation is O(1) and stale
+    entries age out through normal LRU eviction.
+
+    Writes made by other workers are picked up by `sync`, which bumps the
+    version when the newest book or stock event in the change feed moves;
+    entries older than `ttl_seconds` are dropped regardless.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float = 300.0, sync_seconds: float = 1.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.sync_seconds = sync_seconds
+        self.version = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, List[int]]]" = OrderedDict()
+        self._feed_marker: Optional[str] = None
+        self._synced_at = float("-inf")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale = 0
+
+    def bump_version(self) -> None:
+        with self._lock:
+            self.version += 1
+
+    def sync(self, db) -> None:
+        """
+        Bump the version if the change feed shows catalog writes since the
+        last check. Checks at most once per `sync_seconds`.
+        """
+        from app.crud.crud_outbox import outbox
+        from app.models.outbox import BOOK_TOPIC, STOCK_TOPIC
+
+        now = time.monotonic()
+        with self._lock:
+            if now - self._synced_at < self.sync_seconds:
+                return
+            self._synced_at = now
+        marker = outbox.latest_cursor(db, topics=[BOOK_TOPIC, STOCK_TOPIC])
+        with self._lock:
+            if marker != self._feed_marker:
+                if self._feed_marker is not None:
+                    self.version += 1
+                self._feed_marker = marker
+
+    def get(self, key: Hashable) -> Optional[List[int]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            version, stored_at, ids = entry
+            if version != self.version or time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.stale += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return ids
+
+    def put(self, key: Hashable, ids: List[int], version: int) -> None:
+        """Store `ids` computed at catalog `version` (read before computing)"""
+        with self._lock:
+            if version != self.version:
+                return
+            self._entries[key] = (version, time.monotonic(), list(ids))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], List[int]]) -> List[int]:
+        ids = self.get(key)
+        if ids is None:
+            version = self.version
+            ids = compute()
+            self.put(key, ids, version)
+        return ids
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "catalog_version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "stale_entries_dropped": self.stale,
+            }
+
+
+search_cache = SearchResultCache(
+    max_entries=settings.SEARCH_CACHE_SIZE,
+    ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS,
+    sync_seconds=settings.SEARCH_CACHE_SYNC_SECONDS,
+)
@@ -0,0 +1,191 @@
+"""
+Database-native full-text search backends for the book catalog
+"""
+import logging
+import re
+from typing import Dict, List
+
+from sqlalchemy import or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.book import Book
+
+logger = logging.getLogger(__name__)
+
+FULLTEXT_INDEX_NAME = "ix_books_fulltext"
+FTS_TABLE_NAME = "books_fts"
+
+# External-content FTS5 table shadowing books(title, author, description).
+# The triggers keep it in sync with every INSERT/UPDATE/DELETE on books.
+SQLITE_FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE_NAME} USING fts5(
+        title, author, description,
+        content='books', content_rowid='id', tokenize='unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+        INSERT INTO {FTS_TABLE_NAME}(rowid, title, author, description)
+        VALUES (new.id, new.title, new.author, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+        INSERT INTO {FTS_TABLE_NAME}({FTS_TABLE_NAME}, rowid, title, author, description)
+        VALUES ('delete', old.id, old.title, old.author, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF title, author, description ON books BEGIN
+        INSERT INTO {FTS_TABLE_NAME}({FTS_TABLE_NAME}, rowid, title, author, description)
+        VALUES ('delete', old.id, old.title, old.author, old.description);
+        INSERT INTO {FTS_TABLE_NAME}(rowid, title, author, description)
+        VALUES (new.id, new.title, new.author, new.description);
+    END
+    """,
+]
+
+SQLITE_FTS_REBUILD = f"INSERT INTO {FTS_TABLE_NAME}({FTS_TABLE_NAME}) VALUES ('rebuild')"
+
+SQLITE_FTS_DROP = [
+    "DROP TRIGGER IF EXISTS books_fts_au",
+    "DROP TRIGGER IF EXISTS books_fts_ad",
+    "DROP TRIGGER IF EXISTS books_fts_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE_NAME}",
+]
+
+# InnoDB ignores tokens shorter than innodb_ft_min_token_size (3 by default)
+MYSQL_MIN_TOKEN_LENGTH = 3
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize_query(query: str) -> List[str]:
+    """Split a raw search string into lower-cased word tokens"""
+    return _TOKEN_RE.findall(query.lower())
+
+
+class FullTextBackend:
+    """
+    Base class for search backends. A backend turns a raw query string into a
+    filter criterion on `Book` that can be combined with other filters.
+    """
+
+    name = "like"
+
+    def match(self, query: str) -> ColumnElement:
+        return or_(
+            Book.title.ilike(f"%{query}%"),
+            Book.author.ilike(f"%{query}%"),
+            Book.description.ilike(f"%{query}%")
+        )
+
+
+class LikeBackend(FullTextBackend):
+    """Substring ILIKE scan, used when no full-text index is available"""
+
+    name = "like"
+
+
+class SQLiteFTS5Backend(FullTextBackend):
+    """FTS5 shadow table maintained by triggers on `books`"""
+
+    name = "sqlite_fts5"
+
+    def match(self, query: str) -> ColumnElement:
+        tokens = tokenize_query(query)
+        if not tokens:
+            return super().match(query)
+        # Every token is quoted (so FTS5 operators in user input are inert)
+        # and prefix-matched, which suits search-as-you-type.
+        fts_query = " ".join(f'"{token}"*' for token in tokens)
+        return Book.id.in_(
+            text(f"SELECT rowid FROM {FTS_TABLE_NAME} WHERE {FTS_TABLE_NAME} MATCH :fts_query")
+            .bindparams(fts_query=fts_query)
+        )
+
+
+class MySQLFullTextBackend(FullTextBackend):
+    """InnoDB FULLTEXT index over books(title, author, description)"""
+
+    name = "mysql_fulltext"
+
+    def match(self, query: str) -> ColumnElement:
+        tokens = [t for t in tokenize_query(query) if len(t) >= MYSQL_MIN_TOKEN_LENGTH]
+        if not tokens:
+            # Too short for the FULLTEXT index; only the scan can answer this
+            return super().match(query)
+        boolean_query = " ".join(f"+{token}*" for token in tokens)
+        return text(
+            "MATCH (books.title, books.author, books.description) "
+            "AGAINST (:ft_query IN BOOLEAN MODE)"
+        ).bindparams(ft_query=boolean_query)
+
+
+_backends: Dict[str, FullTextBackend] = {}
+
+
+def _detect_backend(db: Session) -> FullTextBackend:
+    dialect = db.get_bind().dialect.name
+    try:
+        if dialect == "sqlite":
+            found = db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE_NAME}
+            ).first()
+            if found:
+                return SQLiteFTS5Backend()
+        elif dialect == "mysql":
+            found = db.execute(
+                text(
+                    "SELECT 1 FROM information_schema.STATISTICS "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'books' "
+                    "AND INDEX_NAME = :name AND INDEX_TYPE = 'FULLTEXT' LIMIT 1"
+                ),
+                {"name": FULLTEXT_INDEX_NAME}
+            ).first()
+            if found:
+                return MySQLFullTextBackend()
+    except Exception as e:
+        logger.warning(f"Full-text backend detection failed, using ILIKE: {e}")
+    return LikeBackend()
+
+
+def get_fulltext_backend(db: Session) -> FullTextBackend:
+    """Return the best available backend for the session's database (cached per URL)"""
+    key = str(db.get_bind().url)
+    backend = _backends.get(key)
+    if backend is None:
+        backend = _detect_backend(db)
+        _backends[key] = backend
+        logger.info(f"Using '{backend.name}' full-text search backend")
+    return backend
+
+
+def reset_backend_cache() -> None:
+    """Forget detected backends, e.g. after running migrations in-process"""
+    _backends.clear()
+
+
+def ensure_sqlite_fts(engine: Engine) -> bool:
+    """
+    Create the FTS5 shadow table and triggers on SQLite if they are missing.
+    Returns True when the table was created (and backfilled) by this call.
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE_NAME}
+        ).first()
+        if exists:
+            return False
+        for statement in SQLITE_FTS_DDL:
+            conn.execute(text(statement))
+        conn.execute(text(SQLITE_FTS_REBUILD))
+    reset_backend_cache()
+    return True
@@ -0,0 +1,119 @@
+"""
+Lifecycle of the in-memory catalog indexes: warmed once at startup, kept
+current by `CRUDBook` after each committed write in this worker, and by
+following the change feed for writes made by other workers or processes
+"""
+import logging
+import threading
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.book import Book
+from app.models.outbox import BOOK_TOPIC, OutboxEvent
+from app.search.autocomplete import book_prefix_index
+from app.search.bm25 import book_search_index
+from app.search.cache import search_cache
+from app.search.isbn_index import book_isbn_index
+from app.search.trigram import book_trigram_index
+
+logger = logging.getLogger(__name__)
+
+WARMUP_BATCH_SIZE = 5000
+
+# Change feed position the indexes reflect; None until they are warmed
+_sync_cursor: Optional[str] = None
+_sync_lock = threading.Lock()
+
+
+def warm_search_indexes(db: Session) -> None:
+    """Build every in-memory catalog index from the books table"""
+    global _sync_cursor
+    from app.crud.crud_outbox import outbox
+
+    # Read before the books so no change made during the build is missed
+    cursor = outbox.latest_cursor(db)
+    rows = (
+        db.query(Book.id, Book.title, Book.author, Book.description, Book.category_id)
+        .yield_per(WARMUP_BATCH_SIZE)
+    )
+    book_search_index.build(tuple(row) for row in rows)
+    logger.info(f"Search index built with {len(book_search_index)} books")
+
+    rows = db.query(Book.id, Book.title, Book.author, Book.category_id).yield_per(WARMUP_BATCH_SIZE)
+    book_trigram_index.build(tuple(row) for row in rows)
+    logger.info(f"Trigram index built with {len(book_trigram_index)} books")
+
+    rows = db.query(Book.id, Book.title, Book.author, Book.isbn).yield_per(WARMUP_BATCH_SIZE)
+    book_prefix_index.build(tuple(row) for row in rows)
+    logger.info(f"Autocomplete index built with {len(book_prefix_index)} keys")
+
+    rows = db.query(Book.id, Book.isbn13).filter(Book.isbn13.isnot(None)).yield_per(WARMUP_BATCH_SIZE)
+    book_isbn_index.build(tuple(row) for row in rows)
+    logger.info(f"ISBN index built with {len(book_isbn_index)} books")
+    _sync_cursor = cursor
+
+
+def on_book_saved(book: Book) -> None:
+    book_search_index.upsert(book)
+    book_trigram_index.upsert(book)
+    book_prefix_index.upsert(book)
+    book_isbn_index.upsert(book)
+
+
+def on_book_deleted(book_id: int) -> None:
+    book_search_index.remove(book_id)
+    book_trigram_index.remove(book_id)
+    book_prefix_index.remove(book_id)
+    book_isbn_index.remove(book_id)
+
+
+def sync_search_indexes(db: Session) -> int:
+    """
+    Apply book changes from the change feed since the last warm-up or sync:
+    changed books are re-read and re-indexed, deleted ones dropped. Rebuilds
+    everything when the feed no longer reaches back to the last position.
+    Returns the number of books refreshed; skips when a sync is already
+    running or the indexes were never warmed.
+    """
+    global _sync_cursor
+    from app.crud.crud_outbox import outbox
+
+    if _sync_cursor is None or not _sync_lock.acquire(blocking=False):
+        return 0
+    try:
+        oldest = db.query(func.min(OutboxEvent.sequence)).scalar()
+        if oldest is not None and oldest > int(_sync_cursor) + 1:
+            logger.warning("Change feed no longer reaches the search indexes' position; rebuilding them")
+            warm_search_indexes(db)
+            search_cache.bump_version()
+            return len(book_search_index)
+
+        cursor = _sync_cursor
+        book_ids = set()
+        while True:
+            events, cursor, has_more = outbox.get_changes(
+                db, since=cursor, types=[BOOK_TOPIC], limit=settings.CHANGES_MAX_PAGE_SIZE
+            )
+            book_ids.update(event.aggregate_id for event in events)
+            if not has_more:
+                break
+
+        ids = sorted(book_ids)
+        for start in range(0, len(ids), WARMUP_BATCH_SIZE):
+            chunk = ids[start:start + WARMUP_BATCH_SIZE]
+            books = {book.id: book for book in db.query(Book).filter(Book.id.in_(chunk))}
+            for book_id in chunk:
+                book = books.get(book_id)
+                if book is None:
+                    on_book_deleted(book_id)
+                else:
+                    on_book_saved(book)
+        if ids:
+            search_cache.bump_version()
+        _sync_cursor = cursor
+        return len(ids)
+    finally:
+        _sync_lock.release()
@@ -0,0 +1,61 @@
+"""
+In-memory canonical ISBN-13 to book ID map for barcode lookups
+"""
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class IsbnIndex:
+    """
+    Hash map from canonical ISBN-13 to book ID plus the reverse mapping so a
+    book whose ISBN changes can drop its old key. Misses are not
+    authoritative (another worker may have written the book); callers fall
+    back to the indexed `books.isbn13` column.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self._lock = threading.Lock()
+        self._ids: Dict[str, int] = {}
+        self._isbns: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def build(self, rows: Iterable[Tuple[int, Optional[str]]]) -> None:
+        """(Re)build from `(id, isbn13)` rows"""
+        ids = {}
+        isbns = {}
+        for book_id, isbn13 in rows:
+            if isbn13:
+                ids[isbn13] = book_id
+                isbns[book_id] = isbn13
+        with self._lock:
+            self._ids = ids
+            self._isbns = isbns
+            self.ready = True
+
+    def _remove(self, book_id: int) -> None:
+        isbn13 = self._isbns.pop(book_id, None)
+        if isbn13 is not None and self._ids.get(isbn13) == book_id:
+            del self._ids[isbn13]
+
+    def set(self, book_id: int, isbn13: Optional[str]) -> None:
+        with self._lock:
+            self._remove(book_id)
+            if isbn13:
+                self._ids[isbn13] = book_id
+                self._isbns[book_id] = isbn13
+
+    def upsert(self, book) -> None:
+        self.set(book.id, book.isbn13)
+
+    def remove(self, book_id: int) -> None:
+        with self._lock:
+            self._remove(book_id)
+
+    def get(self, isbn13: str) -> Optional[int]:
+        return self._ids.get(isbn13)
+
+
+book_isbn_index = IsbnIndex()
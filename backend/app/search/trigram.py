@@ -0,0 +1,238 @@
+"""
+Trigram similarity index for typo-tolerant title and author lookups
+"""
+import heapq
+import math
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_NON_WORD_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize(value: Optional[str]) -> str:
+    """Lower-case and collapse punctuation/whitespace to single spaces"""
+    if not value:
+        return ""
+    return _NON_WORD_RE.sub(" ", value.lower()).strip()
+
+
+def pad(normalized: str) -> str:
+    """
+    Join words padded the way `trigrams` pads them. Every trigram of the
+    string is a substring of the result and no other query trigram can be.
+    """
+    return "".join(f"  {word} " for word in normalized.split())
+
+
+def trigrams(normalized: str) -> Set[str]:
+    """
+    Trigrams of every word padded with two leading spaces and one trailing
+    space (the pg_trgm convention), so word starts weigh more than middles.
+    """
+    grams: Set[str] = set()
+    for word in normalized.split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+class TrigramIndex:
+    """
+    Inverted index from trigram to the distinct normalized strings (titles and
+    authors) containing it. Strings shared by several books, typically author
+    names, are stored once.
+
+    A query matches a string when at least `threshold` of the query's trigrams
+    occur in it. Candidates are generated from the rarest posting lists only
+    (any string sharing enough trigrams must appear in one of them) and then
+    verified exactly, so common trigrams such as "  t" are rarely scanned.
+    Removed strings are tombstoned and the postings are compacted once dead
+    entries make up a quarter of the index.
+    """
+
+    SCAN_BUDGET = 20_000
+    EXACT_BELOW = 4
+    COMPACT_RATIO = 0.25
+
+    def __init__(self, threshold: float = 0.5):
+        self.threshold = threshold
+        self.ready = False
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self._postings: Dict[str, array] = {}
+        self._entry_text: List[str] = []
+        self._entry_size = array("H")
+        self._entry_books: List[Optional[Set[int]]] = []
+        self._text_to_entry: Dict[str, int] = {}
+        self._book_entries: Dict[int, Tuple[int, ...]] = {}
+        self._book_category: Dict[int, Optional[int]] = {}
+        self._dead_entries = 0
+
+    def __len__(self) -> int:
+        return len(self._book_entries)
+
+    def _entry_for(self, text: str) -> int:
+        padded = pad(text)
+        entry = self._text_to_entry.get(padded)
+        if entry is not None:
+            return entry
+        grams = trigrams(text)
+        entry = len(self._entry_text)
+        self._entry_text.append(padded)
+        self._entry_size.append(min(len(grams), 0xFFFF))
+        self._entry_books.append(set())
+        self._text_to_entry[padded] = entry
+        for gram in grams:
+            postings = self._postings.get(gram)
+            if postings is None:
+                postings = self._postings[gram] = array("I")
+            postings.append(entry)
+        return entry
+
+    def _add(self, book_id: int, title, author, category_id) -> None:
+        entries = []
+        for value in (title, author):
+            text = normalize(value)
+            if not text:
+                continue
+            entry = self._entry_for(text)
+            self._entry_books[entry].add(book_id)
+            entries.append(entry)
+        self._book_entries[book_id] = tuple(entries)
+        self._book_category[book_id] = category_id
+
+    def _remove(self, book_id: int) -> None:
+        for entry in self._book_entries.pop(book_id, ()):
+            books = self._entry_books[entry]
+            if books is None:
+                continue
+            books.discard(book_id)
+            if not books:
+                self._entry_books[entry] = None
+                del self._text_to_entry[self._entry_text[entry]]
+                self._dead_entries += 1
+        self._book_category.pop(book_id, None)
+
+    def _maybe_compact(self) -> None:
+        if self._dead_entries <= self.COMPACT_RATIO * max(len(self._entry_text), 1):
+            return
+        live = [
+            (book_id, self._book_category[book_id], [self._entry_text[e].strip() for e in entries])
+            for book_id, entries in self._book_entries.items()
+        ]
+        self._clear()
+        for book_id, category_id, texts in live:
+            entries = []
+            for text in texts:
+                entry = self._entry_for(text)
+                self._entry_books[entry].add(book_id)
+                entries.append(entry)
+            self._book_entries[book_id] = tuple(entries)
+            self._book_category[book_id] = category_id
+
+    def build(self, rows: Iterable[Tuple[int, str, Optional[str], Optional[int]]]) -> None:
+        """(Re)build from `(id, title, author, category_id)` rows"""
+        with self._lock:
+            self._clear()
+            for row in rows:
+                self._add(*row)
+            self.ready = True
+
+    def upsert(self, book) -> None:
+        with self._lock:
+            self._remove(book.id)
+            self._add(book.id, book.title, book.author, book.category_id)
+            self._maybe_compact()
+
+    def remove(self, book_id: int) -> None:
+        with self._lock:
+            self._remove(book_id)
+            self._maybe_compact()
+
+    def _candidates(self, query_grams: Set[str], min_shared: int) -> Tuple[Counter, List[str]]:
+        """
+        Count query trigrams per entry over the cheapest posting lists. Returns
+        the partial counts and the trigrams whose lists were not scanned.
+        """
+        ordered = sorted(query_grams, key=lambda g: len(self._postings.get(g, ())))
+        # An entry sharing `min_shared` trigrams must occur in at least one of
+        # the len(ordered) - min_shared + 1 rarest lists; keep scanning while
+        # cheap to tighten the partial counts used for pruning.
+        mandatory = len(ordered) - min_shared + 1
+        counts: Counter = Counter()
+        budget = 0
+        scanned = 0
+        for gram in ordered:
+            postings = self._postings.get(gram, ())
+            if scanned >= mandatory and budget + len(postings) > self.SCAN_BUDGET:
+                break
+            counts.update(postings)
+            budget += len(postings)
+            scanned += 1
+        return counts, ordered[scanned:]
+
+    def _scores(self, query: str, category_id: Optional[int]) -> Dict[int, Tuple[float, float]]:
+        query_grams = trigrams(normalize(query))
+        if not query_grams:
+            return {}
+        n_query = len(query_grams)
+        if n_query <= self.EXACT_BELOW:
+            # Too short for typos to be meaningful: require every trigram
+            min_shared = n_query
+        else:
+            min_shared = max(1, math.ceil(self.threshold * n_query))
+
+        with self._lock:
+            counts, unscanned = self._candidates(query_grams, min_shared)
+            need = min_shared - len(unscanned)
+            best: Dict[int, Tuple[float, float]] = {}
+            for entry, shared in counts.items():
+                if shared < need:
+                    continue
+                books = self._entry_books[entry]
+                if not books:
+                    continue
+                if unscanned:
+                    # Padded text holds exactly the entry's trigrams as substrings
+                    padded = self._entry_text[entry]
+                    shared += sum(1 for gram in unscanned if gram in padded)
+                    if shared < min_shared:
+                        continue
+                size = self._entry_size[entry]
+                score = (shared / n_query, shared / (n_query + size - shared))
+                for book_id in books:
+                    if category_id is not None and self._book_category.get(book_id) != category_id:
+                        continue
+                    if score > best.get(book_id, (0.0, 0.0)):
+                        best[book_id] = score
+        return best
+
+    def search(
+        self,
+        query: str,
+        *,
+        category_id: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[Tuple[int, float]]:
+        """
+        Return `(book_id, similarity)` pairs, best first. Similarity is the
+        fraction of query trigrams present in the title or author, with ties
+        broken by overall (Jaccard) similarity.
+        """
+        best = self._scores(query, category_id)
+        top = heapq.nlargest(skip + limit, best.items(), key=lambda item: (item[1], -item[0]))
+        return [(book_id, round(score[0], 4)) for book_id, score in top[skip:skip + limit]]
+
+    def matches(self, query: str) -> List[int]:
+        """Every book `search` would return for `query`, in any category"""
+        return list(self._scores(query, None))
+
+
+book_trigram_index = TrigramIndex()
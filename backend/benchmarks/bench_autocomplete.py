@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Autocomplete prefix index benchmark - memory footprint, build time, lookup
+latency and incremental update cost on a synthetic catalog
+
+Usage:
+    python benchmarks/bench_autocomplete.py [--titles 1000000] [--repeat 200]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add the backend root to Python path
+backend_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(backend_root))
+
+from app.search.autocomplete import PrefixIndex
+
+PREFIXES = ["h", "ha", "harr", "the gr", "orw", "978", "9780451", "zzzz"]
+
+
+class _Book:
+    def __init__(self, id, title, author, isbn):
+        self.id, self.title, self.author, self.isbn = id, title, author, isbn
+
+
+def synthetic_rows(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocabulary = [
+        "".join(rng.choice(letters) for _ in range(rng.randint(3, 9)))
+        for _ in range(30000)
+    ]
+    authors = [f"{rng.choice(vocabulary)} {rng.choice(vocabulary)}" for _ in range(count // 10 or 1)]
+    for book_id in range(1, count + 1):
+        title = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 5)))
+        isbn = f"978{rng.randrange(10 ** 10):010d}"
+        yield book_id, title, rng.choice(authors), isbn
+
+
+def percentile(timings, pct):
+    timings = sorted(timings)
+    return timings[min(len(timings) - 1, int(len(timings) * pct))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the autocomplete prefix index")
+    parser.add_argument("--titles", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = list(synthetic_rows(args.titles))
+
+    tracemalloc.start()
+    index = PrefixIndex()
+    started = time.perf_counter()
+    index.build(rows)
+    build_seconds = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"Built {len(index):,} keys for {args.titles:,} books in {build_seconds:.1f}s")
+    print(f"Memory: {current / 2**20:.1f} MiB resident, {peak / 2**20:.1f} MiB peak during build "
+          f"({current / max(len(index), 1):.0f} bytes/key)")
+
+    print(f"{'prefix':<12} {'p50 us':>8} {'p99 us':>8} {'hits':>5}")
+    for prefix in PREFIXES:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            hits = index.suggest(prefix, limit=10)
+            timings.append((time.perf_counter() - started) * 1e6)
+        print(f"{prefix:<12} {statistics.median(timings):>8.1f} {percentile(timings, 0.99):>8.1f} {len(hits):>5}")
+
+    timings = []
+    for i in range(args.repeat):
+        book = _Book(args.titles + i + 1, f"benchmark title {i}", "bench author", f"979{i:010d}")
+        started = time.perf_counter()
+        index.upsert(book)
+        timings.append((time.perf_counter() - started) * 1e6)
+    print(f"{'upsert':<12} {statistics.median(timings):>8.1f} {percentile(timings, 0.99):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
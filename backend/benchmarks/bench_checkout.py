@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Checkout benchmark - concurrent multi-item baskets through
+`CRUDSale.create_sale`, reporting throughput, latency and an oversell check
+
+Runs against a throwaway SQLite file by default; pass --database-url to point
+it at a scratch MySQL/PostgreSQL database (tables are created, not dropped).
+
+Usage:
+    python benchmarks/bench_checkout.py [--workers 8] [--checkouts 2000] [--books 50]
+        [--stock 500] [--items 3] [--database-url URL]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+
+# Add the backend root to Python path
+backend_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(backend_root))
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - register every model on the metadata
+from app.crud.crud_sale import sale as crud_sale
+from app.db.base import Base
+from app.models.book import Book
+from app.models.sale import Sale
+from app.schemas.sale import SaleCreate, SaleItemCreate
+
+
+def percentile(timings, pct):
+    timings = sorted(timings)
+    return timings[min(len(timings) - 1, int(len(timings) * pct))]
+
+
+def seed(session_factory, books: int, stock: int):
+    db = session_factory()
+    try:
+        rows = [Book(title=f"Benchmark book {i}", price=Decimal("10.00"), stock=stock) for i in range(books)]
+        db.add_all(rows)
+        db.commit()
+        return [row.id for row in rows]
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent checkouts")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--checkouts", type=int, default=2000)
+    parser.add_argument("--books", type=int, default=50)
+    parser.add_argument("--stock", type=int, default=500)
+    parser.add_argument("--items", type=int, default=3, help="Lines per basket")
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'checkout.db')}"
+    connect_args = {"timeout": 30, "check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, pool_size=args.workers, connect_args=connect_args)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+
+    book_ids = seed(session_factory, args.books, args.stock)
+    per_worker = args.checkouts // args.workers
+    latencies, failures = [], []
+    lock = threading.Lock()
+
+    def worker(seed_value: int):
+        rng = random.Random(seed_value)
+        db = session_factory()
+        local_latencies, local_failures = [], 0
+        try:
+            for _ in range(per_worker):
+                lines = rng.sample(book_ids, min(args.items, len(book_ids)))
+                items = [SaleItemCreate(book_id=b, quantity=rng.randint(1, 3), unit_price=Decimal("10.00")) for b in lines]
+                basket = SaleCreate(total_amount=sum(i.unit_price * i.quantity for i in items), items=items)
+                started = time.perf_counter()
+                try:
+                    crud_sale.create_sale(db, obj_in=basket)
+                except ValueError:
+                    local_failures += 1
+                local_latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+        with lock:
+            latencies.extend(local_latencies)
+            failures.append(local_failures)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.workers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    db = session_factory()
+    try:
+        remaining = db.query(func.sum(Book.stock)).filter(Book.id.in_(book_ids)).scalar() or 0
+        negative = db.query(func.count(Book.id)).filter(Book.id.in_(book_ids), Book.stock < 0).scalar()
+        sold = db.query(func.sum(Sale.quantity)).scalar() or 0
+    finally:
+        db.close()
+
+    total = len(latencies)
+    print(f"{total:,} checkouts by {args.workers} workers in {elapsed:.2f}s "
+          f"({total / elapsed:,.0f} checkouts/s), {sum(failures):,} rejected for stock")
+    print(f"Latency ms: p50 {statistics.median(latencies):.2f}  p99 {percentile(latencies, 0.99):.2f}")
+    consistent = negative == 0 and remaining + sold == args.books * args.stock
+    print(f"Stock check: {sold:,} sold, {remaining:,} left, "
+          f"{'consistent' if consistent else 'OVERSOLD / INCONSISTENT'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Group commit benchmark - concurrent single-basket checkouts committed one
+transaction per sale (`CRUDSale.create_sale`) versus batched through a
+`GroupCommitWriter` (`CRUDSale.create_sale_grouped`), reporting throughput
+and p50/p99 latency for each concurrency and batch setting
+
+Runs against a throwaway SQLite file by default; pass --database-url to point
+it at a scratch MySQL/PostgreSQL database (tables are created, not dropped).
+On SQLite each commit is an fsync, which is where grouping pays off; expect
+latency to rise by up to --delay-ms at low concurrency in exchange.
+
+Usage:
+    python benchmarks/bench_group_commit.py [--workers 1,8,32] [--checkouts 2000]
+        [--batch 16,64] [--delay-ms 2] [--books 200] [--database-url URL]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+
+# Add the backend root to Python path
+backend_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(backend_root))
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - register every model on the metadata
+from app.crud.crud_sale import sale as crud_sale
+from app.db.base import Base
+from app.db.group_commit import GroupCommitWriter
+from app.models.book import Book
+from app.models.sale import Sale
+from app.schemas.sale import SaleCreate, SaleItemCreate
+
+
+def percentile(timings, pct):
+    timings = sorted(timings)
+    return timings[min(len(timings) - 1, int(len(timings) * pct))]
+
+
+def int_list(value: str):
+    return [int(v) for v in value.split(",") if v]
+
+
+def seed(session_factory, books: int, stock: int):
+    db = session_factory()
+    try:
+        rows = [Book(title=f"Benchmark book {i}", price=Decimal("10.00"), stock=stock) for i in range(books)]
+        db.add_all(rows)
+        db.commit()
+        return [row.id for row in rows]
+    finally:
+        db.close()
+
+
+def run(session_factory, book_ids, workers: int, checkouts: int, writer=None):
+    per_worker = max(checkouts // workers, 1)
+    latencies, failures = [], []
+    lock = threading.Lock()
+
+    def worker(seed_value: int):
+        rng = random.Random(seed_value)
+        db = session_factory()
+        local_latencies, local_failures = [], 0
+        try:
+            for _ in range(per_worker):
+                items = [SaleItemCreate(book_id=b, quantity=1, unit_price=Decimal("10.00"))
+                         for b in rng.sample(book_ids, 2)]
+                basket = SaleCreate(total_amount=Decimal("20.00"), items=items)
+                started = time.perf_counter()
+                try:
+                    if writer is None:
+                        crud_sale.create_sale(db, obj_in=basket)
+                    else:
+                        crud_sale.create_sale_grouped(db, obj_in=basket, writer=writer)
+                except ValueError:
+                    local_failures += 1
+                local_latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+        with lock:
+            latencies.extend(local_latencies)
+            failures.append(local_failures)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return len(latencies), elapsed, latencies, sum(failures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark group commit for sale writes")
+    parser.add_argument("--workers", type=int_list, default=[1, 8, 32], help="Comma-separated concurrency levels")
+    parser.add_argument("--checkouts", type=int, default=2000, help="Checkouts per run")
+    parser.add_argument("--batch", type=int_list, default=[16, 64], help="Comma-separated max batch sizes")
+    parser.add_argument("--delay-ms", type=float, default=2.0)
+    parser.add_argument("--books", type=int, default=200)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'group_commit.db')}"
+    connect_args = {"timeout": 30, "check_same_thread": False} if url.startswith("sqlite") else {}
+    pool_size = max(args.workers) + 2
+    engine = create_engine(url, pool_size=pool_size, connect_args=connect_args)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+
+    runs = len(args.workers) * (1 + len(args.batch))
+    book_ids = seed(session_factory, args.books, stock=args.checkouts * runs)
+
+    print(f"{'mode':<22}{'workers':>8}{'sales/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'batches':>9}{'rejected':>10}")
+    for workers in args.workers:
+        modes = [("direct", None)] + [
+            (f"grouped batch={size}", GroupCommitWriter(session_factory, max_batch=size, max_delay_ms=args.delay_ms))
+            for size in args.batch
+        ]
+        for label, writer in modes:
+            total, elapsed, latencies, rejected = run(session_factory, book_ids, workers, args.checkouts, writer)
+            batches = "-"
+            if writer is not None:
+                writer.stop()
+                batches = f"{writer.batches:,}"
+            print(f"{label:<22}{workers:>8}{total / elapsed:>10,.0f}{statistics.median(latencies):>9.2f}"
+                  f"{percentile(latencies, 0.99):>9.2f}{batches:>9}{rejected:>10,}")
+
+    db = session_factory()
+    try:
+        negative = db.query(func.count(Book.id)).filter(Book.stock < 0).scalar()
+        sold = db.query(func.sum(Sale.quantity)).scalar() or 0
+        remaining = db.query(func.sum(Book.stock)).scalar() or 0
+    finally:
+        db.close()
+    consistent = negative == 0 and sold + remaining == args.books * args.checkouts * runs
+    print(f"Stock check: {sold:,} sold, {'consistent' if consistent else 'OVERSOLD / INCONSISTENT'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Sales date-range benchmark - the report queries written the old way
+(`func.date(created_at)` comparisons) and the new way (half-open
+`[start, end)` timestamp ranges), each run before and after the sales
+indexes from migration b3f7a1c9e245 exist, with the database's query plan
+for every variant
+
+Runs against a throwaway SQLite file by default; pass --database-url to point
+it at a scratch MySQL/PostgreSQL database (tables are created, not dropped).
+Seeding 10M rows takes several minutes on SQLite; start with the default.
+
+Usage:
+    python benchmarks/bench_sales_date_range.py [--rows 1000000] [--days 730]
+        [--books 5000] [--customers 20000] [--repeat 5] [--database-url URL]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# Add the backend root to Python path
+backend_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(backend_root))
+
+from sqlalchemy import create_engine, func, insert, select
+
+import app.models  # noqa: F401 - register every model on the metadata
+from app.db.base import Base
+from app.models.book import Book
+from app.models.customer import Customer
+from app.models.sale import Sale
+
+SALES_INDEXES = ("ix_sales_created_at", "ix_sales_book_id_created_at", "ix_sales_customer_id_created_at")
+
+
+def seed(engine, rows: int, days: int, books: int, customers: int):
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        conn.execute(insert(Book), [{"title": f"Benchmark book {i}", "price": 10, "stock": 0} for i in range(books)])
+        conn.execute(insert(Customer), [{"name": f"Customer {i}"} for i in range(customers)])
+        book_ids = conn.execute(select(Book.id)).scalars().all()
+        customer_ids = conn.execute(select(Customer.id)).scalars().all()
+    chunk = 50000
+    started = time.perf_counter()
+    for offset in range(0, rows, chunk):
+        batch = [
+            {
+                "book_id": rng.choice(book_ids),
+                "customer_id": rng.choice(customer_ids) if rng.random() < 0.7 else None,
+                "quantity": rng.randint(1, 3),
+                "total_amount": 10,
+                "created_at": now - timedelta(seconds=rng.randint(0, days * 86400)),
+                "version": 1,
+                "returned_quantity": 0,
+                "refunded_amount": 0,
+            }
+            for _ in range(min(chunk, rows - offset))
+        ]
+        with engine.begin() as conn:
+            conn.execute(insert(Sale), batch)
+    print(f"Seeded {rows:,} sales in {time.perf_counter() - started:.1f}s")
+    return book_ids, customer_ids
+
+
+def queries(book_id: int, customer_id: int):
+    """(name, old statement, new statement) pairs mirroring CRUDSale's reports"""
+    today = date.today()
+    week_ago, month_ago = today - timedelta(days=7), today - timedelta(days=30)
+    start = lambda d: datetime.combine(d, datetime.min.time())
+    tomorrow = start(today + timedelta(days=1))
+    return [
+        (
+            "sales in last 7 days",
+            select(func.count(Sale.id), func.sum(Sale.total_amount))
+            .where(func.date(Sale.created_at) >= week_ago, func.date(Sale.created_at) <= today),
+            select(func.count(Sale.id), func.sum(Sale.total_amount))
+            .where(Sale.created_at >= start(week_ago), Sale.created_at < tomorrow),
+        ),
+        (
+            "one book, last 30 days",
+            select(func.count(Sale.id))
+            .where(Sale.book_id == book_id, func.date(Sale.created_at) >= month_ago),
+            select(func.count(Sale.id))
+            .where(Sale.book_id == book_id, Sale.created_at >= start(month_ago)),
+        ),
+        (
+            "customer's latest 20",
+            select(Sale.id).where(Sale.customer_id == customer_id)
+            .order_by(func.date(Sale.created_at).desc()).limit(20),
+            select(Sale.id).where(Sale.customer_id == customer_id)
+            .order_by(Sale.created_at.desc()).limit(20),
+        ),
+        (
+            "top books, last 30 days",
+            select(Sale.book_id, func.sum(Sale.quantity).label("sold"))
+            .where(func.date(Sale.created_at) >= month_ago)
+            .group_by(Sale.book_id).order_by(func.sum(Sale.quantity).desc()).limit(10),
+            select(Sale.book_id, func.sum(Sale.quantity).label("sold"))
+            .where(Sale.created_at >= start(month_ago))
+            .group_by(Sale.book_id).order_by(func.sum(Sale.quantity).desc()).limit(10),
+        ),
+    ]
+
+
+def explain(conn, stmt) -> str:
+    compiled = stmt.compile(dialect=conn.dialect)
+    params = tuple(compiled.params[k] for k in compiled.positiontup) if compiled.positional else compiled.params
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    rows = conn.exec_driver_sql(prefix + compiled.string, params).fetchall()
+    if conn.dialect.name == "sqlite":
+        return "; ".join(row[-1] for row in rows)
+    return "; ".join(" ".join(str(v) for v in row if v is not None) for row in rows)
+
+
+def timed(conn, stmt, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(stmt).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def run_phase(engine, label: str, book_id: int, customer_id: int, repeat: int) -> None:
+    print(f"\n== {label} ==")
+    with engine.connect() as conn:
+        for name, old, new in queries(book_id, customer_id):
+            old_ms, new_ms = timed(conn, old, repeat), timed(conn, new, repeat)
+            print(f"{name:<26} func.date {old_ms:9.2f} ms   [start, end) {new_ms:9.2f} ms")
+            print(f"    plan func.date:    {explain(conn, old)}")
+            print(f"    plan [start, end): {explain(conn, new)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sargable sales date filters and indexes")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=730, help="Spread of sale timestamps")
+    parser.add_argument("--books", type=int, default=5000)
+    parser.add_argument("--customers", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'sales_range.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    sales_indexes = [index for index in Sale.__table__.indexes if index.name in SALES_INDEXES]
+    for index in sales_indexes:
+        index.drop(bind=engine, checkfirst=True)
+
+    book_ids, customer_ids = seed(engine, args.rows, args.days, args.books, args.customers)
+    book_id, customer_id = book_ids[len(book_ids) // 2], customer_ids[len(customer_ids) // 2]
+
+    run_phase(engine, "without sales indexes", book_id, customer_id, args.repeat)
+    started = time.perf_counter()
+    for index in sales_indexes:
+        index.create(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE" if engine.dialect.name != "mysql" else "ANALYZE TABLE sales")
+    print(f"\nCreated {len(sales_indexes)} indexes in {time.perf_counter() - started:.1f}s")
+    run_phase(engine, "with sales indexes", book_id, customer_id, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
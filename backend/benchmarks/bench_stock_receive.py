@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Stock receiving benchmark - latency of `CRUDBook.receive_stock` for supplier
+deliveries of 1k and 10k lines (half addressed by book ID, half by ISBN),
+compared with the per-book `update_stock` path it replaces
+
+Runs against a throwaway SQLite file by default; pass --database-url to point
+it at a scratch MySQL/PostgreSQL database (tables are created, not dropped).
+
+Usage:
+    python benchmarks/bench_stock_receive.py [--sizes 1000 10000] [--repeat 5]
+        [--database-url URL]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+
+# Add the backend root to Python path
+backend_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(backend_root))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - register every model on the metadata
+from app.core.isbn import to_isbn13
+from app.crud.crud_book import book as crud_book
+from app.db.base import Base
+from app.models.book import Book
+
+
+def isbn_for(n: int) -> str:
+    first12 = f"979{n:09d}"
+    return next(first12 + d for d in "0123456789" if to_isbn13(first12 + d))
+
+
+def seed(session_factory, count: int):
+    db = session_factory()
+    try:
+        rows = []
+        for n in range(count):
+            isbn = isbn_for(n)
+            rows.append({
+                "title": f"Benchmark book {n}", "price": Decimal("10.00"), "stock": 10,
+                "reserved": 0, "isbn": isbn, "isbn13": isbn, "version": 1,
+            })
+        db.execute(insert(Book), rows)
+        db.commit()
+        return [(row.id, row.isbn) for row in db.query(Book.id, Book.isbn).order_by(Book.id)]
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk stock receiving")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'receive.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    books = seed(session_factory, max(args.sizes))
+
+    print(f"{'lines':>7} {'receive p50 ms':>15} {'max ms':>8} {'per-book loop ms':>17}")
+    for size in args.sizes:
+        lines = [
+            (book_id, None, 1) if i % 2 else (None, isbn, 1)
+            for i, (book_id, isbn) in enumerate(books[:size])
+        ]
+        timings = []
+        for _ in range(args.repeat):
+            db = session_factory()
+            started = time.perf_counter()
+            crud_book.receive_stock(db, lines=lines)
+            timings.append((time.perf_counter() - started) * 1000)
+            db.close()
+
+        # Baseline: one update_stock call (read + CAS update + commit) per line,
+        # timed on up to 1000 books and scaled to the delivery size
+        db = session_factory()
+        sample = books[:min(size, 1000)]
+        started = time.perf_counter()
+        for book_id, _ in sample:
+            crud_book.update_stock(db, book_id=book_id, quantity_change=1)
+        loop_ms = (time.perf_counter() - started) * 1000 * size / len(sample)
+        db.close()
+
+        print(f"{size:>7} {statistics.median(timings):>15.1f} {max(timings):>8.1f} {loop_ms:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Trigram index benchmark - build time and fuzzy lookup latency on a synthetic
+catalog (default: one million titles)
+
+Usage:
+    python benchmarks/bench_trigram.py [--titles 1000000] [--repeat 50]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add the backend root to Python path
+backend_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(backend_root))
+
+from app.search.trigram import TrigramIndex
+
+QUERIES = ["gatsbi", "orwel", "great gatsbi", "scot fitzgerald", "the", "harry poter"]
+
+
+def synthetic_rows(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocabulary = [
+        "".join(rng.choice(letters) for _ in range(rng.randint(3, 9)))
+        for _ in range(30000)
+    ]
+    authors = [f"{rng.choice(vocabulary)} {rng.choice(vocabulary)}" for _ in range(count // 10 or 1)]
+    for book_id in range(1, count + 1):
+        title = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 5)))
+        yield book_id, title, rng.choice(authors), None
+    yield count + 1, "The Great Gatsby", "F. Scott Fitzgerald", None
+    yield count + 2, "Nineteen Eighty-Four", "George Orwell", None
+    yield count + 3, "Harry Potter and the Philosopher's Stone", "J. K. Rowling", None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the trigram index")
+    parser.add_argument("--titles", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    index = TrigramIndex()
+    started = time.perf_counter()
+    index.build(synthetic_rows(args.titles))
+    print(f"Built index for {len(index):,} books in {time.perf_counter() - started:.1f}s")
+
+    print(f"{'query':<20} {'p50 ms':>8} {'p99 ms':>8}  top match")
+    for query in QUERIES:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            matches = index.search(query, limit=10)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        top = matches[0] if matches else None
+        print(f"{query:<20} {statistics.median(timings):>8.2f} {p99:>8.2f}  {top}")
+
+
+if __name__ == "__main__":
+    main()
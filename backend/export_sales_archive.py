@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Append closed months of sales to the columnar sales archive: one directory
+per month holding a `.npy` file per column for the `sales` and `sale_lines`
+tables (see app/analytics/archive.py). Months already archived are left
+untouched, so a nightly run only writes what is new. Point
+SALES_ARCHIVE_DIR at the same directory to let the analytics cube
+memory-map it instead of reading those months from the database.
+
+Usage:
+    python export_sales_archive.py [--archive-dir DIR] [--rebuild YYYY-MM ...]
+
+Loading a partition for analysis:
+    import numpy as np
+    revenue = np.load("archive/2026-09/sale_lines/revenue_cents.npy", mmap_mode="r")
+"""
+import argparse
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add the backend root to Python path
+backend_root = Path(__file__).parent
+sys.path.append(str(backend_root))
+
+import app.models  # noqa: F401
+from app.analytics.archive import SalesArchive
+from app.core.config import settings
+from app.db.utils import DatabaseManager
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_month(value: str):
+    try:
+        return datetime.strptime(value, "%Y-%m").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected YYYY-MM, got {value!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--archive-dir", default=settings.SALES_ARCHIVE_DIR, help="Archive root (default SALES_ARCHIVE_DIR)")
+    parser.add_argument(
+        "--rebuild", type=parse_month, action="append", default=[],
+        help="Rewrite this already archived month, e.g. after corrections older than the change feed retention",
+    )
+    args = parser.parse_args()
+    if not args.archive_dir:
+        parser.error("Set SALES_ARCHIVE_DIR or pass --archive-dir")
+
+    archive = SalesArchive(args.archive_dir)
+    try:
+        with DatabaseManager() as db:
+            for month in args.rebuild:
+                count = archive.rebuild(db, month)
+                logger.info(f"Rebuilt {month:%Y-%m}: {count} sales")
+            written = archive.export(db)
+        logger.info(f"Archive up to date: {len(written)} new months in {archive.root}")
+    except Exception as e:
+        logger.error(f"Sales archive export failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Regenerate the sales_daily_rollup table from sales history whenever the
+rollup is suspected to have drifted (the migration that adds the table
+already backfills it). The rebuild is one transaction, so reports keep
+reading the old totals until it commits.
+
+Usage:
+    python rebuild_sales_rollup.py
+"""
+import logging
+import sys
+from pathlib import Path
+
+# Add the backend root to Python path
+backend_root = Path(__file__).parent
+sys.path.append(str(backend_root))
+
+from app.crud.crud_sales_rollup import sales_rollup
+from app.db.utils import DatabaseManager
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    try:
+        with DatabaseManager() as db:
+            rows = sales_rollup.rebuild(db)
+        logger.info(f"Rebuilt sales_daily_rollup: {rows} rows")
+    except Exception as e:
+        logger.error(f"Sales rollup rebuild failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()